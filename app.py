@@ -1,12 +1,19 @@
 from flask import Flask, request, jsonify, render_template, redirect, url_for, session, flash, Response
+from flask.json.provider import DefaultJSONProvider
+from flask_babel import Babel, gettext as _
 from sqlalchemy.exc import SQLAlchemyError
 import os # For secret key
+import io
+import secrets
 
 from src import auth, user, shift, child, event, grocery, task, institution, consent, treatment_plan  # Models
-from src import shift_manager, child_manager, event_manager, shift_pattern_manager, grocery_manager, calendar_sync, shift_swap_manager, expense_manager, task_manager  # Managers
+from src import shift_manager, child_manager, event_manager, shift_pattern_manager, grocery_manager, shift_swap_manager, expense_manager, task_manager  # Managers
+# src.calendar_sync (Google API client) is imported on first use in api_sync_calendar
 from src.notification import get_user_queue
 
-from src.database import init_db, SessionLocal
+from src.database import init_db, get_session, init_request_sessions
+from src import queries, pagination, time_window, agenda, conflicts, serializers, ics_import, calendar_feed, feed_state, search
+from src import loading, roster, holiday_calendar_manager
 # Import residency_period model for init_db
 from src import residency_period
 
@@ -17,26 +24,36 @@ try:
     from src import user, shift, child, event, shift_swap, expense, task, institution, consent, treatment_plan  # Models
     # Import residency_period model for init_db
     from src import residency_period
-    from datetime import datetime # For HTML form datetime-local conversion
+    from datetime import date, datetime # For HTML form datetime-local conversion
     init_db()
 except Exception as e:
     print(f"Error initializing database during app startup: {e}")
     # Depending on the application, you might want to exit or log this critical error.
 
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through src.serializers.dumps, which uses orjson when it is installed."""
+
+    def dumps(self, obj, **kwargs):
+        kwargs.setdefault("default", self.default)
+        kwargs.setdefault("sort_keys", self.sort_keys)
+        kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+        return serializers.dumps(obj, **kwargs)
+
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = os.urandom(24) # Generate a random secret key for sessions
+init_request_sessions(app) # One DB session and transaction per request, shared by all managers
 
 # Flask-Babel configuration
 app.config['BABEL_DEFAULT_LOCALE'] = 'en'
 app.config['LANGUAGES'] = ['en', 'es']
 app.config['BABEL_TRANSLATION_DIRECTORIES'] = 'translations'
 
-babel = Babel(app)
-
-@babel.localeselector
 def get_locale():
     return request.accept_languages.best_match(app.config['LANGUAGES'])
 
+babel = Babel(app, locale_selector=get_locale)
+
 # Optional: A generic error handler for unhandled exceptions
 @app.errorhandler(Exception)
 def handle_generic_error(e):
@@ -46,6 +63,33 @@ def handle_generic_error(e):
     response.status_code = 500
     return response
 
+# List endpoints return one page at a time (see src/pagination.py) when asked for
+# with `limit` or `cursor`; without either they return every item, as they always
+# have. The body stays a JSON list; the cursor for the next page is sent in
+# X-Next-Cursor and a Link header.
+def _page_args():
+    """(limit, cursor) from the query string; (None, None) for an unpaged request.
+
+    A cursor without a limit gets the default page size.
+    """
+    limit, cursor = request.args.get('limit', type=int), request.args.get('cursor')
+    if limit is None and not cursor:
+        return None, None
+    return pagination.clamp_limit(limit), cursor
+
+def _paged_response(page, items):
+    response = jsonify(items)
+    if page.next_cursor:
+        args = {**request.view_args, **request.args.to_dict(), 'cursor': page.next_cursor}
+        response.headers['X-Next-Cursor'] = page.next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    return response, 200
+
+def _window_args(timezone='UTC'):
+    """(start, end) as naive UTC from ?start=&end= (ISO dates or datetimes, read in `timezone`)."""
+    return (time_window.parse_window_bound(request.args.get('start'), timezone),
+            time_window.parse_window_bound(request.args.get('end'), timezone))
+
 @app.route('/auth/register', methods=['POST'])
 def register_user():
     try:
@@ -63,7 +107,7 @@ def register_user():
             # new_user is an SQLAlchemy User model instance
             return jsonify(message=_("User registered successfully"), user_id=new_user.id, name=new_user.name), 201
         else:
-            db_session = SessionLocal()
+            db_session = get_session()
             existing = db_session.query(user.User).filter(user.User.email == email).first()
             db_session.close()
             if existing:
@@ -74,11 +118,6 @@ def register_user():
         print(f"Error in /auth/register: {e}")
         return jsonify(message="An unexpected error occurred during registration."), 500
 
-# ... (rest of the file remains the same until the new routes)
-    except Exception as e: # Catch any other unexpected errors during registration
-        print(f"Error in /auth/register: {e}") # Log it
-        return jsonify(message=_("An unexpected error occurred during registration.")), 500
-
 
 @app.route('/auth/login', methods=['POST'])
 def login_user():
@@ -124,7 +163,7 @@ def api_add_child(user_id):
         return jsonify(message=_("Missing name or date_of_birth for child")), 400
 
     # Basic validation for user_id (as parent) could be done here if desired
-    # db = SessionLocal()
+    # db = get_session()
     # parent_user = db.query(user.User).filter(user.User.id == user_id).first()
     # db.close()
     # if not parent_user:
@@ -145,7 +184,7 @@ def api_add_child(user_id):
 
 @app.route('/children/<int:child_id>', methods=['GET'])
 def api_get_child_details(child_id):
-    child_obj = child_manager.get_child_details(child_id)
+    child_obj = child_manager.get_child_details(child_id, load=loading.CHILD_PARENTS)
     if child_obj:
         return jsonify(child_obj.to_dict(include_parents=True)), 200
     return jsonify(message=_("Child not found")), 404
@@ -195,7 +234,7 @@ def api_add_parent_to_child(child_id):
         return jsonify(message=_("Parent added to child successfully")), 200
     else:
         # Check if child or user not found, or if already a parent
-        db = SessionLocal()
+        db = get_session()
         child_exists = db.query(child.Child).filter(child.Child.id == child_id).count() > 0
         user_exists = db.query(user.User).filter(user.User.id == other_parent_user_id).count() > 0
         db.close()
@@ -219,10 +258,8 @@ def api_create_event():
 
     timezone_pref = 'UTC'
     if data.get('user_id'):
-        db_tz = SessionLocal()
-        tz_user = db_tz.query(user.User).filter(user.User.id == data['user_id']).first()
-        if tz_user and tz_user.timezone:
-            timezone_pref = tz_user.timezone
+        db_tz = get_session(readonly=True)
+        timezone_pref = queries.get_user_timezone(db_tz, data['user_id'])
         db_tz.close()
 
     new_event_obj = event_manager.create_event(
@@ -232,7 +269,9 @@ def api_create_event():
         end_time_str=data['end_time'],
         linked_user_id=data.get('user_id'), # Optional
         linked_child_id=data.get('child_id'), # Optional
-        timezone=timezone_pref
+        timezone=timezone_pref,
+        recurrence_rule=data.get('recurrence_rule'), # Optional, e.g. "FREQ=WEEKLY;COUNT=10"
+        recurrence_exdates=data.get('exdates') # Optional occurrence starts to skip
     )
     if new_event_obj:
         return jsonify(new_event_obj.to_dict()), 201
@@ -250,21 +289,183 @@ def api_get_event_details(event_id):
 
 @app.route('/users/<int:user_id>/events', methods=['GET'])
 def api_get_user_events(user_id):
-    db_tz = SessionLocal()
-    tz_user = db_tz.query(user.User).filter(user.User.id == user_id).first()
-    tz = tz_user.timezone if tz_user and tz_user.timezone else 'UTC'
+    db_tz = get_session(readonly=True)
+    tz = queries.get_user_timezone(db_tz, user_id)
     db_tz.close()
-    events_list = event_manager.get_events_for_user(user_id)
-    return jsonify([e.to_dict(include_user=False, timezone=tz) for e in events_list]), 200
+    limit, cursor = _page_args()
+    try:
+        start, end = _window_args(tz)
+        events_list = event_manager.get_events_for_user(user_id, limit, cursor, start, end,
+                                                        load=loading.EVENT_LINKS_FOR_USER)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    return _paged_response(events_list, [e.to_dict(include_user=False, timezone=tz) for e in events_list])
 
 @app.route('/children/<int:child_id>/events', methods=['GET'])
 def api_get_child_events(child_id):
-    events_list = event_manager.get_events_for_child(child_id)
+    limit, cursor = _page_args()
+    try:
+        start, end = _window_args()
+        events_list = event_manager.get_events_for_child(child_id, limit, cursor, start, end,
+                                                         load=loading.EVENT_LINKS_FOR_CHILD)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
     result = []
     for e in events_list:
         tz = e.user.timezone if e.user and e.user.timezone else 'UTC'
         result.append(e.to_dict(include_child=False, timezone=tz))
-    return jsonify(result), 200
+    return _paged_response(events_list, result)
+
+@app.route('/users/<int:user_id>/shifts', methods=['GET'])
+def api_get_user_shifts(user_id):
+    db_tz = get_session(readonly=True)
+    tz = queries.get_user_timezone(db_tz, user_id)
+    db_tz.close()
+    limit, cursor = _page_args()
+    try:
+        start, end = _window_args(tz)
+        shifts_list = shift_manager.get_user_shifts(user_id, start, end, limit, cursor, load=loading.SHIFT_PATTERN)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    return _paged_response(shifts_list, [s.to_dict(include_owner=False, timezone=tz) for s in shifts_list])
+
+@app.route('/users/<int:user_id>/shifts', methods=['POST'])
+def api_add_user_shift(user_id):
+    data = request.get_json()
+    if not data or not all(k in data for k in ("name", "start_time", "end_time")):
+        return jsonify(message=_("Missing name, start_time, or end_time for shift")), 400
+    db_tz = get_session(readonly=True)
+    tz = queries.get_user_timezone(db_tz, user_id)
+    db_tz.close()
+    new_shift = shift_manager.add_shift(user_id=user_id, start_time_str=data['start_time'],
+                                        end_time_str=data['end_time'], name=data['name'], timezone=tz)
+    if new_shift:
+        return jsonify(new_shift.to_dict(timezone=tz)), 201
+    return jsonify(message=_("Failed to add shift. Invalid input or user not found.")), 400
+
+@app.route('/shifts/<int:shift_id>', methods=['GET'])
+def api_get_shift_details(shift_id):
+    db = get_session(readonly=True)
+    try:
+        shift_obj = queries.get_shift(db, shift_id)
+        if shift_obj:
+            return jsonify(shift_obj.to_dict()), 200
+        return jsonify(message=_("Shift not found")), 404
+    finally:
+        db.close()
+
+@app.route('/shifts/<int:shift_id>', methods=['PUT'])
+def api_update_shift(shift_id):
+    data = request.get_json()
+    if not data:
+        return jsonify(message=_("No data provided for update")), 400
+    updated_shift = shift_manager.update_shift(shift_id, new_start_time_str=data.get('start_time'),
+                                               new_end_time_str=data.get('end_time'), new_name=data.get('name'))
+    if updated_shift:
+        return jsonify(updated_shift.to_dict()), 200
+    return jsonify(message=_("Shift not found or update failed")), 404
+
+@app.route('/shifts/<int:shift_id>', methods=['DELETE'])
+def api_delete_shift(shift_id):
+    if shift_manager.delete_shift(shift_id):
+        return jsonify(message=_("Shift deleted successfully")), 200
+    return jsonify(message=_("Shift not found or delete failed")), 404
+
+@app.route('/users/<int:user_id>/events/import', methods=['POST'])
+def api_import_user_events(user_id):
+    # An .ics upload (multipart field "file") or a text/calendar request body,
+    # read as a stream; see src/ics_import.py.
+    upload = request.files.get('file')
+    if upload:
+        stream = upload.stream
+    elif request.mimetype == 'text/calendar':
+        stream = request.stream
+    else:
+        return jsonify(message=_("Upload an .ics file as 'file' or send a text/calendar body")), 400
+    db_tz = get_session(readonly=True)
+    tz = queries.get_user_timezone(db_tz, user_id)
+    db_tz.close()
+    summary = ics_import.import_ics(user_id, io.TextIOWrapper(stream, encoding='utf-8', errors='replace'), tz)
+    if summary is None:
+        return jsonify(message=_("Failed to import events")), 500
+    return jsonify(summary), 201
+
+# Calendar feeds are polled by calendar apps; an unchanged feed is answered with
+# 304 from its version row alone (see src/calendar_feed.py).
+def _feed_response(owner_type, owner_model, owner_id, stream):
+    db = get_session(readonly=True)
+    try:
+        etag, last_modified = calendar_feed.validators(db, owner_type, owner_id)
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            not_modified = request.if_modified_since is not None and \
+                last_modified <= request.if_modified_since.replace(tzinfo=None)
+        if not not_modified and db.get(owner_model, owner_id) is None:
+            return jsonify(message=_("Not found")), 404
+    finally:
+        db.close()
+    response = Response(status=304) if not_modified else \
+        Response(stream(owner_id, last_modified), mimetype='text/calendar')
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True # Revalidate every poll; usually a 304
+    return response
+
+@app.route('/users/<int:user_id>/calendar.ics', methods=['GET'])
+def api_user_calendar_feed(user_id):
+    return _feed_response(feed_state.USER_FEED, user.User, user_id, calendar_feed.stream_user_feed)
+
+@app.route('/children/<int:child_id>/calendar.ics', methods=['GET'])
+def api_child_calendar_feed(child_id):
+    return _feed_response(feed_state.CHILD_FEED, child.Child, child_id, calendar_feed.stream_child_feed)
+
+@app.route('/users/<int:user_id>/agenda', methods=['GET'])
+def api_get_user_agenda(user_id):
+    # Events, children's events and residency, tasks and shifts merged into one
+    # time-ordered list; streamed a day at a time (see src/agenda.py).
+    db_tz = get_session(readonly=True)
+    tz = queries.get_user_timezone(db_tz, user_id)
+    db_tz.close()
+    try:
+        start, end = agenda.validate_range(time_window.parse_window_bound(request.args.get('from'), tz),
+                                           time_window.parse_window_bound(request.args.get('to'), tz))
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    try:
+        chunks = agenda.stream_agenda_json(user_id, start, end, tz)
+    except SQLAlchemyError:
+        return jsonify(message=_("Database error reading agenda.")), 500
+    return Response(chunks, mimetype='application/json')
+
+@app.route('/users/<int:user_id>/conflicts', methods=['GET'])
+def api_get_user_conflicts(user_id):
+    db_tz = get_session(readonly=True)
+    tz = queries.get_user_timezone(db_tz, user_id)
+    db_tz.close()
+    try:
+        start, end = agenda.validate_range(time_window.parse_window_bound(request.args.get('from'), tz),
+                                           time_window.parse_window_bound(request.args.get('to'), tz))
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    return jsonify([[agenda.item_dict(*entry, timezone=tz) for entry in pair]
+                    for pair in conflicts.find_conflicts(user_id, start, end)]), 200
+
+@app.route('/search', methods=['GET'])
+def api_search():
+    user_id = request.args.get('user_id', type=int) or session.get('user_id')
+    if user_id is None:
+        return jsonify(message=_("user_id is required")), 400
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify(message=_("q is required")), 400
+    kinds = request.args.get('types')
+    results = search.search(user_id, query, limit=request.args.get('limit', search.DEFAULT_LIMIT, type=int),
+                            kinds=kinds.split(',') if kinds else None)
+    db_tz = get_session(readonly=True)
+    tz = queries.get_user_timezone(db_tz, user_id)
+    db_tz.close()
+    return jsonify([search.result_dict(*result, timezone=tz) for result in results]), 200
 
 @app.route('/events/<int:event_id>', methods=['PUT'])
 def api_update_event(event_id):
@@ -276,15 +477,10 @@ def api_update_event(event_id):
     unlink_user = 'user_id' in data and data['user_id'] is None
     unlink_child = 'child_id' in data and data['child_id'] is None
 
-    db_tz = SessionLocal()
-    event_rec = db_tz.query(event.Event).filter(event.Event.id == event_id).first()
-    tz = 'UTC'
-    if event_rec and event_rec.user and event_rec.user.timezone:
-        tz = event_rec.user.timezone
+    db_tz = get_session(readonly=True)
+    tz = queries.get_event_owner_timezone(db_tz, event_id)
     if 'user_id' in data and data['user_id'] is not None:
-        tz_user = db_tz.query(user.User).filter(user.User.id == data['user_id']).first()
-        if tz_user and tz_user.timezone:
-            tz = tz_user.timezone
+        tz = queries.get_user_timezone(db_tz, data['user_id'], default=tz)
     db_tz.close()
     updated_event_obj = event_manager.update_event(
         event_id=event_id,
@@ -296,7 +492,10 @@ def api_update_event(event_id):
         linked_child_id=data.get('child_id') if not unlink_child else None,
         unlink_user=unlink_user,
         unlink_child=unlink_child,
-        timezone=tz
+        timezone=tz,
+        # "recurrence_rule": null stops the series recurring
+        recurrence_rule='' if 'recurrence_rule' in data and data['recurrence_rule'] is None else data.get('recurrence_rule'),
+        recurrence_exdates=data.get('exdates')
     )
     if updated_event_obj:
         return jsonify(updated_event_obj.to_dict(timezone=tz)), 200
@@ -338,13 +537,17 @@ def api_get_task_details(task_id):
 
 @app.route('/users/<int:user_id>/tasks', methods=['GET'])
 def api_get_user_tasks(user_id):
-    tasks_list = task_manager.get_tasks_for_user(user_id)
-    return jsonify([t.to_dict(include_user=False) for t in tasks_list]), 200
+    limit, cursor = _page_args()
+    try:
+        tasks_list = task_manager.get_tasks_for_user(user_id, limit, cursor, load=loading.TASK_LINKS_FOR_USER)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    return _paged_response(tasks_list, [t.to_dict(include_user=False) for t in tasks_list])
 
 
 @app.route('/events/<int:event_id>/tasks', methods=['GET'])
 def api_get_event_tasks(event_id):
-    tasks_list = task_manager.get_tasks_for_event(event_id)
+    tasks_list = task_manager.get_tasks_for_event(event_id, load=loading.TASK_LINKS_FOR_EVENT)
     return jsonify([t.to_dict(include_event=False) for t in tasks_list]), 200
 
 
@@ -384,6 +587,72 @@ def api_delete_task(task_id):
 
 @app.route('/institutions', methods=['POST'])
 def api_create_institution():
+    data = request.get_json()
+    if not data or 'name' not in data:
+        return jsonify(message=_("Missing institution name")), 400
+
+    db = get_session()
+    try:
+        new_institution = institution.Institution(name=data['name'], type=data.get('type'),
+                                                  api_key=secrets.token_hex(16))
+        db.add(new_institution)
+        db.commit()
+        db.refresh(new_institution)
+        # The API key is only returned here, to the caller registering the institution
+        return jsonify({**new_institution.to_dict(), "api_key": new_institution.api_key}), 201
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"SQLAlchemyError creating institution: {e}")
+        return jsonify(message=_("Database error creating institution.")), 500
+    finally:
+        db.close()
+
+@app.route('/children/<int:child_id>/institutions/<int:institution_id>/consent', methods=['POST'])
+def api_grant_consent(child_id, institution_id):
+    db = get_session()
+    try:
+        if not db.get(child.Child, child_id) or not queries.get_institution(db, institution_id):
+            return jsonify(message=_("Child or institution not found")), 404
+        record = db.query(consent.Consent).filter_by(child_id=child_id, institution_id=institution_id).first()
+        if record:
+            record.approved = True
+        else:
+            record = consent.Consent(child_id=child_id, institution_id=institution_id, approved=True)
+            db.add(record)
+        db.commit()
+        db.refresh(record)
+        return jsonify(record.to_dict()), 201
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"SQLAlchemyError granting consent: {e}")
+        return jsonify(message=_("Database error granting consent.")), 500
+    finally:
+        db.close()
+
+@app.route('/children/<int:child_id>/institutions/<int:institution_id>/consent', methods=['DELETE'])
+def api_revoke_consent(child_id, institution_id):
+    db = get_session()
+    try:
+        record = db.query(consent.Consent).filter_by(child_id=child_id, institution_id=institution_id).first()
+        if not record:
+            return jsonify(message="Consent not found"), 404
+        record.approved = False
+        db.commit()
+        return jsonify(message="Consent revoked"), 200
+    finally:
+        db.close()
+
+def _has_consent(child_id, institution_id):
+    db = get_session(readonly=True)
+    consent_record = db.query(consent.Consent).filter_by(child_id=child_id, institution_id=institution_id,
+                                                         approved=True).first()
+    db.close()
+    return consent_record is not None
+
+# --- Shift Pattern API Endpoints ---
+
+@app.route('/shift-patterns', methods=['POST'])
+def api_create_global_shift_pattern():
     data = request.get_json()
     if not data or not all(k in data for k in ("name", "pattern_type", "definition")):
         return jsonify(message=_("Missing name, pattern_type, or definition")), 400
@@ -393,7 +662,8 @@ def api_create_institution():
         description=data.get('description'),
         pattern_type=data['pattern_type'],
         definition=data['definition'],
-        user_id=None # Global pattern
+        user_id=None,  # Global pattern
+        holiday_calendar_id=data.get('holiday_calendar_id')
     )
     if pattern:
         return jsonify(pattern.to_dict()), 201
@@ -406,7 +676,7 @@ def api_create_user_shift_pattern(user_id):
         return jsonify(message=_("Missing name, pattern_type, or definition")), 400
 
     # Optional: Validate user_id exists
-    db = SessionLocal()
+    db = get_session()
     target_user = db.query(user.User).filter(user.User.id == user_id).first()
     db.close()
     if not target_user:
@@ -417,12 +687,18 @@ def api_create_user_shift_pattern(user_id):
         description=data.get('description'),
         pattern_type=data['pattern_type'],
         definition=data['definition'],
-        user_id=user_id
+        user_id=user_id,
+        holiday_calendar_id=data.get('holiday_calendar_id')
     )
     if pattern:
         return jsonify(pattern.to_dict()), 201
     return jsonify(message=_("Failed to create user-specific shift pattern")), 400
 
+@app.route('/users/<int:user_id>/shift-patterns', methods=['GET'])
+def api_get_user_shift_patterns(user_id):
+    patterns = shift_pattern_manager.get_shift_patterns_for_user(user_id)
+    return jsonify([p.to_dict() for p in patterns]), 200
+
 @app.route('/shift-patterns/<int:pattern_id>', methods=['GET'])
 def api_get_shift_pattern(pattern_id):
     pattern = shift_pattern_manager.get_shift_pattern(pattern_id)
@@ -432,12 +708,16 @@ def api_get_shift_pattern(pattern_id):
 
 @app.route('/shift-patterns', methods=['GET'])
 def api_get_global_shift_patterns():
-    patterns = shift_pattern_manager.get_global_shift_patterns()
-    return jsonify([p.to_dict() for p in patterns]), 200
+    limit, cursor = _page_args()
+    try:
+        patterns = shift_pattern_manager.get_global_shift_patterns(limit, cursor)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    return _paged_response(patterns, [p.to_dict() for p in patterns])
 
 def _verify_institution_api_key(inst_id, provided_key):
-    db = SessionLocal()
-    inst = db.query(institution.Institution).filter_by(id=inst_id).first()
+    db = get_session(readonly=True)
+    inst = queries.get_institution(db, inst_id)
     db.close()
     if not inst or inst.api_key != provided_key:
         return None
@@ -450,6 +730,62 @@ def api_institution_push_event(institution_id):
     if not inst:
         return jsonify(message="Unauthorized"), 401
 
+    data = request.get_json()
+    if not data or not all(k in data for k in ("title", "start_time", "end_time", "child_id")):
+        return jsonify(message=_("Missing title, start_time, end_time or child_id")), 400
+    if not _has_consent(data['child_id'], institution_id):
+        return jsonify(message="No consent for child"), 403
+
+    new_event = event_manager.create_event(
+        title=data['title'],
+        description=data.get('description'),
+        start_time_str=data['start_time'],
+        end_time_str=data['end_time'],
+        linked_child_id=data['child_id'],
+        institution_id=institution_id
+    )
+    if new_event:
+        return jsonify(new_event.to_dict()), 201
+    return jsonify(message=_("Failed to create event")), 400
+
+@app.route('/institutions/<int:institution_id>/treatment-plans', methods=['POST'])
+def api_institution_push_treatment(institution_id):
+    key = request.headers.get('X-API-Key')
+    inst = _verify_institution_api_key(institution_id, key)
+    if not inst:
+        return jsonify(message="Unauthorized"), 401
+
+    data = request.get_json()
+    if not data or not all(k in data for k in ("child_id", "description")):
+        return jsonify(message=_("Missing child_id or description")), 400
+    if not _has_consent(data['child_id'], institution_id):
+        return jsonify(message="No consent for child"), 403
+
+    db = get_session()
+    try:
+        plan = treatment_plan.TreatmentPlan(
+            child_id=data['child_id'],
+            institution_id=institution_id,
+            description=data['description'],
+            start_date=date.fromisoformat(data['start_date']) if data.get('start_date') else None,
+            end_date=date.fromisoformat(data['end_date']) if data.get('end_date') else None
+        )
+        db.add(plan)
+        db.commit()
+        db.refresh(plan)
+        return jsonify(plan.to_dict()), 201
+    except ValueError:
+        db.rollback()
+        return jsonify(message=_("Invalid date format. Please use YYYY-MM-DD.")), 400
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"SQLAlchemyError adding treatment plan: {e}")
+        return jsonify(message=_("Database error adding treatment plan.")), 500
+    finally:
+        db.close()
+
+@app.route('/shift-patterns/<int:pattern_id>', methods=['PUT'])
+def api_update_shift_pattern(pattern_id):
     data = request.get_json()
     if not data:
         return jsonify(message=_("No data provided for update")), 400
@@ -472,12 +808,113 @@ def api_institution_push_event(institution_id):
         name=data.get('name'),
         description=data.get('description'),
         pattern_type=data.get('pattern_type'),
-        definition=data.get('definition')
+        definition=data.get('definition'),
+        regenerate=bool(data.get('regenerate', False)),
+        holiday_calendar_id=data.get('holiday_calendar_id')
     )
     if updated_pattern:
         return jsonify(updated_pattern.to_dict()), 200
     return jsonify(message=_("Shift pattern not found or update failed")), 404 # Or 400
 
+# --- Holiday Calendar API Endpoints ---
+
+@app.route('/holiday-calendars', methods=['POST'])
+def api_create_holiday_calendar():
+    data = request.get_json()
+    if not data or not all(k in data for k in ("name", "rules")):
+        return jsonify(message=_("Missing name or rules")), 400
+    holiday_calendar = holiday_calendar_manager.create_holiday_calendar(
+        name=data['name'], rules=data['rules'], region=data.get('region'), employer=data.get('employer'),
+        start_year=data.get('start_year'), end_year=data.get('end_year'))
+    if holiday_calendar:
+        return jsonify(holiday_calendar.to_dict()), 201
+    return jsonify(message=_("Failed to create holiday calendar")), 400
+
+@app.route('/holiday-calendars', methods=['GET'])
+def api_get_holiday_calendars():
+    calendars = holiday_calendar_manager.get_holiday_calendars(region=request.args.get('region'),
+                                                               employer=request.args.get('employer'))
+    return jsonify([c.to_dict() for c in calendars]), 200
+
+@app.route('/holiday-calendars/<int:calendar_id>', methods=['GET'])
+def api_get_holiday_calendar(calendar_id):
+    holiday_calendar = holiday_calendar_manager.get_holiday_calendar(calendar_id)
+    if holiday_calendar:
+        return jsonify(holiday_calendar.to_dict()), 200
+    return jsonify(message=_("Holiday calendar not found")), 404
+
+@app.route('/holiday-calendars/<int:calendar_id>', methods=['PUT'])
+def api_update_holiday_calendar(calendar_id):
+    data = request.get_json()
+    if not data:
+        return jsonify(message=_("No data provided for update")), 400
+    holiday_calendar = holiday_calendar_manager.update_holiday_calendar(
+        calendar_id, name=data.get('name'), rules=data.get('rules'), region=data.get('region'),
+        employer=data.get('employer'), start_year=data.get('start_year'), end_year=data.get('end_year'))
+    if holiday_calendar:
+        return jsonify(holiday_calendar.to_dict()), 200
+    return jsonify(message=_("Holiday calendar not found or update failed")), 404
+
+@app.route('/holiday-calendars/<int:calendar_id>', methods=['DELETE'])
+def api_delete_holiday_calendar(calendar_id):
+    if holiday_calendar_manager.delete_holiday_calendar(calendar_id):
+        return jsonify(message=_("Holiday calendar deleted successfully")), 200
+    return jsonify(message=_("Holiday calendar not found or delete failed")), 404
+
+@app.route('/users/<int:user_id>/holiday-calendar', methods=['PUT'])
+def api_set_user_holiday_calendar(user_id):
+    data = request.get_json()
+    if data is None or 'holiday_calendar_id' not in data:
+        return jsonify(message=_("Missing holiday_calendar_id")), 400
+    updated_user = holiday_calendar_manager.set_user_holiday_calendar(user_id, data['holiday_calendar_id'])
+    if updated_user:
+        return jsonify(updated_user.to_dict()), 200
+    return jsonify(message=_("User or holiday calendar not found")), 404
+
+@app.route('/shift-patterns/<int:pattern_id>/roster', methods=['POST'])
+def api_generate_roster(pattern_id):
+    data = request.get_json()
+    if not data or not all(k in data for k in ("assignments", "start_date", "end_date")):
+        return jsonify(message=_("Missing assignments, start_date or end_date in request")), 400
+    try:
+        summary = roster.generate_roster(
+            pattern_id, roster.parse_assignments(data['assignments']), data['start_date'], data['end_date'],
+            holidays=data.get('holidays'), timezone=data.get('timezone', 'UTC'),
+            regenerate=bool(data.get('regenerate', False)))
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    if summary is None:
+        return jsonify(message=_("Database error during roster generation.")), 500
+    return jsonify(summary), 201
+
+@app.route('/users/<int:user_id>/shift-patterns/<int:pattern_id>/assign', methods=['POST'])
+def api_assign_shift_pattern(user_id, pattern_id):
+    # The pattern's shifts are computed when the user's shifts are read, not stored
+    data = request.get_json()
+    if not data or 'start_date' not in data:
+        return jsonify(message=_("Missing start_date in request")), 400
+    try:
+        offset = int(data.get('offset', 0))
+    except (TypeError, ValueError):
+        return jsonify(message=_("offset must be an integer")), 400
+    assignment = shift_pattern_manager.assign_shift_pattern(
+        user_id, pattern_id, data['start_date'], data.get('end_date'), offset=offset,
+        timezone=data.get('timezone', 'UTC'), exceptions=data.get('exceptions'))
+    if assignment:
+        return jsonify(assignment.to_dict()), 201
+    return jsonify(message=_("Could not assign shift pattern")), 400
+
+@app.route('/users/<int:user_id>/pattern-assignments', methods=['GET'])
+def api_get_pattern_assignments(user_id):
+    assignments = shift_pattern_manager.get_pattern_assignments_for_user(user_id)
+    return jsonify([a.to_dict() for a in assignments]), 200
+
+@app.route('/pattern-assignments/<int:assignment_id>', methods=['DELETE'])
+def api_delete_pattern_assignment(assignment_id):
+    if shift_pattern_manager.delete_pattern_assignment(assignment_id):
+        return jsonify(message=_("Pattern assignment deleted successfully")), 200
+    return jsonify(message=_("Pattern assignment not found or delete failed")), 404
+
 @app.route('/shift-patterns/<int:pattern_id>', methods=['DELETE'])
 def api_delete_shift_pattern(pattern_id):
     # Similar ownership/admin check as in PUT would be needed here.
@@ -502,9 +939,18 @@ def api_generate_shifts_from_pattern(user_id, pattern_id):
     end_date_str = data['end_date']
     holidays = data.get('holidays')
     exceptions = data.get('exceptions')
+    bulk = bool(data.get('bulk', False)) # Batch insert; results are already plain dicts
 
-    db = SessionLocal()
+    db = get_session()
     try:
+        if data.get('regenerate'):
+            # Idempotent: only the differences from the existing shifts are written
+            summary = shift_pattern_manager.regenerate_shifts_from_pattern(
+                db, pattern_id, user_id, start_date_str, end_date_str,
+                holidays=holidays, exceptions=exceptions, timezone=data.get('timezone', 'UTC'))
+            db.commit()
+            shift_pattern_manager.notify_regenerated(user_id, pattern_id, summary)
+            return jsonify(summary), 200
         created_shifts = shift_pattern_manager.generate_shifts_from_pattern(
             db_session=db,
             pattern_id=pattern_id,
@@ -512,9 +958,12 @@ def api_generate_shifts_from_pattern(user_id, pattern_id):
             start_date_str=start_date_str,
             end_date_str=end_date_str,
             holidays=holidays,
-            exceptions=exceptions
+            exceptions=exceptions,
+            bulk=bulk
         )
         db.commit() # Commit here after successful generation
+        if bulk:
+            return jsonify(created_shifts), 201
         return jsonify([s.to_dict(include_source_pattern_details=True) for s in created_shifts]), 201
     except ValueError as ve:
         db.rollback()
@@ -530,8 +979,6 @@ def api_generate_shifts_from_pattern(user_id, pattern_id):
         return jsonify(message=_("An unexpected error occurred during shift generation.")), 500
     finally:
         db.close()
-        if not consent_record:
-            return jsonify(message="No consent for child"), 403
 
 @app.route('/shift-swaps', methods=['POST', 'PUT'])
 def api_shift_swaps():
@@ -577,8 +1024,12 @@ def api_add_grocery_item():
 @app.route('/grocery-items', methods=['GET'])
 def api_get_grocery_items():
     user_id = request.args.get('user_id', type=int)
-    items = grocery_manager.get_items(user_id=user_id)
-    return jsonify([i.to_dict() for i in items]), 200
+    limit, cursor = _page_args()
+    try:
+        items = grocery_manager.get_items(user_id=user_id, limit=limit, cursor=cursor)
+    except ValueError as ve:
+        return jsonify(message=str(ve)), 400
+    return _paged_response(items, [i.to_dict() for i in items])
 
 
 @app.route('/grocery-items/<int:item_id>', methods=['PUT'])
@@ -608,6 +1059,16 @@ def api_delete_grocery_item(item_id):
 
 # --- Web Page Routes (HTML) ---
 
+def _view_window():
+    """The window a calendar page shows: ?start=&end= if given, else the default around today."""
+    default_start, default_end = time_window.default_view_window()
+    try:
+        start, end = _window_args()
+    except ValueError:
+        flash('Invalid date range; showing the default range.', 'warning')
+        return default_start, default_end
+    return start or default_start, end or default_end
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -631,7 +1092,7 @@ def register():
             flash(f'Welcome, {new_user.name}! You have been successfully registered and logged in.', 'success')
             return redirect(url_for('index'))
         else:
-            db_s = SessionLocal()
+            db_s = get_session()
             existing = db_s.query(user.User).filter(user.User.email == email).first()
             db_s.close()
             if existing:
@@ -696,9 +1157,10 @@ def shifts_view():
         return redirect(url_for('login'))
 
     user_id = session['user_id']
-    user_shifts = shift_manager.get_user_shifts(user_id=user_id) # Managers handle their own sessions
+    window_start, window_end = _view_window()
+    user_shifts = shift_manager.get_user_shifts(user_id=user_id, start=window_start, end=window_end) # Managers handle their own sessions
 
-    return render_template('shifts.html', shifts=user_shifts)
+    return render_template('shifts.html', shifts=user_shifts, window_start=window_start, window_end=window_end)
 
 @app.route('/shifts/add', methods=['POST'])
 def add_shift():
@@ -722,9 +1184,8 @@ def add_shift():
         flash('Invalid datetime format submitted.', 'danger')
         return redirect(url_for('shifts_view'))
 
-    db_tz = SessionLocal()
-    tz_user = db_tz.query(user.User).filter(user.User.id == user_id).first()
-    timezone_pref = tz_user.timezone if tz_user and tz_user.timezone else 'UTC'
+    db_tz = get_session(readonly=True)
+    timezone_pref = queries.get_user_timezone(db_tz, user_id)
     db_tz.close()
     new_shift = shift_manager.add_shift(
         user_id=user_id,
@@ -756,16 +1217,13 @@ def events_view():
 
     user_id = session['user_id']
     # Managers handle their own DB sessions
-    user_events = event_manager.get_events_for_user(user_id=user_id)
+    window_start, window_end = _view_window()
+    user_events = event_manager.get_events_for_user(user_id=user_id, start=window_start, end=window_end,
+                                                    load=loading.EVENT_CHILD)
     user_children = child_manager.get_user_children(user_id=user_id) # For the dropdown
 
-    # Enhance event objects with child names if linked
-    # This is a bit inefficient here; ideally, a JOIN in the query or a method in the model would do this.
-    # For now, let's try to add child names if a child_id exists for simplicity in template.
-    # This is not ideal as it leads to N+1 queries if not careful or if ORM doesn't auto-load.
-    # event_manager.get_events_for_user already returns Event objects with child relationship loaded if accessed.
-
-    return render_template('events.html', events=user_events, children=user_children)
+    return render_template('events.html', events=user_events, children=user_children,
+                           window_start=window_start, window_end=window_end)
 
 @app.route('/events/add-web', methods=['POST'])
 def add_event_web():
@@ -806,9 +1264,8 @@ def add_event_web():
 
     # Events created via web are always linked to the current user.
     # event_manager.create_event handles its own DB session.
-    db_tz = SessionLocal()
-    tz_user = db_tz.query(user.User).filter(user.User.id == user_id).first()
-    timezone_pref = tz_user.timezone if tz_user and tz_user.timezone else 'UTC'
+    db_tz = get_session(readonly=True)
+    timezone_pref = queries.get_user_timezone(db_tz, user_id)
     db_tz.close()
     new_event = event_manager.create_event(
         title=title,
@@ -838,7 +1295,7 @@ def tasks_view():
         return redirect(url_for('login'))
 
     user_id = session['user_id']
-    user_tasks = task_manager.get_tasks_for_user(user_id=user_id)
+    user_tasks = task_manager.get_tasks_for_user(user_id=user_id, load=loading.TASK_LINKS_FOR_USER)
     user_events = event_manager.get_events_for_user(user_id=user_id)
     return render_template('tasks.html', tasks=user_tasks, events=user_events)
 
@@ -900,9 +1357,13 @@ def expenses_view():
         return redirect(url_for('login'))
 
     user_id = session['user_id']
-    expenses_list = expense_manager.get_all_expenses()
+    try:
+        expenses_list = expense_manager.get_all_expenses(*_page_args(), load=loading.EXPENSE_CHILD)
+    except ValueError:
+        return redirect(url_for('expenses_view'))
     children = child_manager.get_user_children(user_id=user_id)
-    return render_template('expenses.html', expenses=expenses_list, children=children)
+    return render_template('expenses.html', expenses=expenses_list, children=children,
+                           next_cursor=expenses_list.next_cursor)
 
 
 @app.route('/expenses', methods=['POST'])
@@ -952,19 +1413,38 @@ def children_view():
     user_id = session['user_id']
     # child_manager.get_user_children expects user_id and handles its own DB session
     user_children = child_manager.get_user_children(user_id=user_id)
+    return render_template('children.html', children=user_children)
 
-@app.route('/institutions/<int:institution_id>/treatment-plans', methods=['POST'])
-def api_institution_push_treatment(institution_id):
-    key = request.headers.get('X-API-Key')
-    inst = _verify_institution_api_key(institution_id, key)
-    if not inst:
-        return jsonify(message="Unauthorized"), 401
+@app.route('/children/add-web', methods=['POST'])
+def add_child_web():
+    if 'user_id' not in session:
+        flash('Please login to add a child.', 'warning')
+        return redirect(url_for('login'))
+
+    name = request.form.get('name')
+    date_of_birth = request.form.get('date_of_birth')
+    if not name or not date_of_birth:
+        flash('Name and date of birth are required.', 'danger')
+        return redirect(url_for('children_view'))
+
+    new_child = child_manager.add_child(user_id=session['user_id'], name=name, date_of_birth_str=date_of_birth,
+                                        school_info=request.form.get('school_info'))
+    if new_child:
+        flash('Child added successfully!', 'success')
+    else:
+        flash('Failed to add child. Please check your input or try again.', 'danger')
+    return redirect(url_for('children_view'))
 
+
+# --- ResidencyPeriod API Endpoints ---
+
+@app.route('/children/<int:child_id>/residency-periods', methods=['POST'])
+def api_add_residency_period(child_id):
     data = request.get_json()
     if not data or not all(k in data for k in ("parent_id", "start_datetime", "end_datetime")):
         return jsonify(message=_("Missing parent_id, start_datetime, or end_datetime")), 400
 
-    db = SessionLocal()
+    db = get_session()
     try:
         # The child_manager functions now expect db_session as the first argument
         new_period = child_manager.add_residency_period(
@@ -991,14 +1471,13 @@ def api_institution_push_treatment(institution_id):
         return jsonify(message=_("An unexpected error occurred.")), 500
     finally:
         db.close()
-        return jsonify(message="No consent for child"), 403
 
 @app.route('/children/<int:child_id>/residency-periods', methods=['GET'])
 def api_get_residency_periods_for_child(child_id):
     start_date_filter = request.args.get('start_date') # YYYY-MM-DD
     end_date_filter = request.args.get('end_date')     # YYYY-MM-DD
 
-    db = SessionLocal()
+    db = get_session()
     try:
         # Validate child_id exists
         target_child = db.query(child.Child).filter(child.Child.id == child_id).first()
@@ -1009,7 +1488,8 @@ def api_get_residency_periods_for_child(child_id):
             db_session=db,
             child_id=child_id,
             start_filter_date_str=start_date_filter,
-            end_filter_date_str=end_date_filter
+            end_filter_date_str=end_date_filter,
+            load=loading.RESIDENCY_PARENT
         )
         return jsonify([p.to_dict() for p in periods]), 200
     except Exception as e: # Catch-all for unexpected errors
@@ -1018,9 +1498,9 @@ def api_get_residency_periods_for_child(child_id):
     finally:
         db.close()
 
-@app.route('/children/<int:child_id>/institutions/<int:institution_id>/consent', methods=['POST'])
-def api_grant_consent(child_id, institution_id):
-    db = SessionLocal()
+@app.route('/residency-periods/<int:period_id>', methods=['GET'])
+def api_get_residency_period(period_id):
+    db = get_session()
     try:
         period = child_manager.get_residency_period_details(db_session=db, period_id=period_id)
         if period:
@@ -1035,12 +1515,16 @@ def api_update_residency_period(period_id):
     if not data:
         return jsonify(message=_("No data provided for update")), 400
 
-@app.route('/children/<int:child_id>/institutions/<int:institution_id>/consent', methods=['DELETE'])
-def api_revoke_consent(child_id, institution_id):
-    db = SessionLocal()
-    record = db.query(consent.Consent).filter_by(child_id=child_id, institution_id=institution_id).first()
-    if record:
-        record.approved = False
+    db = get_session()
+    try:
+        updated_period = child_manager.update_residency_period(
+            db_session=db,
+            period_id=period_id,
+            parent_id=data.get('parent_id'),
+            start_datetime_str=data.get('start_datetime'),
+            end_datetime_str=data.get('end_datetime'),
+            notes=data.get('notes')
+        )
         db.commit()
         db.refresh(updated_period)
         return jsonify(updated_period.to_dict()), 200
@@ -1057,13 +1541,10 @@ def api_revoke_consent(child_id, institution_id):
         return jsonify(message=_("An unexpected error occurred.")), 500
     finally:
         db.close()
-        return jsonify(message="Consent revoked"), 200
-    db.close()
-    return jsonify(message="Consent not found"), 404
 
 @app.route('/residency-periods/<int:period_id>', methods=['DELETE'])
 def api_delete_residency_period(period_id):
-    db = SessionLocal()
+    db = get_session()
     try:
         success = child_manager.delete_residency_period(db_session=db, period_id=period_id)
         if success:
@@ -1089,7 +1570,7 @@ def api_propose_residency_change(period_id):
     if not data:
         return jsonify(message="No change data provided"), 400
 
-    db = SessionLocal()
+    db = get_session()
     try:
         period = child_manager.get_residency_period_details(db_session=db, period_id=period_id)
         if not period:
@@ -1112,7 +1593,7 @@ def api_propose_residency_change(period_id):
 
 @app.route('/residency-periods/<int:period_id>/accept-change', methods=['POST'])
 def api_accept_residency_change(period_id):
-    db = SessionLocal()
+    db = get_session()
     try:
         period = child_manager.get_residency_period_details(db_session=db, period_id=period_id)
         if not period:
@@ -1142,7 +1623,7 @@ def api_accept_residency_change(period_id):
 
 @app.route('/residency-periods/<int:period_id>/decline-change', methods=['POST'])
 def api_decline_residency_change(period_id):
-    db = SessionLocal()
+    db = get_session()
     try:
         period = child_manager.get_residency_period_details(db_session=db, period_id=period_id)
         if not period:
@@ -1168,7 +1649,7 @@ def api_get_child_residency_on_date(child_id):
     if not date_param:
         return jsonify(message=_("Missing 'date' query parameter (YYYY-MM-DD)")), 400
 
-    db = SessionLocal()
+    db = get_session()
     try:
         # Validate child_id exists
         target_child = db.query(child.Child).filter(child.Child.id == child_id).first()
@@ -1201,6 +1682,7 @@ def api_get_child_residency_on_date(child_id):
 
 @app.route('/users/<int:user_id>/calendar/sync', methods=['POST'])
 def api_sync_calendar(user_id):
+    from src import calendar_sync # Deferred: pulls in the Google API client libraries
     events = calendar_sync.sync_user_calendar(user_id)
     return jsonify(message="Calendar synced", events=len(events)), 200
 
@@ -0,0 +1,82 @@
+"""Report per-module import cost for the app and CLI entry points.
+
+Runs each target in a fresh interpreter with ``python -X importtime`` and
+prints the slowest modules by cumulative import time, so regressions in
+worker spawn / CLI start-up time are easy to spot.
+
+Usage:
+    python benchmarks/import_time.py                # src, main and app
+    python benchmarks/import_time.py src.event_manager --top 15
+    python benchmarks/import_time.py app --fail-above-ms 400
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_TARGETS = ['src', 'main', 'app']
+
+
+def measure_imports(target):
+    """Import `target` in a subprocess; return (rows, error) with rows of (self_us, cumulative_us, module)."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = REPO_ROOT + os.pathsep + env.get('PYTHONPATH', '')
+    env.setdefault('TEST_MODE_ENABLED', '1') # Never touch a real database file
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    rows = []
+    error_lines = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            error_lines.append(line)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue # Header line
+        rows.append((int(fields[0]), int(fields[1]), fields[2].rstrip()))
+    error = None
+    if proc.returncode != 0:
+        error = error_lines[-1] if error_lines else f'exit code {proc.returncode}'
+    return rows, error
+
+
+def report(target, top):
+    rows, error = measure_imports(target)
+    print(f'\n== import {target} ==')
+    if error:
+        print(f'  (import failed: {error})')
+    if not rows:
+        return 0
+    total_us = rows[-1][1] # The target itself is the last, outermost entry
+    print(f'  total: {total_us / 1000:.1f} ms across {len(rows)} modules')
+    print(f'  {"cumulative ms":>13}  {"self ms":>8}  module')
+    for self_us, cumulative_us, module in sorted(rows, key=lambda r: r[1], reverse=True)[:top]:
+        print(f'  {cumulative_us / 1000:13.1f}  {self_us / 1000:8.1f}  {module}')
+    return total_us
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('targets', nargs='*', default=DEFAULT_TARGETS,
+                        help='modules to import (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=20, help='number of modules to list per target')
+    parser.add_argument('--fail-above-ms', type=float, default=None,
+                        help='exit non-zero if any target takes longer than this to import')
+    args = parser.parse_args(argv)
+
+    slow_targets = []
+    for target in args.targets:
+        total_us = report(target, args.top)
+        if args.fail_above_ms is not None and total_us / 1000 > args.fail_above_ms:
+            slow_targets.append(target)
+    if slow_targets:
+        print(f'\nImport time above {args.fail_above_ms} ms: {", ".join(slow_targets)}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
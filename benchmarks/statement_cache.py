@@ -0,0 +1,75 @@
+"""Compare hot-path lookups via db.query() against the cached statements in src/queries.py.
+
+Runs each lookup many times against a seeded in-memory database and prints the
+average cost per call, so the saving from skipping Query construction and
+statement compilation is visible.
+
+Usage:
+    python benchmarks/statement_cache.py
+    python benchmarks/statement_cache.py --iterations 50000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ['TEST_MODE_ENABLED'] = '1' # Never touch a real database file
+
+from src.database import initialize_database_for_application, create_tables, SessionLocal
+from src import queries
+from src.event import Event
+from src.institution import Institution
+from src.user import User
+
+
+def seed(db):
+    db.add_all([User(name=f'User {i}', email=f'user{i}@example.com', timezone='Europe/Oslo')
+                for i in range(1, 101)])
+    db.add(Institution(name='School', type='school', api_key='key'))
+    db.flush()
+    db.add(Event(title='Event', user_id=1))
+    db.commit()
+
+
+def lookups(db):
+    """(name, ORM query version, cached statement version) for each hot lookup."""
+    return [
+        ('user by id',
+         lambda: db.query(User).filter(User.id == 42).first(),
+         lambda: queries.get_user(db, 42)),
+        ('user timezone',
+         lambda: (db.query(User).filter(User.id == 42).first().timezone or 'UTC'),
+         lambda: queries.get_user_timezone(db, 42)),
+        ('institution by id',
+         lambda: db.query(Institution).filter_by(id=1).first(),
+         lambda: queries.get_institution(db, 1)),
+        ('event by id',
+         lambda: db.query(Event).filter(Event.id == 1).first(),
+         lambda: queries.get_event(db, 1)),
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000, help='calls per lookup')
+    args = parser.parse_args(argv)
+
+    initialize_database_for_application()
+    create_tables()
+    db = SessionLocal()
+    try:
+        seed(db)
+        print(f'{"lookup":<20} {"db.query() us":>14} {"cached us":>10} {"speed-up":>9}')
+        for name, orm_lookup, cached_lookup in lookups(db):
+            orm_lookup(), cached_lookup() # Warm both caches
+            orm_us = timeit.timeit(orm_lookup, number=args.iterations) / args.iterations * 1e6
+            cached_us = timeit.timeit(cached_lookup, number=args.iterations) / args.iterations * 1e6
+            print(f'{name:<20} {orm_us:14.1f} {cached_us:10.1f} {orm_us / cached_us:8.2f}x')
+    finally:
+        db.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
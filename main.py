@@ -1,4 +1,7 @@
-from src import auth, shift_manager, child_manager, event_manager, calendar_sync, expense_manager
+import sys
+
+from src import auth, shift_manager, child_manager, event_manager, expense_manager
+from src.database import unit_of_work
 
 
 current_user = None # Store User object or user_id
@@ -229,10 +232,63 @@ def handle_view_expenses():
         child_part = f" for child {exp.child_id}" if exp.child_id else ""
         print(f"ID: {exp.id} - {exp.description} - ${exp.amount:.2f}{child_part}")
 
+def run_db_command(command):
+    """Explicit schema commands: `python main.py init|migrate|db-status`."""
+    from src import database
+    database.initialize_database_for_application()
+    if command in ('init', 'migrate'):
+        database.migrate_database(verbose=True)
+        print(database.describe_engine())
+    else:
+        stored = database.read_schema_stamp()
+        expected = database.get_expected_schema_stamp()
+        print(f"Stored schema stamp:   {stored or '(none)'}")
+        print(f"Expected schema stamp: {expected}")
+        print("Schema is up to date." if stored == expected else "Schema is out of date; run `python main.py migrate`.")
+
+def run_import_ics(user_id: str, path: str, timezone: str = 'UTC'):
+    """`python main.py import-ics <user_id> <file.ics> [timezone]`"""
+    from src import database, ics_import
+    database.init_db()
+    with open(path, encoding='utf-8', errors='replace') as ics_file:
+        summary = ics_import.import_ics(int(user_id), ics_file, timezone)
+    if summary is None:
+        print("Import failed.")
+        return
+    print(f"Imported {summary['imported']} events "
+          f"({summary['duplicates']} already present, {summary['skipped']} skipped).")
+
+def run_roster(pattern_id: str, start_date: str, end_date: str, assignments: str, timezone: str = 'UTC',
+               regenerate: bool = False):
+    """`python main.py roster <pattern_id> <start> <end> <user_id[:offset],...|@file> [timezone] [--regenerate]`
+
+    With @file, the file has one user_id[:offset] per line.
+    """
+    from src import database, roster
+    database.init_db()
+    if assignments.startswith('@'):
+        with open(assignments[1:], encoding='utf-8') as assignments_file:
+            items = [line for line in assignments_file if line.strip()]
+    else:
+        items = assignments.split(',')
+    progress = lambda done, total: print(f"  {done}/{total} users written")
+    try:
+        summary = roster.generate_roster(int(pattern_id), roster.parse_assignments(items), start_date, end_date,
+                                         timezone=timezone, regenerate=regenerate, progress=progress)
+    except ValueError as ve:
+        print(f"Error: {ve}")
+        return
+    if summary is None:
+        print("Roster generation failed.")
+        return
+    print(f"Roster for {summary['users']} users: {summary['created']} shifts created, "
+          f"{summary['updated']} updated, {summary['deleted']} deleted.")
+
 def handle_sync_calendar():
     if not current_user:
         print("Error: You must be logged in to sync calendar.")
         return
+    from src import calendar_sync # Deferred: pulls in the Google API client libraries
     # Start OAuth flow if token is missing
     if not getattr(current_user, 'calendar_token', None):
         print("No Google credentials stored. Starting authorization...")
@@ -243,6 +299,24 @@ def handle_sync_calendar():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] in ('init', 'migrate', 'db-status'):
+        run_db_command(sys.argv[1])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'import-ics':
+        if len(sys.argv) < 4:
+            print("Usage: python main.py import-ics <user_id> <file.ics> [timezone]")
+            sys.exit(1)
+        run_import_ics(*sys.argv[2:5])
+        sys.exit(0)
+    if len(sys.argv) > 1 and sys.argv[1] == 'roster':
+        positional = [arg for arg in sys.argv[2:] if not arg.startswith('--')]
+        if len(positional) < 4:
+            print("Usage: python main.py roster <pattern_id> <start_date> <end_date> "
+                  "<user_id[:offset],...|@file> [timezone] [--regenerate]")
+            sys.exit(1)
+        run_roster(*positional[:5], regenerate='--regenerate' in sys.argv)
+        sys.exit(0)
+
     # Initialize the database (create tables if they don't exist)
     # This should ideally be done once. For a CLI app, doing it at startup is okay.
     # For web apps, this is often part of a startup script or migration process.
@@ -261,45 +335,47 @@ if __name__ == "__main__":
     while True:
         choice = display_main_menu()
 
-        if not current_user:
-            if choice == '1':
-                handle_register()
-            elif choice == '2':
-                handle_login()
-            elif choice == '0':
-                print("Exiting.")
-                break
-            else:
-                print("Invalid option or not logged in. Please try again.")
-        else: # User is logged in
-            if choice == '3':
-                handle_add_shift()
-            elif choice == '4':
-                handle_view_my_shifts()
-            elif choice == '5':
-                handle_add_child()
-            elif choice == '6':
-                handle_view_my_children()
-            elif choice == '7':
-                handle_create_event()
-            elif choice == '8':
-                handle_view_my_user_events()
-            elif choice == '9':
-                handle_view_my_child_events()
-            elif choice == '10':
-              handle_sync_calendar()
-            elif choice == '11':
-                handle_add_expense()
-            elif choice == '12':
-                handle_view_expenses()
-            elif choice == '13':
-                auth.logout() # Assuming auth.logout() is defined and handles state
+        # Each menu action runs in one database session and transaction
+        with unit_of_work():
+            if not current_user:
+                if choice == '1':
+                    handle_register()
+                elif choice == '2':
+                    handle_login()
+                elif choice == '0':
+                    print("Exiting.")
+                    break
+                else:
+                    print("Invalid option or not logged in. Please try again.")
+            else: # User is logged in
+                if choice == '3':
+                    handle_add_shift()
+                elif choice == '4':
+                    handle_view_my_shifts()
+                elif choice == '5':
+                    handle_add_child()
+                elif choice == '6':
+                    handle_view_my_children()
+                elif choice == '7':
+                    handle_create_event()
+                elif choice == '8':
+                    handle_view_my_user_events()
+                elif choice == '9':
+                    handle_view_my_child_events()
+                elif choice == '10':
+                  handle_sync_calendar()
+                elif choice == '11':
+                    handle_add_expense()
+                elif choice == '12':
+                    handle_view_expenses()
+                elif choice == '13':
+                    auth.logout() # Assuming auth.logout() is defined and handles state
 
                
-                current_user = None
-                print("Logged out successfully.")
-            elif choice == '0':
-                print("Exiting.")
-                break
-            else:
-                print("Invalid option. Please try again.")
+                    current_user = None
+                    print("Logged out successfully.")
+                elif choice == '0':
+                    print("Exiting.")
+                    break
+                else:
+                    print("Invalid option. Please try again.")
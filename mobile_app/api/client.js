@@ -19,5 +19,12 @@ export default {
       body: JSON.stringify({ email, password }),
     }),
 
-  getUserEvents: (userId) => request(`/users/${userId}/events`),
+  // start/end: ISO dates (YYYY-MM-DD) bounding the visible range
+  getUserEvents: (userId, { start, end } = {}) => {
+    const params = new URLSearchParams();
+    if (start) params.append('start', start);
+    if (end) params.append('end', end);
+    const query = params.toString();
+    return request(`/users/${userId}/events${query ? `?${query}` : ''}`);
+  },
 };
@@ -2,13 +2,26 @@ import React, { useEffect, useState } from 'react';
 import { View, Text, FlatList, StyleSheet } from 'react-native';
 import apiClient from '../api/client';
 
+// Days before and after today to load; older history is not fetched.
+const WINDOW_PAST_DAYS = 7;
+const WINDOW_FUTURE_DAYS = 60;
+
+function isoDateOffset(days) {
+  const d = new Date();
+  d.setDate(d.getDate() + days);
+  return d.toISOString().slice(0, 10);
+}
+
 export default function CalendarScreen({ route }) {
   const { userId } = route.params;
   const [events, setEvents] = useState([]);
 
   useEffect(() => {
     apiClient
-      .getUserEvents(userId)
+      .getUserEvents(userId, {
+        start: isoDateOffset(-WINDOW_PAST_DAYS),
+        end: isoDateOffset(WINDOW_FUTURE_DAYS),
+      })
       .then(setEvents)
       .catch(() => setEvents([]));
   }, [userId]);
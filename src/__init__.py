@@ -1,6 +1,23 @@
+import importlib
+
 # Import models so Base.metadata is populated when create_tables is called
 from . import user, shift, child, event, residency_period
-from . import grocery
+from . import grocery, institution, task, expense, shift_pattern, shift_swap, consent, treatment_plan
+from . import feed_state, span_bounds, pattern_assignment, holiday_calendar, shift_generation
+# Registers the FTS5 tables and triggers to be created along with the searchable tables
+from . import search
+
+# Manager modules are imported on first access (`src.shift_manager` or
+# `from src import shift_manager`) instead of here, so importing the models
+# does not also load every manager and their optional dependencies.
+_LAZY_SUBMODULES = (
+    "auth", "shift_manager", "child_manager", "event_manager", "shift_pattern_manager",
+    "grocery_manager", "task_manager", "expense_manager", "shift_swap_manager",
+    "notification", "calendar_sync", "agenda", "conflicts", "ics_import", "calendar_feed",
+    "roster", "virtual_shifts", "holiday_calendar_manager",
+)
 
-# Import manager modules for convenience (optional)
-from . import auth, shift_manager, child_manager, event_manager, shift_pattern_manager, grocery_manager
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
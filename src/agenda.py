@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+import heapq
+import itertools
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.database import get_session, ReadSessionLocal
+from src.time_window import overlap_conditions
+from src import event_manager, span_bounds, virtual_shifts
+from src.serializers import dumps, local_isoformat, zone, UTC
+from src.event import Event
+from src.residency_period import ResidencyPeriod
+from src.shift import Shift
+from src.task import Task
+from src.user import User
+
+# One time-ordered feed of everything on a user's calendar: their events, their
+# children's events and residency periods, their tasks (by due date) and shifts,
+# stored and computed from their pattern assignments (see virtual_shifts).
+# Each source is one range query on its (owner, time) index, already sorted, and
+# read in batches; heapq.merge interleaves them, so the feed is produced as it is
+# read instead of after loading and sorting the whole range.
+
+# Rows fetched per round trip from each source
+BATCH_SIZE = 200
+# Longest range one request may ask for
+MAX_AGENDA_RANGE = timedelta(days=366)
+# Range returned when none is given
+DEFAULT_AGENDA_RANGE = timedelta(days=7)
+
+# Orders items that start at the same time
+_KIND_ORDER = {'residency': 0, 'shift': 1, 'event': 2, 'task': 3}
+
+def _rows(query, kind, start_attr, end_attr=None):
+    """(start, kind, id, end, obj) for each row of a query already ordered by start."""
+    for obj in query.yield_per(BATCH_SIZE):
+        start = getattr(obj, start_attr)
+        yield start, kind, obj.id, getattr(obj, end_attr) if end_attr else start, obj
+
+def _event_stream(db, owner_filter, start: datetime, end: datetime, lookback: timedelta):
+    """One-off events and expanded recurring series for one owner, in start order.
+
+    `lookback` is the owner's longest event (span_bounds.lookback()).
+    """
+    events = event_manager.iter_window(db.query(Event).filter(owner_filter), start, end, lookback,
+                                       batch_size=BATCH_SIZE)
+    return ((event.start_time, 'event', event.id, event.end_time, event) for event in events)
+
+def _sort_key(item):
+    start, kind, item_id = item[0], item[1], item[2]
+    return start, _KIND_ORDER[kind], item_id
+
+def _sources(db, user_id: int, start: datetime, end: datetime):
+    streams = [_event_stream(db, Event.user_id == user_id, start, end,
+                             span_bounds.lookback(db, span_bounds.EVENTS, span_bounds.USER, user_id))]
+
+    shifts = (db.query(Shift)
+              .filter(Shift.user_id == user_id,
+                      *overlap_conditions(Shift.start_time, Shift.end_time, start, end,
+                                          span_bounds.lookback(db, span_bounds.SHIFTS, span_bounds.USER, user_id)))
+              .order_by(Shift.start_time, Shift.id))
+    streams.append(_rows(shifts, 'shift', 'start_time', 'end_time'))
+    # Computed pattern shifts have no id; 0 keeps the sort key comparable
+    streams.append((shift.start_time, 'shift', 0, shift.end_time, shift)
+                   for shift in virtual_shifts.virtual_shifts(db, user_id, start, end))
+
+    # Open and completed tasks are two ranges of the (user_id, completed, due_date) index;
+    # reading them separately keeps each in index order for the merge.
+    for completed in (False, True):
+        tasks = (db.query(Task)
+                 .filter(Task.user_id == user_id, Task.completed == completed,
+                         Task.due_date >= start, Task.due_date < end)
+                 .order_by(Task.due_date, Task.id))
+        streams.append(_rows(tasks, 'task', 'due_date'))
+
+    user = db.query(User).filter(User.id == user_id).first()
+    for child in (user.children if user else []):
+        # Events linked to both the user and the child are already in the user's stream
+        child_filter = and_(Event.child_id == child.id,
+                            or_(Event.user_id.is_(None), Event.user_id != user_id))
+        streams.append(_event_stream(db, child_filter, start, end,
+                                     span_bounds.lookback(db, span_bounds.EVENTS, span_bounds.CHILD, child.id)))
+        periods = (db.query(ResidencyPeriod)
+                   .filter(ResidencyPeriod.child_id == child.id,
+                           ResidencyPeriod.start_datetime < end, ResidencyPeriod.end_datetime > start)
+                   .order_by(ResidencyPeriod.start_datetime, ResidencyPeriod.id))
+        streams.append(_rows(periods, 'residency', 'start_datetime', 'end_datetime'))
+    return streams
+
+def validate_range(start: datetime = None, end: datetime = None, now: datetime = None):
+    """(start, end) with defaults filled in: from today, for DEFAULT_AGENDA_RANGE. Raises ValueError."""
+    if start is None:
+        start = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    if end is None:
+        end = start + DEFAULT_AGENDA_RANGE
+    if end <= start:
+        raise ValueError("The agenda range must end after it starts.")
+    if end - start > MAX_AGENDA_RANGE:
+        raise ValueError(f"The agenda range can be at most {MAX_AGENDA_RANGE.days} days.")
+    return start, end
+
+def iter_agenda(user_id: int, start: datetime, end: datetime):
+    """Yield (kind, start, end, obj) for everything on a user's agenda in [start, end) (naive UTC), in time order.
+
+    `kind` is 'event', 'shift', 'task' or 'residency'; recurring events come as
+    EventOccurrence objects. Tasks have no duration, so their end is their due date.
+    Database errors are raised, not swallowed, so a partial agenda is never taken for a whole one.
+    """
+    db = get_session(readonly=True)
+    try:
+        yield from _merged(db, user_id, start, end)
+    finally:
+        db.close()
+
+def _merged(db, user_id: int, start: datetime, end: datetime):
+    for item_start, kind, _, item_end, obj in heapq.merge(*_sources(db, user_id, start, end), key=_sort_key):
+        yield kind, item_start, item_end, obj
+
+def item_dict(kind: str, item_start: datetime, item_end: datetime, obj, timezone: str = 'UTC'):
+    """One agenda entry as {"type", "start", "end", "item"}, times in `timezone`."""
+    if kind == 'event':
+        item = obj.to_dict(include_user=False, include_child=False, include_institution=False, timezone=timezone)
+    elif kind == 'shift':
+        item = obj.to_dict(include_owner=False, timezone=timezone)
+    elif kind == 'task':
+        item = obj.to_dict(include_user=False, include_event=False)
+    else:
+        item = obj.to_dict(include_parent=False)
+    return {
+        "type": kind,
+        "start": local_isoformat(item_start, timezone),
+        "end": local_isoformat(item_end, timezone),
+        "item": item
+    }
+
+def stream_agenda_json(user_id: int, start: datetime, end: datetime, timezone: str = 'UTC'):
+    """The agenda as a JSON document, returned as an iterator of chunks of one local day each.
+
+    {"from": ..., "to": ..., "items": [{"type", "start", "end", "item"}, ...]}
+
+    The first item is read before this returns, so a database error up to there
+    is raised to the caller while an error status can still be sent. A later one
+    ends the document with an "error" member instead of the closing "]}", so a
+    client can tell a cut-off agenda from a complete one.
+    """
+    # The stream outlives the request's unit of work, so it reads on its own session
+    db = ReadSessionLocal()
+    try:
+        items = _merged(db, user_id, start, end)
+        first = next(items, None)
+    except SQLAlchemyError:
+        db.close()
+        raise
+    return _json_chunks(db, items, first, start, end, timezone)
+
+def _json_chunks(db, items, first, start: datetime, end: datetime, timezone: str):
+    tz = zone(timezone)
+    try:
+        yield '{"from": %s, "to": %s, "items": [' % (dumps(local_isoformat(start, timezone)),
+                                                   dumps(local_isoformat(end, timezone)))
+        chunk, chunk_day, separator = [], None, ''
+        try:
+            for kind, item_start, item_end, obj in itertools.chain([first] if first else [], items):
+                day = item_start.replace(tzinfo=UTC).astimezone(tz).date()
+                if chunk and day != chunk_day:
+                    yield ''.join(chunk)
+                    chunk = []
+                chunk_day = day
+                chunk.append(separator + dumps(item_dict(kind, item_start, item_end, obj, timezone)))
+                separator = ', '
+        except SQLAlchemyError as e:
+            print(f"Database error reading agenda: {e}")
+            chunk.append('], "error": %s}' % dumps("Database error reading agenda; the items are incomplete."))
+        else:
+            chunk.append(']}')
+        yield ''.join(chunk)
+    finally:
+        db.close()
@@ -0,0 +1,75 @@
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+import os
+
+from src import database
+from src.database import Base, get_database_url, get_engine_settings
+
+# Async counterpart of src/database.py for ASGI deployments. It uses the same
+# database, engine settings and SQLite pragmas as the sync engine, through the
+# aiosqlite driver (or ASYNC_DATABASE_URL for another async driver).
+# Note: an in-memory SQLite URL gives the async engine its own, separate database.
+
+async_engine = None
+# Objects returned by the async managers are used after the session closes.
+AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False)
+
+def get_async_database_url(sync_url: str = None):
+    """The async driver URL for the configured database."""
+    if os.environ.get("TEST_MODE_ENABLED") != "1" and os.environ.get("ASYNC_DATABASE_URL"):
+        return os.environ["ASYNC_DATABASE_URL"]
+    sync_url = sync_url or get_database_url()
+    if sync_url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + sync_url[len("sqlite://"):]
+    return sync_url
+
+def create_configured_async_engine(url: str, settings: dict = None):
+    """Async engine factory mirroring database.create_configured_engine()."""
+    settings = settings or get_engine_settings()
+    engine_kwargs = {"pool_pre_ping": settings["pool_pre_ping"]}
+    if not database._is_memory_sqlite(url):
+        engine_kwargs.update(
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"],
+            pool_timeout=settings["pool_timeout"],
+            pool_recycle=settings["pool_recycle"],
+        )
+        if url.startswith("sqlite"):
+            # aiosqlite defaults to NullPool; pool connections so pragmas run once per connection.
+            engine_kwargs["poolclass"] = AsyncAdaptedQueuePool
+
+    new_engine = create_async_engine(url, **engine_kwargs)
+    if url.startswith("sqlite"):
+        database._install_sqlite_pragmas(new_engine.sync_engine, database._sqlite_pragmas(url, settings))
+    return new_engine
+
+def initialize_async_database(settings: dict = None):
+    """Initializes or re-initializes the global async engine and rebinds AsyncSessionLocal."""
+    global async_engine
+
+    current_url = get_async_database_url()
+    if async_engine is None or str(async_engine.url) != current_url or settings is not None:
+        async_engine = create_configured_async_engine(current_url, get_engine_settings(settings))
+        AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+async def dispose_async_database():
+    """Closes pooled async connections (call on ASGI shutdown)."""
+    global async_engine
+    if async_engine is not None:
+        await async_engine.dispose()
+        async_engine = None
+
+async def create_tables_async():
+    """Creates all tables based on Base.metadata using the async engine."""
+    if async_engine is None:
+        initialize_async_database()
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def drop_tables_async():
+    """Drops all tables based on Base.metadata using the async engine."""
+    if async_engine is None:
+        initialize_async_database()
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
@@ -0,0 +1,278 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import selectinload
+
+from src.async_database import AsyncSessionLocal, initialize_async_database
+from src import notification
+from src.child import Child
+from src.event import Event
+from src.shift import Shift
+from src.user import User, user_child_association_table
+from src.child_manager import _build_child
+from src.event_manager import _build_event, _apply_event_updates, _event_message
+from src.shift_manager import _build_shift, _apply_shift_updates, _shift_message
+
+# Async counterparts of the event, shift, child and notification managers for
+# ASGI deployments. Validation and update logic is shared with the sync
+# managers (which the CLI and Flask app keep using); only the I/O differs.
+#
+# Every function takes an optional `db` AsyncSession. Without one it opens and
+# commits its own session; with one it only flushes, so the caller can run
+# several calls in one transaction and commit once.
+
+@asynccontextmanager
+async def _session_scope(db=None):
+    """Yields (session, owned): the caller's session, or a new one this call owns."""
+    if db is not None:
+        yield db, False
+        return
+    if AsyncSessionLocal.kw.get("bind") is None:
+        initialize_async_database()
+    async with AsyncSessionLocal() as session:
+        yield session, True
+
+async def _save(session, owned: bool):
+    if owned:
+        await session.commit()
+    else:
+        await session.flush()
+
+# --- Notifications ---
+
+async def _sse_recipients(session, user_ids):
+    """Of the given users, those who have SSE notifications enabled."""
+    if not user_ids:
+        return []
+    rows = await session.execute(
+        select(User.id).where(User.id.in_(user_ids), User.prefers_sse.is_(True))
+    )
+    return [user_id for (user_id,) in rows]
+
+async def send_notification(user_id: int, message: dict, db=None):
+    """Send a notification to a user if they have SSE enabled."""
+    async with _session_scope(db) as (session, _owned):
+        recipients = await _sse_recipients(session, [user_id])
+    notification._enqueue_many(recipients, message)
+
+async def iter_notifications(user_id: int, poll_interval: float = 0.5):
+    """Async generator of a user's queued notification messages (JSON strings).
+
+    Polls the user's queue without blocking, so an ASGI server can hold many
+    SSE connections on one event loop instead of one thread each.
+    """
+    user_queue = notification.get_user_queue(user_id)
+    while True:
+        try:
+            yield user_queue.get_nowait()
+        except notification.queue.Empty:
+            await asyncio.sleep(poll_interval)
+
+async def _notify_for_event(session, event: Event, message_type: str):
+    """Notify the linked user, or all parents of the linked child, in one query."""
+    if event.user_id:
+        user_ids = [event.user_id]
+    elif event.child_id:
+        rows = await session.execute(
+            select(user_child_association_table.c.user_id)
+            .where(user_child_association_table.c.child_id == event.child_id)
+        )
+        user_ids = [user_id for (user_id,) in rows]
+    else:
+        return
+    notification._enqueue_many(await _sse_recipients(session, user_ids), _event_message(event, message_type))
+
+# --- Events ---
+
+async def create_event(title: str, description: str, start_time_str: str, end_time_str: str,
+                       linked_user_id: int = None, linked_child_id: int = None, timezone: str = 'UTC',
+                       institution_id: int = None, recurrence_rule: str = None,
+                       recurrence_exdates: list = None, db=None):
+    new_event = _build_event(title, description, start_time_str, end_time_str,
+                             linked_user_id, linked_child_id, institution_id, timezone,
+                             recurrence_rule, recurrence_exdates)
+    if not new_event:
+        return None
+    async with _session_scope(db) as (session, owned):
+        try:
+            session.add(new_event)
+            await _save(session, owned)
+            await _notify_for_event(session, new_event, "event_created")
+            return new_event
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"Database error creating event: {e}")
+            return None
+
+async def get_event_details(event_id: int, db=None):
+    async with _session_scope(db) as (session, _owned):
+        try:
+            return await session.get(Event, event_id)
+        except SQLAlchemyError as e:
+            print(f"Database error getting event details: {e}")
+            return None
+
+async def get_events_for_user(user_id: int, db=None):
+    async with _session_scope(db) as (session, _owned):
+        try:
+            result = await session.scalars(select(Event).where(Event.user_id == user_id))
+            return result.all()
+        except SQLAlchemyError as e:
+            print(f"Database error getting events for user: {e}")
+            return []
+
+async def get_events_for_child(child_id: int, db=None):
+    async with _session_scope(db) as (session, _owned):
+        try:
+            result = await session.scalars(select(Event).where(Event.child_id == child_id))
+            return result.all()
+        except SQLAlchemyError as e:
+            print(f"Database error getting events for child: {e}")
+            return []
+
+async def update_event(event_id: int, title: str = None, description: str = None,
+                       start_time_str: str = None, end_time_str: str = None,
+                       linked_user_id: int = None, linked_child_id: int = None,
+                       unlink_user: bool = False, unlink_child: bool = False, timezone: str = 'UTC',
+                       institution_id: int = None, unlink_institution: bool = False,
+                       recurrence_rule: str = None, recurrence_exdates: list = None, db=None):
+    async with _session_scope(db) as (session, owned):
+        try:
+            event = await session.get(Event, event_id)
+            if not event:
+                print("Error: Event not found.")
+                return None
+            updated = _apply_event_updates(event, title, description, start_time_str, end_time_str,
+                                           linked_user_id, linked_child_id, unlink_user, unlink_child,
+                                           timezone, institution_id, unlink_institution,
+                                           recurrence_rule, recurrence_exdates)
+            if updated:
+                await _save(session, owned)
+                await _notify_for_event(session, event, "event_updated")
+            return event
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"Database error updating event: {e}")
+            return None
+
+async def delete_event(event_id: int, db=None):
+    async with _session_scope(db) as (session, owned):
+        try:
+            event = await session.get(Event, event_id)
+            if not event:
+                print("Error: Event not found for deletion.")
+                return False
+            await session.delete(event)
+            await _save(session, owned)
+            return True
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"Database error deleting event: {e}")
+            return False
+
+# --- Shifts ---
+
+async def add_shift(user_id: int, start_time_str: str, end_time_str: str, name: str,
+                    timezone: str = 'UTC', db=None):
+    new_shift = _build_shift(user_id, start_time_str, end_time_str, name, timezone)
+    if not new_shift:
+        return None
+    async with _session_scope(db) as (session, owned):
+        try:
+            session.add(new_shift)
+            await _save(session, owned)
+            await send_notification(user_id, _shift_message(new_shift, "shift_created"), db=session)
+            return new_shift
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"Database error adding shift: {e}")
+            return None
+
+async def get_user_shifts(user_id: int, db=None):
+    async with _session_scope(db) as (session, _owned):
+        try:
+            result = await session.scalars(select(Shift).where(Shift.user_id == user_id))
+            return result.all()
+        except SQLAlchemyError as e:
+            print(f"Database error getting user shifts: {e}")
+            return []
+
+async def update_shift(shift_id: int, new_start_time_str: str = None, new_end_time_str: str = None,
+                       new_name: str = None, timezone: str = 'UTC', db=None):
+    async with _session_scope(db) as (session, owned):
+        try:
+            shift = await session.get(Shift, shift_id)
+            if not shift:
+                print("Error: Shift not found.")
+                return None
+            if _apply_shift_updates(shift, new_start_time_str, new_end_time_str, new_name, timezone):
+                await _save(session, owned)
+                await send_notification(shift.user_id, _shift_message(shift, "shift_updated"), db=session)
+            return shift
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"Database error updating shift: {e}")
+            return None
+
+async def delete_shift(shift_id: int, db=None):
+    async with _session_scope(db) as (session, owned):
+        try:
+            shift = await session.get(Shift, shift_id)
+            if not shift:
+                print("Error: Shift not found for deletion.")
+                return False
+            await session.delete(shift)
+            await _save(session, owned)
+            return True
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"Database error deleting shift: {e}")
+            return False
+
+# --- Children ---
+
+async def add_child(user_id: int, name: str, date_of_birth_str: str, school_info: str = None, db=None):
+    async with _session_scope(db) as (session, owned):
+        try:
+            parent_user = await session.get(User, user_id)
+            if not parent_user:
+                print("Error: Parent user not found.")
+                return None
+            new_child = _build_child(name, date_of_birth_str, school_info)
+            if not new_child:
+                return None
+            new_child.parents.append(parent_user)
+            session.add(new_child)
+            await _save(session, owned)
+            return new_child
+        except SQLAlchemyError as e:
+            await session.rollback()
+            print(f"Database error adding child: {e}")
+            return None
+
+async def get_child_details(child_id: int, db=None):
+    """The child with its parents loaded, so Child.to_dict() works after the session closes."""
+    async with _session_scope(db) as (session, _owned):
+        try:
+            result = await session.scalars(
+                select(Child).options(selectinload(Child.parents)).where(Child.id == child_id)
+            )
+            return result.first()
+        except SQLAlchemyError as e:
+            print(f"Database error getting child details: {e}")
+            return None
+
+async def get_user_children(user_id: int, db=None):
+    async with _session_scope(db) as (session, _owned):
+        try:
+            result = await session.scalars(
+                select(Child)
+                .join(user_child_association_table, user_child_association_table.c.child_id == Child.id)
+                .where(user_child_association_table.c.user_id == user_id)
+            )
+            return result.all()
+        except SQLAlchemyError as e:
+            print(f"Database error getting user children: {e}")
+            return []
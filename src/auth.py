@@ -3,13 +3,13 @@ import hashlib
 from sqlalchemy.orm import Session # Not directly used, but good to know SessionLocal returns this type
 from sqlalchemy.exc import SQLAlchemyError
 
-from src.database import SessionLocal
+from src.database import get_session
 from src.user import User # SQLAlchemy User model
 
 # users_db is removed, data will be stored in SQLite via SQLAlchemy
 
 def register(name, email, password):
-    db = SessionLocal()
+    db = get_session()
     try:
         # Check if user already exists
         existing_user = db.query(User).filter(User.email == email).first()
@@ -41,7 +41,7 @@ def register(name, email, password):
         db.close()
 
 def login(email, password):
-    db = SessionLocal()
+    db = get_session()
     try:
         user = db.query(User).filter(User.email == email).first()
         if not user:
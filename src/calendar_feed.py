@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.database import get_session
+from src import feed_state, span_bounds
+from src.child import Child
+from src.event import Event
+from src.event_manager import _in_window
+from src.residency_period import ResidencyPeriod
+from src.serializers import zone, UTC
+from src.shift import Shift
+from src.time_window import overlapping
+from src.user import User
+from src.virtual_shifts import virtual_shifts
+
+# Subscribable iCalendar feeds (/users/<id>/calendar.ics, /children/<id>/calendar.ics).
+# Calendar apps poll these every few minutes, so validators() answers "has it
+# changed?" from the feed's row in calendar_feed_state alone; only a changed feed
+# is rendered, and then as a stream of VEVENTs read in batches.
+#
+# A user's feed has their events, their shifts and the residency periods in which
+# they are the custodial parent; a child's feed has the child's events and all of
+# their residency periods. Feeds go back FEED_HISTORY from today, so the window
+# start is part of the ETag as well. Shifts computed from the user's pattern
+# assignments are not stored and have no end, so they are listed up to
+# VIRTUAL_SHIFT_HORIZON past the window start.
+
+FEED_HISTORY = timedelta(days=90)
+# Bump when the rendered format changes, so clients do not keep a stale copy
+FEED_FORMAT = 2
+VIRTUAL_SHIFT_HORIZON = timedelta(days=366) + FEED_HISTORY
+PRODID = "-//Family Planner//Calendar Feed//EN"
+BATCH_SIZE = 500
+
+def window_start(now: datetime = None):
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - FEED_HISTORY
+
+def validators(db, owner_type: str, owner_id: int, now: datetime = None):
+    """(etag, last_modified) of a feed, from its calendar_feed_state row only. The ETag is unquoted."""
+    version, modified_at = feed_state.get_state(db, owner_type, owner_id)
+    start = window_start(now)
+    etag = f"{owner_type}-{owner_id}-v{version}-{start:%Y%m%d}-f{FEED_FORMAT}"
+    # Moving the window start also changes the content
+    return etag, max(modified_at, start) if modified_at else start
+
+# --- Rendering ---
+
+def _escape(text: str):
+    return (text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _fold(line: str):
+    """Split a content line into lines of at most 75 octets (RFC 5545 3.1)."""
+    if len(line) <= 75 and line.isascii():
+        return line + '\r\n'
+    parts, current, size = [], '', 0
+    for char in line:
+        char_size = len(char.encode('utf-8'))
+        if size + char_size > 75:
+            parts.append(current)
+            current, size = ' ', 1
+        current += char
+        size += char_size
+    parts.append(current)
+    return '\r\n'.join(parts) + '\r\n'
+
+def _utc(value: datetime):
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+def _vevent(uid: str, dtstamp: datetime, start: datetime, end: datetime, summary: str,
+            description: str = None, extra_lines=()):
+    lines = ['BEGIN:VEVENT', f'UID:{uid}', f'DTSTAMP:{_utc(dtstamp)}']
+    if start is not None:
+        lines.append(f'DTSTART:{_utc(start)}')
+    if end is not None:
+        lines.append(f'DTEND:{_utc(end)}')
+    lines.append(f'SUMMARY:{_escape(summary or "")}')
+    if description:
+        lines.append(f'DESCRIPTION:{_escape(description)}')
+    lines.extend(extra_lines)
+    lines.append('END:VEVENT')
+    return ''.join(_fold(line) for line in lines)
+
+def _event_component(event: Event, dtstamp: datetime):
+    if not event.recurrence_rule:
+        return _vevent(f"event-{event.id}@family-planner", dtstamp, event.start_time, event.end_time,
+                       event.title, event.description)
+    # Series are sent as RRULEs; they step in local time, so their times carry the TZID
+    tzid = event.recurrence_timezone or 'UTC'
+    tz = zone(tzid)
+    local = lambda value: value.replace(tzinfo=UTC).astimezone(tz).strftime('%Y%m%dT%H%M%S')
+    lines = [f'DTSTART;TZID={tzid}:{local(event.start_time)}',
+             f'DTEND;TZID={tzid}:{local(event.end_time)}',
+             f'RRULE:{event.recurrence_rule}']
+    if event.recurrence_exdates:
+        lines.append(f'EXDATE;TZID={tzid}:' + ','.join(
+            local(datetime.fromisoformat(exdate)) for exdate in event.recurrence_exdates))
+    return _vevent(f"event-{event.id}@family-planner", dtstamp, None, None,
+                   event.title, event.description, lines)
+
+def _calendar(name: str, components):
+    yield ''.join(_fold(line) for line in (
+        'BEGIN:VCALENDAR', 'VERSION:2.0', f'PRODID:{PRODID}', 'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{_escape(name)}'))
+    yield from components
+    yield 'END:VCALENDAR\r\n'
+
+def _user_components(db, user_id: int, start: datetime, dtstamp: datetime):
+    events = _in_window(db.query(Event).filter(Event.user_id == user_id), start,
+                        lookback=span_bounds.lookback(db, span_bounds.EVENTS, span_bounds.USER, user_id))
+    for event in events.yield_per(BATCH_SIZE):
+        yield _event_component(event, dtstamp)
+    shifts = overlapping(db.query(Shift).filter(Shift.user_id == user_id), Shift.start_time, Shift.end_time,
+                         start, None, span_bounds.lookback(db, span_bounds.SHIFTS, span_bounds.USER, user_id))
+    for shift in shifts.yield_per(BATCH_SIZE):
+        yield _vevent(f"shift-{shift.id}@family-planner", dtstamp, shift.start_time, shift.end_time,
+                      shift.name)
+    for shift in virtual_shifts(db, user_id, start, start + VIRTUAL_SHIFT_HORIZON):
+        # Stable across renders: one pattern day of one user
+        yield _vevent(f"pattern-{shift.source_pattern_id}-{user_id}-{shift.pattern_date:%Y%m%d}@family-planner",
+                      dtstamp, shift.start_time, shift.end_time, shift.name)
+    periods = (db.query(ResidencyPeriod, Child.name)
+               .join(Child, Child.id == ResidencyPeriod.child_id)
+               .filter(ResidencyPeriod.parent_id == user_id, ResidencyPeriod.end_datetime > start))
+    for period, child_name in periods.yield_per(BATCH_SIZE):
+        yield _vevent(f"residency-{period.id}@family-planner", dtstamp, period.start_datetime,
+                      period.end_datetime, f"{child_name} (residency)", period.notes)
+
+def _child_components(db, child_id: int, start: datetime, dtstamp: datetime):
+    events = _in_window(db.query(Event).filter(Event.child_id == child_id), start,
+                        lookback=span_bounds.lookback(db, span_bounds.EVENTS, span_bounds.CHILD, child_id))
+    for event in events.yield_per(BATCH_SIZE):
+        yield _event_component(event, dtstamp)
+    periods = (db.query(ResidencyPeriod, User.name)
+               .join(User, User.id == ResidencyPeriod.parent_id)
+               .filter(ResidencyPeriod.child_id == child_id, ResidencyPeriod.end_datetime > start))
+    for period, parent_name in periods.yield_per(BATCH_SIZE):
+        yield _vevent(f"residency-{period.id}@family-planner", dtstamp, period.start_datetime,
+                      period.end_datetime, f"With {parent_name}", period.notes)
+
+def _stream(owner_model, owner_id: int, components, last_modified: datetime, now: datetime = None):
+    db = get_session(readonly=True)
+    try:
+        owner = db.get(owner_model, owner_id)
+        if owner is None:
+            return
+        yield from _calendar(owner.name, components(db, owner_id, window_start(now), last_modified))
+    except SQLAlchemyError as e:
+        print(f"Database error rendering calendar feed: {e}")
+    finally:
+        db.close()
+
+def stream_user_feed(user_id: int, last_modified: datetime, now: datetime = None):
+    """The user's feed as .ics text chunks; nothing for an unknown user."""
+    return _stream(User, user_id, _user_components, last_modified, now)
+
+def stream_child_feed(child_id: int, last_modified: datetime, now: datetime = None):
+    """The child's feed as .ics text chunks; nothing for an unknown child."""
+    return _stream(Child, child_id, _child_components, last_modified, now)
@@ -7,7 +7,7 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from sqlalchemy.exc import SQLAlchemyError
 
-from src.database import SessionLocal
+from src.database import get_session
 from src.user import User
 from src.event_manager import create_event
 
@@ -23,7 +23,7 @@ def _store_credentials(user: User, creds: Credentials, db):
 
 def authorize_user(user_id: int) -> Credentials:
     """Run local OAuth flow and store the resulting credentials."""
-    db = SessionLocal()
+    db = get_session()
     try:
         user_obj = db.query(User).filter(User.id == user_id).first()
         if not user_obj:
@@ -65,7 +65,7 @@ def fetch_events(user: User) -> List[dict]:
 
 def sync_user_calendar(user_id: int) -> List[dict]:
     """Fetch Google events and create matching internal events."""
-    db = SessionLocal()
+    db = get_session()
     try:
         user_obj = db.query(User).filter(User.id == user_id).first()
         if not user_obj:
@@ -3,9 +3,9 @@ from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 
-from src.database import SessionLocal
+from src.database import get_session
 from src.child import Child
-from src.user import User # Needed for associating with parent
+from src.user import User, user_child_association_table # Needed for associating with parent
 
 # children_storage and child_parent_link are removed
 
@@ -19,26 +19,34 @@ def _parse_date(date_str: str):
         print(f"Warning: Could not parse date string: {date_str}")
         return None
 
+def _build_child(name: str, date_of_birth_str: str, school_info: str = None):
+    """Return a new, unsaved Child, or None if the date of birth is invalid.
+    Shared with the async counterpart in src/async_managers.py."""
+    dob_date = _parse_date(date_of_birth_str)
+    if not dob_date:
+        print("Error: Invalid date of birth format.")
+        return None
+
+    # custody_schedule_info is deprecated and no longer a Child column; it is
+    # still accepted by add_child() for backwards compatibility.
+    return Child(
+        name=name,
+        date_of_birth=dob_date,
+        school_info=school_info
+    )
+
 def add_child(user_id: int, name: str, date_of_birth_str: str, school_info: str = None, custody_schedule_info: str = None):
-    db = SessionLocal()
+    db = get_session()
     try:
         parent_user = db.query(User).filter(User.id == user_id).first()
         if not parent_user:
             print("Error: Parent user not found.")
             return None
 
-        dob_date = _parse_date(date_of_birth_str)
-        if not dob_date:
-            print("Error: Invalid date of birth format.")
+        new_child = _build_child(name, date_of_birth_str, school_info)
+        if not new_child:
             return None
 
-        new_child = Child(
-            name=name,
-            date_of_birth=dob_date,
-            school_info=school_info,
-            custody_schedule_info=custody_schedule_info
-        )
-
         # Add parent to child's list of parents for many-to-many relationship
         new_child.parents.append(parent_user)
 
@@ -100,8 +108,9 @@ def add_residency_period(db_session: Session, child_id: int, parent_id: int,
     return new_period
 
 def get_residency_periods_for_child(db_session: Session, child_id: int,
-                                    start_filter_date_str: str = None, end_filter_date_str: str = None):
-    query = db_session.query(ResidencyPeriod).filter(ResidencyPeriod.child_id == child_id)
+                                    start_filter_date_str: str = None, end_filter_date_str: str = None,
+                                    load=()):
+    query = db_session.query(ResidencyPeriod).filter(ResidencyPeriod.child_id == child_id).options(*load)
 
     if start_filter_date_str:
         start_filter_dt = _parse_datetime_for_residency(start_filter_date_str + " 00:00:00") # Start of day
@@ -190,10 +199,10 @@ def get_child_residency_on_date(db_session: Session, child_id: int, date_str: st
     # For now, returning all active periods.
     return active_periods
 
-def get_child_details(child_id: int):
-    db = SessionLocal()
+def get_child_details(child_id: int, load=()):
+    db = get_session(readonly=True)
     try:
-        child = db.query(Child).filter(Child.id == child_id).first()
+        child = db.query(Child).filter(Child.id == child_id).options(*load).first()
         return child
     except SQLAlchemyError as e:
         print(f"Database error getting child details: {e}")
@@ -201,13 +210,13 @@ def get_child_details(child_id: int):
     finally:
         db.close()
 
-def get_user_children(user_id: int):
-    db = SessionLocal()
+def get_user_children(user_id: int, load=()):
+    db = get_session(readonly=True)
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if user:
-            return user.children # Accesses the 'children' relationship attribute
-        return [] # Return empty list if user not found
+        return (db.query(Child)
+                .join(user_child_association_table, user_child_association_table.c.child_id == Child.id)
+                .filter(user_child_association_table.c.user_id == user_id)
+                .options(*load).all())
     except SQLAlchemyError as e:
         print(f"Database error getting user children: {e}")
         return []
@@ -216,7 +225,7 @@ def get_user_children(user_id: int):
 
 def update_child_info(child_id: int, name: str = None, date_of_birth_str: str = None,
                       school_info: str = None, custody_schedule_info: str = None):
-    db = SessionLocal()
+    db = get_session()
     try:
         child = db.query(Child).filter(Child.id == child_id).first()
         if not child:
@@ -253,7 +262,7 @@ def update_child_info(child_id: int, name: str = None, date_of_birth_str: str =
         db.close()
 
 def remove_child(child_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         child = db.query(Child).filter(Child.id == child_id).first()
         if not child:
@@ -277,7 +286,7 @@ def remove_child(child_id: int):
         db.close()
 
 def add_parent_to_child(child_id: int, user_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         child = db.query(Child).filter(Child.id == child_id).first()
         parent_to_add = db.query(User).filter(User.id == user_id).first()
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from src import agenda
+from src.interval_index import IntervalIndex
+
+# Scheduling conflicts for one user: overlaps between things that need them at
+# the same time. These are their shifts, their own and their children's events,
+# and residency periods in which they are the custodial parent. Tasks have no
+# duration and are left out. A child's event during the user's residency period
+# is not a conflict; a shift during it is.
+
+# Pairs of kinds that clash when they overlap
+CONFLICTING_KINDS = {
+    frozenset({'shift'}), frozenset({'event'}),
+    frozenset({'shift', 'event'}), frozenset({'shift', 'residency'}),
+}
+
+def _kinds_conflict(kind_a: str, kind_b: str):
+    return frozenset({kind_a, kind_b}) in CONFLICTING_KINDS
+
+def _items(user_id: int, start: datetime, end: datetime):
+    """(kind, start, end, obj) for the user's items overlapping [start, end), in time order."""
+    for kind, item_start, item_end, obj in agenda.iter_agenda(user_id, start, end):
+        if kind == 'task' or (kind == 'residency' and obj.parent_id != user_id):
+            continue
+        yield kind, item_start, item_end, obj
+
+def find_conflicts(user_id: int, start: datetime, end: datetime):
+    """Pairs ((kind, start, end, obj), (kind, start, end, obj)) of clashing items in [start, end) (naive UTC).
+
+    Each pair is reported once, ordered by the start of its first item.
+    """
+    items = list(_items(user_id, start, end))
+    index = IntervalIndex((item_start, item_end, position)
+                          for position, (_, item_start, item_end, _) in enumerate(items))
+    conflicts = []
+    for position, (kind, item_start, item_end, obj) in enumerate(items):
+        for _, _, other_position in index.overlapping(item_start, item_end):
+            # Items come in time order, so each pair is seen from its earlier item only
+            if other_position <= position:
+                continue
+            other = items[other_position]
+            if _kinds_conflict(kind, other[0]):
+                conflicts.append(((kind, item_start, item_end, obj), other))
+    return conflicts
+
+def conflicts_with(user_id: int, kind: str, start: datetime, end: datetime, exclude_id: int = None):
+    """The user's items that would clash with a `kind` item over [start, end).
+
+    Meant for checks before saving a shift or event: it reads only that span.
+    `exclude_id` leaves out the item being updated (and, for a series, its other occurrences).
+    """
+    if start is None or end is None or end <= start:
+        return []
+    return [(other_kind, other_start, other_end, obj)
+            for other_kind, other_start, other_end, obj in _items(user_id, start, end)
+            if _kinds_conflict(kind, other_kind)
+            and not (other_kind == kind and exclude_id is not None and obj.id == exclude_id)]
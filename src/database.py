@@ -1,6 +1,11 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, Table, Column, Integer, String, DateTime, select, func, inspect
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from contextlib import contextmanager
+from datetime import datetime
+import contextvars
+import hashlib
 import os
 
 # Default DATABASE_URL
@@ -8,37 +13,547 @@ DEFAULT_DATABASE_URL = "sqlite:///./family_planner.db"
 # Test specific DATABASE_URL (in-memory)
 TEST_DATABASE_URL = "sqlite:///:memory:"
 
-# Global engine and SessionLocal, can be reconfigured
+# Engine tuning defaults. Every value can be overridden through the environment
+# variable listed next to it (see get_engine_settings).
+DEFAULT_ENGINE_SETTINGS = {
+    "pool_size": 5,             # DB_POOL_SIZE
+    "max_overflow": 10,         # DB_MAX_OVERFLOW
+    "pool_timeout": 30,         # DB_POOL_TIMEOUT (seconds)
+    "pool_recycle": 1800,       # DB_POOL_RECYCLE (seconds, -1 disables)
+    "pool_pre_ping": True,      # DB_POOL_PRE_PING
+    "journal_mode": "WAL",      # SQLITE_JOURNAL_MODE
+    "busy_timeout": 5000,       # SQLITE_BUSY_TIMEOUT (milliseconds)
+    "synchronous": "NORMAL",    # SQLITE_SYNCHRONOUS
+    "cache_size": -64000,       # SQLITE_CACHE_SIZE (negative = KiB, so 64 MiB)
+    "mmap_size": 268435456,     # SQLITE_MMAP_SIZE (bytes, 256 MiB)
+}
+
+_SETTINGS_ENV_VARS = {
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "pool_timeout": "DB_POOL_TIMEOUT",
+    "pool_recycle": "DB_POOL_RECYCLE",
+    "pool_pre_ping": "DB_POOL_PRE_PING",
+    "journal_mode": "SQLITE_JOURNAL_MODE",
+    "busy_timeout": "SQLITE_BUSY_TIMEOUT",
+    "synchronous": "SQLITE_SYNCHRONOUS",
+    "cache_size": "SQLITE_CACHE_SIZE",
+    "mmap_size": "SQLITE_MMAP_SIZE",
+}
+
+_VALID_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_VALID_SYNCHRONOUS = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+# Global engine and SessionLocal, can be reconfigured.
+# SessionLocal is created once and re-bound by initialize_database_for_application(),
+# so modules that did `from src.database import SessionLocal` at import time
+# always see the current engine.
 engine = None
-SessionLocal = None
+engine_settings = None
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+# Read-only engine for queries that never write. For a SQLite file this opens
+# the same file with mode=ro; DATABASE_READ_URL can point it at a replica.
+# When there is no separate read target it is the primary engine itself.
+read_engine = None
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False)
 Base = declarative_base()
 
 def get_database_url():
-    """Returns test DB URL if TEST_MODE_ENABLED env var is set, else default."""
+    """Returns test DB URL if TEST_MODE_ENABLED env var is set, else DATABASE_URL or the default."""
     if os.environ.get("TEST_MODE_ENABLED") == "1":
         return TEST_DATABASE_URL
-    return DEFAULT_DATABASE_URL
+    return os.environ.get("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+def get_read_database_url(primary_url: str = None):
+    """URL for read-only connections, or None when reads must use the primary engine."""
+    primary_url = primary_url or get_database_url()
+    if os.environ.get("TEST_MODE_ENABLED") != "1" and os.environ.get("DATABASE_READ_URL"):
+        return os.environ["DATABASE_READ_URL"]
+    if not primary_url.startswith("sqlite:///") or _is_memory_sqlite(primary_url):
+        return None # In-memory databases are private to their connection
+    path = primary_url[len("sqlite:///"):]
+    return f"sqlite:///file:{path}?mode=ro&uri=true"
+
+def _is_memory_sqlite(url: str):
+    return url.startswith("sqlite") and (url.endswith(":memory:") or url.rstrip("/") == "sqlite:")
+
+def _coerce_setting(key, raw_value):
+    """Convert an environment string to the type of the default setting."""
+    default = DEFAULT_ENGINE_SETTINGS[key]
+    if isinstance(default, bool):
+        return raw_value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(raw_value)
+    value = raw_value.strip().upper()
+    allowed = _VALID_JOURNAL_MODES if key == "journal_mode" else _VALID_SYNCHRONOUS
+    if value not in allowed:
+        raise ValueError(f"expected one of {sorted(allowed)}")
+    return value
+
+def get_engine_settings(overrides: dict = None):
+    """Returns the engine settings: defaults, then environment variables, then explicit overrides."""
+    settings = dict(DEFAULT_ENGINE_SETTINGS)
+    for key, env_var in _SETTINGS_ENV_VARS.items():
+        raw_value = os.environ.get(env_var)
+        if raw_value is None or raw_value == "":
+            continue
+        try:
+            settings[key] = _coerce_setting(key, raw_value)
+        except ValueError as e:
+            print(f"Warning: Ignoring invalid {env_var}={raw_value!r} ({e}).")
+    if overrides:
+        settings.update(overrides)
+    return settings
+
+def _sqlite_pragmas(url: str, settings: dict, read_only: bool = False):
+    """The per-connection PRAGMA statements to run for a SQLite URL."""
+    pragmas = [
+        ("busy_timeout", int(settings["busy_timeout"])),
+        ("synchronous", settings["synchronous"]),
+        ("cache_size", int(settings["cache_size"])),
+    ]
+    if not _is_memory_sqlite(url):
+        # In-memory databases have no journal file and nothing to memory-map.
+        # The journal mode is a property of the file, so only the writer sets it.
+        if not read_only:
+            pragmas.insert(0, ("journal_mode", settings["journal_mode"]))
+        pragmas.append(("mmap_size", int(settings["mmap_size"])))
+    return pragmas
 
-def initialize_database_for_application():
-    """Initializes or re-initializes the global engine and SessionLocal."""
-    global engine, SessionLocal
+def _install_sqlite_pragmas(target_engine, pragmas):
+    """Registers a connect hook so every new pooled connection gets the pragmas."""
+    @event.listens_for(target_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+def _install_sqlite_transactions(target_engine):
+    """Has SQLAlchemy emit BEGIN itself. pysqlite otherwise defers it to the first
+    write, so a SAVEPOINT before that would open (and its RELEASE end) the transaction."""
+    @event.listens_for(target_engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(target_engine, "begin")
+    def _emit_begin(conn):
+        # Sessions in one thread share an in-memory database's single connection
+        if not conn.connection.dbapi_connection.in_transaction:
+            conn.exec_driver_sql("BEGIN")
+
+def create_configured_engine(url: str, settings: dict = None, read_only: bool = False):
+    """Engine factory: applies pool sizing and, for SQLite, per-connection pragmas."""
+    settings = settings or get_engine_settings()
+    engine_kwargs = {"pool_pre_ping": settings["pool_pre_ping"]}
+    connect_args = {}
+
+    if url.startswith("sqlite"):
+        connect_args["check_same_thread"] = False # Necessary for SQLite
+        # busy_timeout is also set as a pragma; the driver timeout is in seconds.
+        connect_args["timeout"] = settings["busy_timeout"] / 1000.0
+
+    if not _is_memory_sqlite(url):
+        # In-memory SQLite uses a per-thread singleton pool; pool sizing does not apply.
+        engine_kwargs.update(
+            pool_size=settings["pool_size"],
+            max_overflow=settings["max_overflow"],
+            pool_timeout=settings["pool_timeout"],
+            pool_recycle=settings["pool_recycle"],
+        )
+
+    new_engine = create_engine(url, connect_args=connect_args, **engine_kwargs)
+    if url.startswith("sqlite"):
+        _install_sqlite_pragmas(new_engine, _sqlite_pragmas(url, settings, read_only))
+        _install_sqlite_transactions(new_engine)
+    return new_engine
+
+def initialize_database_for_application(settings: dict = None):
+    """Initializes or re-initializes the global engines and rebinds SessionLocal/ReadSessionLocal."""
+    global engine, engine_settings, read_engine
 
     current_db_url = get_database_url()
 
-    if engine is None or str(engine.url) != current_db_url:
+    if engine is None or str(engine.url) != current_db_url or settings is not None:
         # print(f"Initializing database with URL: {current_db_url}")
-        connect_args = {}
-        if current_db_url.startswith("sqlite"):
-            connect_args["check_same_thread"] = False # Necessary for SQLite
+        if read_engine is not None and read_engine is not engine:
+            read_engine.dispose()
+        if engine is not None:
+            engine.dispose()
+        engine_settings = get_engine_settings(settings)
+        engine = create_configured_engine(current_db_url, engine_settings)
+        SessionLocal.configure(bind=engine)
 
-        engine = create_engine(current_db_url, connect_args=connect_args)
-        SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        read_db_url = get_read_database_url(current_db_url)
+        if read_db_url:
+            read_engine = create_configured_engine(read_db_url, engine_settings, read_only=True)
+        else:
+            read_engine = engine
+        ReadSessionLocal.configure(bind=read_engine)
 
     # Models need to be imported for Base.metadata to be populated before create_all
     # It's assumed they are imported by the time this is called in a real app,
     # or by tests before they call create_all.
     # Example: from . import user, shift, child, event # etc.
 
+def get_active_sqlite_pragmas():
+    """Reads back the pragma values SQLite actually applied on a pooled connection."""
+    if engine is None or not str(engine.url).startswith("sqlite"):
+        return {}
+    names = [name for name, _ in _sqlite_pragmas(str(engine.url), engine_settings)]
+    active = {}
+    with engine.connect() as conn:
+        for name in names:
+            active[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    return active
+
+def describe_engine():
+    """One-line summary of the active engine, pool and SQLite settings for startup logs."""
+    if engine is None:
+        return "Database engine not initialized."
+    pool = engine.pool
+    parts = [f"url={engine.url}", f"pool={type(pool).__name__}"]
+    if hasattr(pool, "size") and not _is_memory_sqlite(str(engine.url)):
+        parts.append(f"pool_size={pool.size()}")
+        parts.append(f"max_overflow={engine_settings['max_overflow']}")
+        parts.append(f"pool_timeout={engine_settings['pool_timeout']}s")
+        parts.append(f"pool_recycle={engine_settings['pool_recycle']}s")
+    parts.extend(f"{name}={value}" for name, value in get_active_sqlite_pragmas().items())
+    if read_engine is not None and read_engine is not engine:
+        parts.append(f"read_url={read_engine.url}")
+    return "Database engine: " + ", ".join(parts)
+
+# --- Unit of work ---
+# A unit of work shares one Session (and so one connection and one transaction)
+# between every manager call made while it is active. Managers obtain their
+# session through get_session() and keep their usual commit()/rollback()/close()
+# calls. In a writable unit of work each get_session() call runs in a SAVEPOINT
+# of the shared transaction: commit() releases it (a flush) and opens the next,
+# and rollback() undoes only that call's changes since, so a manager recovering
+# from an error keeps the writes made before it. The unit of work commits or
+# rolls back once at the end.
+
+_current_unit_of_work = contextvars.ContextVar("current_unit_of_work", default=None)
+
+class SharedSession:
+    """Session handle given to one manager call while a unit of work is active."""
+
+    def __init__(self, session, savepoints: bool = True):
+        self._session = session
+        self._savepoint = session.begin_nested() if savepoints else None
+
+    def commit(self):
+        if self._savepoint is None:
+            self._session.flush()
+            return
+        # Make pending changes visible to later queries (and assign primary keys)
+        # without ending the shared transaction.
+        self._savepoint.commit()
+        self._savepoint = self._session.begin_nested()
+
+    def rollback(self):
+        if self._savepoint is None:
+            return # Read-only: nothing of this call's to undo
+        self._savepoint.rollback()
+        self._savepoint = self._session.begin_nested()
+
+    def close(self):
+        if self._savepoint is None:
+            return
+        if self._savepoint.is_active:
+            self._savepoint.commit()
+        else: # A failed flush the manager did not roll back
+            self._savepoint.rollback()
+        self._savepoint = None
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+def get_session(readonly: bool = False):
+    """Returns a handle on the active unit-of-work session, or a new standalone Session.
+
+    Pass readonly=True from functions that only query: outside a unit of work
+    they then use the read-only engine.
+    """
+    shared = _current_unit_of_work.get()
+    if shared is not None:
+        session, unit_readonly = shared
+        return SharedSession(session, savepoints=not unit_readonly)
+    return ReadSessionLocal() if readonly else SessionLocal()
+
+def begin_unit_of_work(readonly: bool = False):
+    """Starts a unit of work unless one is already active. Returns the state for end_unit_of_work()."""
+    if _current_unit_of_work.get() is not None:
+        return None # Nested: the outer unit of work owns the transaction
+    session_factory = ReadSessionLocal if readonly else SessionLocal
+    # Objects handed out by managers stay readable after the final commit.
+    session = session_factory(expire_on_commit=False)
+    token = _current_unit_of_work.set((session, readonly))
+    return session, token
+
+def end_unit_of_work(state, commit: bool = True):
+    """Commits (or rolls back) and closes a unit of work started by begin_unit_of_work()."""
+    if state is None:
+        return
+    session, token = state
+    try:
+        if commit:
+            session.commit()
+        else:
+            session.rollback()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        try:
+            _current_unit_of_work.reset(token)
+        except ValueError: # Ended from a different context (e.g. a Flask teardown)
+            _current_unit_of_work.set(None)
+        session.close()
+
+@contextmanager
+def unit_of_work(readonly: bool = False):
+    """Context manager running the enclosed manager calls in one session and transaction."""
+    state = begin_unit_of_work(readonly)
+    session = get_session()
+    try:
+        yield session
+    except BaseException:
+        session.rollback()
+        session.close()
+        end_unit_of_work(state, commit=False)
+        raise
+    session.close()
+    end_unit_of_work(state)
+
+# Requests with these methods never write, so they run on the read-only engine.
+READ_ONLY_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def init_request_sessions(app):
+    """Opens a unit of work per Flask request and ends it in the request teardown.
+
+    Safe (read-only) methods get a read-only unit of work; all others use the primary.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _begin_request_unit_of_work():
+        g._unit_of_work = begin_unit_of_work(readonly=request.method in READ_ONLY_METHODS)
+
+    @app.after_request
+    def _flag_failed_request(response):
+        if response.status_code >= 500:
+            g._unit_of_work_failed = True
+        return response
+
+    @app.teardown_request
+    def _end_request_unit_of_work(exc):
+        state = g.pop("_unit_of_work", None)
+        failed = exc is not None or g.pop("_unit_of_work_failed", False)
+        end_unit_of_work(state, commit=not failed)
+
+    return app
+
+# --- Schema migrations ---
+# create_all() only creates missing tables; it never alters a database that
+# already exists. Changes such as new indexes are therefore also listed here as
+# numbered migrations. Every statement must be safe to re-run (IF NOT EXISTS),
+# because a freshly created database already has them from the models. New
+# columns use add_column(), which skips columns that are already there.
+
+schema_migrations_table = Table(
+    "schema_migrations", Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def add_column(table_name: str, column_name: str, ddl_type: str):
+    """Migration step adding a nullable column unless the table already has it."""
+    def _add_column(conn):
+        existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+        if column_name not in existing:
+            conn.exec_driver_sql(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl_type}")
+    return _add_column
+
+def _backfill_pattern_dates(conn):
+    # The generate endpoint has always generated in UTC, so that is the pattern day of older shifts
+    day = "date(start_time)" if conn.dialect.name == "sqlite" else "CAST(start_time AS DATE)"
+    conn.exec_driver_sql(f"UPDATE shifts SET pattern_date = {day} "
+                         "WHERE source_pattern_id IS NOT NULL AND pattern_date IS NULL")
+
+def _backfill_span_bounds(conn):
+    from src.span_bounds import backfill # Imports the models, which import this module
+    backfill(conn)
+
+def _create_search_indexes(conn):
+    from src.search import create_search_indexes # Imports the models, which import this module
+    create_search_indexes(conn)
+
+MIGRATIONS = [
+    (1, "Composite indexes for hot-path queries", [
+        "CREATE INDEX IF NOT EXISTS ix_events_user_id_start_time ON events (user_id, start_time)",
+        "CREATE INDEX IF NOT EXISTS ix_events_child_id_start_time ON events (child_id, start_time)",
+        "CREATE INDEX IF NOT EXISTS ix_shifts_user_id_start_time ON shifts (user_id, start_time)",
+        "CREATE INDEX IF NOT EXISTS ix_tasks_user_id_completed_due_date ON tasks (user_id, completed, due_date)",
+        "CREATE INDEX IF NOT EXISTS ix_expenses_child_id_expense_date ON expenses (child_id, expense_date)",
+        "CREATE INDEX IF NOT EXISTS ix_residency_periods_child_id_start_end "
+        "ON residency_periods (child_id, start_datetime, end_datetime)",
+    ]),
+    (2, "Index for paginating expenses newest first", [
+        "CREATE INDEX IF NOT EXISTS ix_expenses_expense_date_id ON expenses (expense_date, id)",
+    ]),
+    (3, "Recurrence rule columns on events", [
+        add_column("events", "recurrence_rule", "VARCHAR"),
+        add_column("events", "recurrence_exdates", "JSON"),
+        add_column("events", "recurrence_timezone", "VARCHAR"),
+        add_column("events", "series_end", "DATETIME"),
+        "CREATE INDEX IF NOT EXISTS ix_events_user_id_series_end ON events (user_id, series_end) "
+        "WHERE recurrence_rule IS NOT NULL",
+        "CREATE INDEX IF NOT EXISTS ix_events_child_id_series_end ON events (child_id, series_end) "
+        "WHERE recurrence_rule IS NOT NULL",
+    ]),
+    (4, "iCalendar UID on events for deduplicating imports", [
+        add_column("events", "ical_uid", "VARCHAR"),
+        "CREATE INDEX IF NOT EXISTS ix_events_user_id_ical_uid ON events (user_id, ical_uid)",
+    ]),
+    (5, "FTS5 full-text search tables and sync triggers (SQLite only)", [
+        _create_search_indexes,
+    ]),
+    (6, "Pattern day on generated shifts for regeneration", [
+        add_column("shifts", "pattern_date", "DATE"),
+        _backfill_pattern_dates,
+        "CREATE INDEX IF NOT EXISTS ix_shifts_source_pattern_id_user_id_pattern_date "
+        "ON shifts (source_pattern_id, user_id, pattern_date)",
+    ]),
+    (7, "Version counter on shift patterns", [
+        add_column("shift_patterns", "version", "INTEGER NOT NULL DEFAULT 1"),
+    ]),
+    (8, "Holiday calendar references on shift patterns and users", [
+        add_column("shift_patterns", "holiday_calendar_id", "INTEGER REFERENCES holiday_calendars(id)"),
+        add_column("users", "holiday_calendar_id", "INTEGER REFERENCES holiday_calendars(id)"),
+    ]),
+    (9, "Longest stored event and shift span per owner", [
+        "CREATE TABLE IF NOT EXISTS span_bounds (kind VARCHAR NOT NULL, owner_type VARCHAR NOT NULL, "
+        "owner_id INTEGER NOT NULL, max_seconds INTEGER NOT NULL, PRIMARY KEY (kind, owner_type, owner_id))",
+        _backfill_span_bounds,
+    ]),
+    (10, "Shift generation runs, one per pattern, user and range", [
+        'CREATE TABLE IF NOT EXISTS shift_generations (id INTEGER NOT NULL PRIMARY KEY, '
+        'pattern_id INTEGER NOT NULL REFERENCES shift_patterns(id), '
+        'user_id INTEGER NOT NULL REFERENCES users(id), start_date DATE NOT NULL, end_date DATE NOT NULL, '
+        '"offset" INTEGER NOT NULL, timezone VARCHAR NOT NULL, holidays JSON, exceptions JSON)',
+        "CREATE INDEX IF NOT EXISTS ix_shift_generations_id ON shift_generations (id)",
+        # Databases created before this migration may hold repeated runs; the newest has the current inputs
+        "DELETE FROM shift_generations WHERE id NOT IN "
+        "(SELECT MAX(id) FROM shift_generations GROUP BY pattern_id, user_id, start_date, end_date)",
+        "DROP INDEX IF EXISTS ix_shift_generations_pattern_id_user_id",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_shift_generations_pattern_id_user_id_range "
+        "ON shift_generations (pattern_id, user_id, start_date, end_date)",
+    ]),
+]
+
+LATEST_SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def get_schema_version(target_engine=None):
+    """Highest applied migration version, or 0 for a database that has none."""
+    target_engine = target_engine or engine
+    schema_migrations_table.create(bind=target_engine, checkfirst=True)
+    with target_engine.connect() as conn:
+        return conn.execute(select(func.max(schema_migrations_table.c.version))).scalar() or 0
+
+def run_migrations(target_engine=None, verbose: bool = False):
+    """Applies pending migrations in order and returns the versions applied.
+
+    Each migration runs in its own short transaction, so a live SQLite file
+    keeps serving readers (WAL) and writers only wait for busy_timeout.
+    """
+    global engine
+    if target_engine is None:
+        if not engine:
+            initialize_database_for_application()
+        target_engine = engine
+
+    current_version = get_schema_version(target_engine)
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        if version <= current_version:
+            continue
+        try:
+            with target_engine.begin() as conn:
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.exec_driver_sql(statement)
+                conn.execute(schema_migrations_table.insert().values(
+                    version=version, description=description, applied_at=datetime.utcnow()))
+        except IntegrityError:
+            continue # Another process (e.g. a second worker) recorded this version first
+        applied.append(version)
+        if verbose:
+            print(f"Applied migration {version}: {description}")
+    return applied
+
+# --- Schema stamp ---
+# Checking every table with create_all() on each start is slow on a large
+# database and is repeated by every worker. Instead, migrate_database() stores
+# a stamp (latest migration version + a fingerprint of the model metadata), and
+# startup only compares that one row.
+
+schema_stamp_table = Table(
+    "schema_stamp", Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("stamp", String, nullable=False),
+    Column("updated_at", DateTime, nullable=False),
+)
+
+def get_schema_fingerprint():
+    """Short hash of the tables, columns and indexes declared by the imported models."""
+    parts = []
+    for table in Base.metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f"{c.name}:{c.type}:{c.nullable}" for c in table.columns)
+        parts.extend(f"{ix.name}:{','.join(c.name for c in ix.columns)}"
+                     for ix in sorted(table.indexes, key=lambda ix: ix.name or ""))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+def get_expected_schema_stamp():
+    return f"{LATEST_SCHEMA_VERSION}:{get_schema_fingerprint()}"
+
+def read_schema_stamp(target_engine=None):
+    """The stamp stored in the database, or None if it was never migrated."""
+    target_engine = target_engine or engine
+    try:
+        with target_engine.connect() as conn:
+            return conn.execute(
+                select(schema_stamp_table.c.stamp).where(schema_stamp_table.c.id == 1)
+            ).scalar()
+    except SQLAlchemyError: # Table missing: the database predates stamps or is empty
+        return None
+
+def is_schema_current(target_engine=None):
+    return read_schema_stamp(target_engine) == get_expected_schema_stamp()
+
+def migrate_database(verbose: bool = False):
+    """Creates missing tables, applies pending migrations and records the schema stamp."""
+    global engine
+    if not engine:
+        initialize_database_for_application()
+    create_tables()
+    run_migrations(verbose=verbose)
+    with engine.begin() as conn:
+        if engine.dialect.name == "sqlite":
+            # Refresh planner statistics so SQLite picks e.g. the partial series indexes
+            conn.exec_driver_sql("ANALYZE")
+        conn.execute(schema_stamp_table.delete())
+        conn.execute(schema_stamp_table.insert().values(
+            id=1, stamp=get_expected_schema_stamp(), updated_at=datetime.utcnow()))
+    if verbose:
+        print(f"Database schema at version {LATEST_SCHEMA_VERSION} ({get_schema_fingerprint()}).")
+
 def create_tables():
     """Creates all tables based on Base.metadata."""
     global engine
@@ -56,19 +571,28 @@ def drop_tables():
     # print("Database tables dropped.")
 
 
-# This is the function that main.py currently calls as init_db()
-# We'll keep it for compatibility but have it call the new functions.
+# This is the function that main.py and app.py call at startup.
+# It only compares the schema stamp; the full create_all/migration pass runs when
+# the stamp is missing or stale (or explicitly via `python main.py migrate`).
+# Set DB_AUTO_MIGRATE=0 to make startup only warn about a stale schema.
 def init_db():
     initialize_database_for_application()
-    # The create_tables() call is often done explicitly at app startup or by tests.
-    # For the CLI app, creating tables if they don't exist on each run via main.py is okay.
-    create_tables()
-    if os.environ.get("TEST_MODE_ENABLED") != "1":
-        print("Database initialized (tables created if they didn't exist).")
+    verbose = os.environ.get("TEST_MODE_ENABLED") != "1"
+    if is_schema_current():
+        pass
+    elif os.environ.get("DB_AUTO_MIGRATE", "1") == "1":
+        migrate_database(verbose=verbose)
+        if verbose:
+            print("Database initialized (tables created if they didn't exist).")
+    else:
+        print("Warning: Database schema is out of date. Run `python main.py migrate`.")
+    if verbose:
+        print(describe_engine())
 
 
 if __name__ == "__main__":
     # This allows running `python src/database.py` to initialize the DB with default URL.
     # To initialize with test DB: TEST_MODE_ENABLED=1 python src/database.py
+    # Prefer `python main.py migrate`, which imports all models first.
     print(f"Initializing database with URL: {get_database_url()}...")
     init_db()
@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, JSON, text
 from sqlalchemy.orm import relationship
 from src.database import Base
-from zoneinfo import ZoneInfo
+from src.serializers import compile_serializer
 import datetime
 
 class Event(Base):
@@ -18,6 +18,14 @@ class Event(Base):
     child_id = Column(Integer, ForeignKey("children.id"), nullable=True) # Previous: linked_child_id (str, uuid)
     institution_id = Column(Integer, ForeignKey("institutions.id"), nullable=True)
 
+    # Recurrence (see src/recurrence.py). start_time/end_time hold the first occurrence.
+    recurrence_rule = Column(String, nullable=True) # RRULE subset, e.g. "FREQ=WEEKLY;COUNT=10"
+    recurrence_exdates = Column(JSON, nullable=True) # Excluded occurrence starts, ISO naive UTC
+    recurrence_timezone = Column(String, nullable=True) # Local time the rule steps in
+    series_end = Column(DateTime, nullable=True) # End of the last occurrence; NULL if open-ended
+
+    ical_uid = Column(String, nullable=True) # UID of the VEVENT this was imported from (src/ics_import.py)
+
     # Relationships (optional, but good for accessing related objects)
     # If an event can be linked to a User, this defines how to access that User object
     user = relationship("User") # No back_populates needed if User model doesn't have a direct list of events like this.
@@ -27,6 +35,18 @@ class Event(Base):
     child = relationship("Child") # Similarly, no back_populates if Child model doesn't have a direct list of events.
     institution = relationship("Institution", back_populates="events")
 
+    # Composite indexes for the per-owner, time-ordered listings
+    __table_args__ = (
+        Index('ix_events_user_id_start_time', 'user_id', 'start_time'),
+        Index('ix_events_child_id_start_time', 'child_id', 'start_time'),
+        # Partial indexes over recurring series only, for window queries on their bounding interval
+        Index('ix_events_user_id_series_end', 'user_id', 'series_end',
+              sqlite_where=text('recurrence_rule IS NOT NULL'), postgresql_where=text('recurrence_rule IS NOT NULL')),
+        Index('ix_events_child_id_series_end', 'child_id', 'series_end',
+              sqlite_where=text('recurrence_rule IS NOT NULL'), postgresql_where=text('recurrence_rule IS NOT NULL')),
+        Index('ix_events_user_id_ical_uid', 'user_id', 'ical_uid'),
+    )
+
     # Removed __init__ as SQLAlchemy handles it.
     # Previous Event model had: event_id, title, description, start_time, end_time, linked_user_id, linked_child_id
     # event_id (uuid) is replaced by id (Integer PK).
@@ -36,19 +56,15 @@ class Event(Base):
     def __repr__(self):
         return f"<Event(id={self.id}, title='{self.title}')>"
 
-    def to_dict(self, include_user=True, include_child=True, timezone='UTC'):
-        local_start = self.start_time.replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo(timezone)) if self.start_time else None
-        local_end = self.end_time.replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo(timezone)) if self.end_time else None
-        data = {
-            "id": self.id,
-            "title": self.title,
-            "description": self.description,
-            "start_time": local_start.isoformat() if local_start else None,
-            "end_time": local_end.isoformat() if local_end else None,
-            "user_id": self.user_id,
-            "child_id": self.child_id,
-            "institution_id": self.institution_id
-        }
+    def to_dict(self, include_user=True, include_child=True, timezone='UTC', include_institution=True):
+        data = _serialize_columns(self, timezone)
+        if self.recurrence_rule:
+            data['recurrence'] = {
+                "rule": self.recurrence_rule,
+                "exdates": self.recurrence_exdates or [],
+                "timezone": self.recurrence_timezone,
+                "series_end": self.series_end.isoformat() if self.series_end else None
+            }
         # Optionally include simplified representations of linked user/child
         if include_user and self.user: # self.user is the relationship attribute
             data['user'] = {"id": self.user.id, "name": self.user.name}
@@ -57,3 +73,7 @@ class Event(Base):
         if include_institution and self.institution:
             data['institution'] = {"id": self.institution.id, "name": self.institution.name}
         return data
+
+_serialize_columns = compile_serializer(
+    ('id', 'title', 'description', 'start_time', 'end_time', 'user_id', 'child_id', 'institution_id'),
+    local_times=('start_time', 'end_time'))
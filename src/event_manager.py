@@ -1,13 +1,20 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
-from datetime import datetime
+from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
+import heapq
 import json
 
-from src.notification import send_notification
-from src.child import Child
+from src.notification import send_notifications, send_child_notification
 
-from src.database import SessionLocal
+from src.database import get_session
+from src.pagination import paginate, decode_cursor, encode_cursor, Page
+from sqlalchemy import and_, or_
+
+from src.time_window import overlap_conditions
+from src import recurrence
+from src import queries
+from src import span_bounds
 from src.event import Event
 
 def _parse_datetime(datetime_str: str, timezone_str: str = 'UTC'):
@@ -23,43 +30,109 @@ def _parse_datetime(datetime_str: str, timezone_str: str = 'UTC'):
         print(f"Warning: Could not parse datetime string: {datetime_str}")
         return None
 
-def create_event(title: str, description: str, start_time_str: str, end_time_str: str,
-                 linked_user_id: int = None, linked_child_id: int = None, timezone: str = 'UTC'):
-    db = SessionLocal()
+# The helpers below hold the validation and update logic shared by these sync
+# functions and their async counterparts in src/async_managers.py.
+
+def _parse_exdates(exdate_strs, timezone: str = 'UTC'):
+    """Occurrence starts to skip, given like other times ('YYYY-MM-DD HH:MM' in `timezone`),
+    as stored: ISO strings in naive UTC. Raises ValueError for one that does not parse."""
+    exdates = []
+    for exdate_str in exdate_strs or []:
+        exdate_dt = _parse_datetime(exdate_str, timezone)
+        if not exdate_dt:
+            raise ValueError(f"Invalid exception date: {exdate_str}")
+        exdates.append(exdate_dt.isoformat())
+    return exdates
+
+def _recurrence_fields(start_time_dt, end_time_dt, recurrence_rule: str, exdates: list = None,
+                       timezone: str = 'UTC'):
+    """Event column values for a recurrence rule (None/'' for none). Raises ValueError for an invalid rule."""
+    if not recurrence_rule:
+        return {"recurrence_rule": None, "recurrence_exdates": None,
+                "recurrence_timezone": None, "series_end": None}
+    return {
+        "recurrence_rule": recurrence_rule,
+        "recurrence_exdates": exdates or [],
+        "recurrence_timezone": timezone,
+        "series_end": recurrence.series_end(start_time_dt, end_time_dt, recurrence_rule, timezone)
+    }
+
+def _build_event(title: str, description: str, start_time_str: str, end_time_str: str,
+                 linked_user_id: int = None, linked_child_id: int = None,
+                 institution_id: int = None, timezone: str = 'UTC',
+                 recurrence_rule: str = None, recurrence_exdates: list = None):
+    """Return a new, unsaved Event, or None if the times or recurrence rule are invalid."""
+    start_time_dt = _parse_datetime(start_time_str, timezone)
+    end_time_dt = _parse_datetime(end_time_str, timezone)
+
+    if not start_time_dt or not end_time_dt:
+        print("Error: Invalid start or end time format for event.")
+        return None
+
     try:
-        start_time_dt = _parse_datetime(start_time_str, timezone)
-        end_time_dt = _parse_datetime(end_time_str, timezone)
+        recurrence_fields = _recurrence_fields(start_time_dt, end_time_dt, recurrence_rule,
+                                               _parse_exdates(recurrence_exdates, timezone), timezone)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return None
 
-        if not start_time_dt or not end_time_dt:
-            print("Error: Invalid start or end time format for event.")
-            return None
+    return Event(
+        title=title,
+        description=description,
+        start_time=start_time_dt,
+        end_time=end_time_dt,
+        user_id=linked_user_id,
+        child_id=linked_child_id,
+        institution_id=institution_id,
+        **recurrence_fields
+    )
 
-        new_event = Event(
-            title=title,
-            description=description,
-            start_time=start_time_dt,
-            end_time=end_time_dt,
-            user_id=linked_user_id,
-            child_id=linked_child_id,
-            institution_id=institution_id
-        )
+def _event_message(event: Event, message_type: str):
+    """Notification payload for an event; touches no relationships."""
+    return {
+        "type": message_type,
+        "event": event.to_dict(include_user=False, include_child=False, include_institution=False)
+    }
+
+def _notify_for_event(db, event: Event, message_type: str):
+    """Notify the linked user, or all parents of the linked child, with one recipient query."""
+    if event.user_id:
+        send_notifications([event.user_id], _event_message(event, message_type), db=db)
+    elif event.child_id:
+        send_child_notification(event.child_id, _event_message(event, message_type), db=db)
+
+def _report_conflicts(event: Event, exclude_id: int = None):
+    """True (after printing an error) if the event clashes with its user's other items.
+
+    Only events linked to a user are checked, and for a series only its first occurrence.
+    """
+    if not event.user_id:
+        return False
+    from src import conflicts # Imported here: src.conflicts reads events through this module
+    clashes = conflicts.conflicts_with(event.user_id, 'event', event.start_time, event.end_time, exclude_id)
+    if clashes:
+        print(f"Error: Event conflicts with {len(clashes)} other item(s), e.g. {clashes[0][3]!r}.")
+        return True
+    return False
+
+def create_event(title: str, description: str, start_time_str: str, end_time_str: str,
+                 linked_user_id: int = None, linked_child_id: int = None, timezone: str = 'UTC',
+                 institution_id: int = None, recurrence_rule: str = None, recurrence_exdates: list = None,
+                 reject_conflicts: bool = False):
+    db = get_session()
+    try:
+        new_event = _build_event(title, description, start_time_str, end_time_str,
+                                 linked_user_id, linked_child_id, institution_id, timezone,
+                                 recurrence_rule, recurrence_exdates)
+        if not new_event:
+            return None
+        if reject_conflicts and _report_conflicts(new_event):
+            return None
         db.add(new_event)
         db.commit()
         db.refresh(new_event)
         # Notify linked user or parents of linked child
-        if new_event.user_id:
-            send_notification(new_event.user_id, {
-                "type": "event_created",
-                "event": new_event.to_dict(include_user=False, include_child=False)
-            })
-        elif new_event.child_id:
-            child = db.query(Child).filter(Child.id == new_event.child_id).first()
-            if child:
-                for parent in child.parents:
-                    send_notification(parent.id, {
-                        "type": "event_created",
-                        "event": new_event.to_dict(include_user=False, include_child=False)
-                    })
+        _notify_for_event(db, new_event, "event_created")
         return new_event
     except SQLAlchemyError as e:
         db.rollback()
@@ -69,9 +142,9 @@ def create_event(title: str, description: str, start_time_str: str, end_time_str
         db.close()
 
 def get_event_details(event_id: int):
-    db = SessionLocal()
+    db = get_session(readonly=True)
     try:
-        event = db.query(Event).filter(Event.id == event_id).first()
+        event = queries.get_event(db, event_id)
         return event
     except SQLAlchemyError as e:
         print(f"Database error getting event details: {e}")
@@ -79,32 +152,130 @@ def get_event_details(event_id: int):
     finally:
         db.close()
 
-def get_events_for_user(user_id: int):
-    db = SessionLocal()
+def _in_window(query, start: datetime = None, end: datetime = None, lookback: timedelta = None):
+    """Restrict to one-off events overlapping [start, end) plus series whose bounding interval does.
+
+    `lookback` is the owner's longest event (span_bounds.lookback()); one-off
+    events that started earlier than that before `start` are not looked for.
+
+    The two parts are separate branches of a UNION ALL so each uses its own index:
+    one-off events the (owner, start_time) range, series the partial (owner, series_end) index.
+    Series starting after `end` are left to the expansion to drop; a start_time bound here
+    would steer SQLite back to the start_time index.
+    """
+    if start is None and end is None:
+        return query
+    one_off, series = _split_window(query, start, end, lookback)
+    return one_off.union_all(series)
+
+def _split_window(query, start: datetime = None, end: datetime = None, lookback: timedelta = None):
+    """(one-off events overlapping [start, end), series whose bounding interval does) as two queries."""
+    one_off = query.filter(Event.recurrence_rule.is_(None),
+                           *overlap_conditions(Event.start_time, Event.end_time, start, end, lookback))
+    series = query.filter(Event.recurrence_rule.isnot(None))
+    if start is not None:
+        series = series.filter(or_(Event.series_end.is_(None), Event.series_end > start))
+    return one_off, series
+
+def iter_window(query, start: datetime, end: datetime, lookback: timedelta = None, after=None,
+                batch_size: int = 200):
+    """Yield the events of `query` in [start, end) by (start_time, id), series expanded into occurrences.
+
+    One-off events are read in batches in index order and each series yields its
+    occurrences lazily, so heapq.merge produces the stream without loading or
+    sorting the whole window. `after` is a (start_time, id) key to continue after.
+    """
+    one_off, series = _split_window(query, start, end, lookback)
+    series_start = start
+    if after is not None:
+        after_start, after_id = after
+        one_off = one_off.filter(or_(Event.start_time > after_start,
+                                     and_(Event.start_time == after_start, Event.id > after_id)))
+        series_start = after_start if start is None else max(start, after_start)
+    streams = [one_off.order_by(Event.start_time, Event.id).yield_per(batch_size)]
+    for event in series.all():
+        # Each series yields its occurrences in order, so it is a sorted stream of its own
+        streams.append(
+            recurrence.EventOccurrence(event, occurrence_start, occurrence_end)
+            for occurrence_start, occurrence_end in recurrence.iter_occurrences(
+                event.start_time, event.end_time, event.recurrence_rule, event.recurrence_exdates or (),
+                event.recurrence_timezone or 'UTC', series_start, end)
+        )
+    for event in heapq.merge(*streams, key=lambda event: (event.start_time, event.id)):
+        # Occurrences that began before `after` but overlap it come from the series too
+        if after is None or (event.start_time, event.id) > after:
+            yield event
+
+def _window_page(query, start: datetime, end: datetime, lookback: timedelta, limit: int = None,
+                 cursor: str = None):
+    """A Page of iter_window(): at most `limit` events and occurrences, continuing after `cursor`."""
+    after = decode_cursor(cursor, Event.start_time) if cursor else None
+    stream = iter_window(query, start, end, lookback, after)
+    if limit is None:
+        return Page(stream)
+    # Take one extra item to learn whether another page exists
+    items = []
+    for event in stream:
+        items.append(event)
+        if len(items) > limit:
+            break
+    if len(items) <= limit:
+        return Page(items)
+    items = items[:limit]
+    return Page(items, encode_cursor(items[-1].start_time, items[-1].id))
+
+def _list_events(query, lookback: timedelta, limit: int = None, cursor: str = None,
+                 start: datetime = None, end: datetime = None, load=()):
+    """Page through `query` as get_events_for_user() describes."""
+    if end is not None:
+        return _window_page(query.options(*load), start, end, lookback, limit, cursor)
+    query = _in_window(query, start, end, lookback).options(*load)
+    return paginate(query, Event.id, Event.start_time, limit, cursor)
+
+def get_events_for_user(user_id: int, limit: int = None, cursor: str = None,
+                        start: datetime = None, end: datetime = None, load=()):
+    """A user's events in start time order; a Page of at most `limit` when given.
+
+    `start`/`end` (naive UTC) restrict the result to events overlapping that window.
+    With an `end`, recurring events are expanded into their occurrences in the window
+    and pages follow the occurrences' time order.
+    `load` is a loading plan (src/loading.py) for the relationships the caller uses.
+    """
+    db = get_session(readonly=True)
     try:
-        events = db.query(Event).filter(Event.user_id == user_id).all()
-        return events
+        query = db.query(Event).filter(Event.user_id == user_id)
+        lookback = span_bounds.lookback(db, span_bounds.EVENTS, span_bounds.USER, user_id)
+        return _list_events(query, lookback, limit, cursor, start, end, load)
     except SQLAlchemyError as e:
         print(f"Database error getting events for user: {e}")
         return []
     finally:
         db.close()
 
-def get_events_for_child(child_id: int):
-    db = SessionLocal()
+def get_events_for_child(child_id: int, limit: int = None, cursor: str = None,
+                         start: datetime = None, end: datetime = None, load=()):
+    """A child's events in start time order; a Page of at most `limit` when given.
+
+    `start`/`end` (naive UTC) restrict the result to events overlapping that window.
+    With an `end`, recurring events are expanded into their occurrences in the window
+    and pages follow the occurrences' time order.
+    `load` is a loading plan (src/loading.py) for the relationships the caller uses.
+    """
+    db = get_session(readonly=True)
     try:
-        events = db.query(Event).filter(Event.child_id == child_id).all()
-        return events
+        query = db.query(Event).filter(Event.child_id == child_id)
+        lookback = span_bounds.lookback(db, span_bounds.EVENTS, span_bounds.CHILD, child_id)
+        return _list_events(query, lookback, limit, cursor, start, end, load)
     except SQLAlchemyError as e:
         print(f"Database error getting events for child: {e}")
         return []
     finally:
         db.close()
 
-def get_events_for_institution(institution_id: int):
-    db = SessionLocal()
+def get_events_for_institution(institution_id: int, load=()):
+    db = get_session(readonly=True)
     try:
-        events = db.query(Event).filter(Event.institution_id == institution_id).all()
+        events = db.query(Event).filter(Event.institution_id == institution_id).options(*load).all()
         return events
     except SQLAlchemyError as e:
         print(f"Database error getting events for institution: {e}")
@@ -112,76 +283,101 @@ def get_events_for_institution(institution_id: int):
     finally:
         db.close()
 
-def update_event(event_id: int, title: str = None, description: str = None,
-                 start_time_str: str = None, end_time_str: str = None,
-                 linked_user_id: int = None, linked_child_id: int = None,
-                 unlink_user: bool = False, unlink_child: bool = False, timezone: str = 'UTC'): # Added unlink flags
-    db = SessionLocal()
-    try:
-        event = db.query(Event).filter(Event.id == event_id).first()
-        if not event:
-            print("Error: Event not found.")
-            return None
+def _apply_event_updates(event: Event, title: str = None, description: str = None,
+                         start_time_str: str = None, end_time_str: str = None,
+                         linked_user_id: int = None, linked_child_id: int = None,
+                         unlink_user: bool = False, unlink_child: bool = False, timezone: str = 'UTC',
+                         institution_id: int = None, unlink_institution: bool = False,
+                         recurrence_rule: str = None, recurrence_exdates: list = None):
+    """Apply update_event() changes to an Event. Returns True if anything changed.
 
-        updated = False
-        if title is not None:
-            event.title = title
+    recurrence_rule='' stops an event recurring; exdates replace the stored list.
+    """
+    updated = False
+    times_changed = start_time_str is not None or end_time_str is not None
+    if title is not None:
+        event.title = title
+        updated = True
+    if description is not None:
+        event.description = description
+        updated = True
+    if start_time_str is not None:
+        start_time_dt = _parse_datetime(start_time_str, timezone)
+        if start_time_dt:
+            event.start_time = start_time_dt
             updated = True
-        if description is not None:
-            event.description = description
+        else:
+            print("Warning: Invalid start time format, not updated.")
+    if end_time_str is not None:
+        end_time_dt = _parse_datetime(end_time_str, timezone)
+        if end_time_dt:
+            event.end_time = end_time_dt
             updated = True
-        if start_time_str is not None:
-            start_time_dt = _parse_datetime(start_time_str, timezone)
-            if start_time_dt:
-                event.start_time = start_time_dt
-                updated = True
-            else:
-                print("Warning: Invalid start time format, not updated.")
-        if end_time_str is not None:
-            end_time_dt = _parse_datetime(end_time_str, timezone)
-            if end_time_dt:
-                event.end_time = end_time_dt
-                updated = True
-            else:
-                print("Warning: Invalid end time format, not updated.")
+        else:
+            print("Warning: Invalid end time format, not updated.")
 
-        if unlink_user:
-            event.user_id = None
-            updated = True
-        elif linked_user_id is not None:
-            event.user_id = linked_user_id
-            updated = True
+    if unlink_user:
+        event.user_id = None
+        updated = True
+    elif linked_user_id is not None:
+        event.user_id = linked_user_id
+        updated = True
 
-        if unlink_child:
-            event.child_id = None
-            updated = True
-        elif linked_child_id is not None:
-            event.child_id = linked_child_id
-            updated = True
+    if unlink_child:
+        event.child_id = None
+        updated = True
+    elif linked_child_id is not None:
+        event.child_id = linked_child_id
+        updated = True
 
-        if unlink_institution:
-            event.institution_id = None
-            updated = True
-        elif institution_id is not None:
-            event.institution_id = institution_id
+    if unlink_institution:
+        event.institution_id = None
+        updated = True
+    elif institution_id is not None:
+        event.institution_id = institution_id
+        updated = True
+
+    if recurrence_rule is not None or recurrence_exdates is not None or (times_changed and event.recurrence_rule):
+        rule = event.recurrence_rule if recurrence_rule is None else recurrence_rule
+        try:
+            if recurrence_exdates is None:
+                exdates = event.recurrence_exdates # Already stored as naive UTC
+            else:
+                exdates = _parse_exdates(recurrence_exdates, timezone)
+            fields = _recurrence_fields(event.start_time, event.end_time, rule, exdates, timezone)
+        except ValueError as e:
+            print(f"Warning: {e}; recurrence not updated.")
+        else:
+            for column, value in fields.items():
+                setattr(event, column, value)
             updated = True
+    return updated
+
+def update_event(event_id: int, title: str = None, description: str = None,
+                 start_time_str: str = None, end_time_str: str = None,
+                 linked_user_id: int = None, linked_child_id: int = None,
+                 unlink_user: bool = False, unlink_child: bool = False, timezone: str = 'UTC', # Added unlink flags
+                 institution_id: int = None, unlink_institution: bool = False,
+                 recurrence_rule: str = None, recurrence_exdates: list = None,
+                 reject_conflicts: bool = False):
+    db = get_session()
+    try:
+        event = queries.get_event(db, event_id)
+        if not event:
+            print("Error: Event not found.")
+            return None
 
+        updated = _apply_event_updates(event, title, description, start_time_str, end_time_str,
+                                       linked_user_id, linked_child_id, unlink_user, unlink_child,
+                                       timezone, institution_id, unlink_institution,
+                                       recurrence_rule, recurrence_exdates)
+        if updated and reject_conflicts and _report_conflicts(event, exclude_id=event.id):
+            db.rollback()
+            return None
         if updated:
             db.commit()
             db.refresh(event)
-            if event.user_id:
-                send_notification(event.user_id, {
-                    "type": "event_updated",
-                    "event": event.to_dict(include_user=False, include_child=False)
-                })
-            elif event.child_id:
-                child = db.query(Child).filter(Child.id == event.child_id).first()
-                if child:
-                    for parent in child.parents:
-                        send_notification(parent.id, {
-                            "type": "event_updated",
-                            "event": event.to_dict(include_user=False, include_child=False)
-                        })
+            _notify_for_event(db, event, "event_updated")
         return event
     except SQLAlchemyError as e:
         db.rollback()
@@ -191,9 +387,9 @@ def update_event(event_id: int, title: str = None, description: str = None,
         db.close()
 
 def delete_event(event_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
-        event = db.query(Event).filter(Event.id == event_id).first()
+        event = queries.get_event(db, event_id)
         if not event:
             print("Error: Event not found for deletion.")
             return False
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from src.database import Base
@@ -17,6 +17,11 @@ class Expense(Base):
     payer = relationship("User")
     child = relationship("Child")
 
+    __table_args__ = (
+        Index('ix_expenses_child_id_expense_date', 'child_id', 'expense_date'),
+        Index('ix_expenses_expense_date_id', 'expense_date', 'id'),
+    )
+
     def to_dict(self, include_payer=True, include_child=True):
         data = {
             "id": self.id,
@@ -1,7 +1,8 @@
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
 
-from src.database import SessionLocal
+from src.database import get_session
+from src.pagination import paginate
 from src.expense import Expense
 
 
@@ -19,7 +20,7 @@ def _parse_datetime(dt_str: str):
 
 def add_expense(description: str, amount: float, paid_by_id: int, child_id: int = None,
                 expense_date_str: str = None, notes: str = None):
-    db = SessionLocal()
+    db = get_session()
     try:
         expense_date = _parse_datetime(expense_date_str) or datetime.utcnow()
         new_expense = Expense(
@@ -43,25 +44,30 @@ def add_expense(description: str, amount: float, paid_by_id: int, child_id: int
 
 
 def get_expense(expense_id: int):
-    db = SessionLocal()
+    db = get_session(readonly=True)
     try:
         return db.query(Expense).filter(Expense.id == expense_id).first()
     finally:
         db.close()
 
 
-def get_expenses_for_child(child_id: int):
-    db = SessionLocal()
+def get_expenses_for_child(child_id: int, load=()):
+    db = get_session(readonly=True)
     try:
-        return db.query(Expense).filter(Expense.child_id == child_id).all()
+        return db.query(Expense).filter(Expense.child_id == child_id).options(*load).all()
     finally:
         db.close()
 
 
-def get_all_expenses():
-    db = SessionLocal()
+def get_all_expenses(limit: int = None, cursor: str = None, load=()):
+    """Expenses newest first; a Page of at most `limit` when given.
+
+    `load` is a loading plan (src/loading.py) for the relationships the caller uses.
+    """
+    db = get_session(readonly=True)
     try:
-        return db.query(Expense).all()
+        return paginate(db.query(Expense).options(*load), Expense.id, Expense.expense_date, limit, cursor,
+                        descending=True)
     finally:
         db.close()
 
@@ -69,7 +75,7 @@ def get_all_expenses():
 def update_expense(expense_id: int, description: str = None, amount: float = None,
                    paid_by_id: int = None, child_id: int = None,
                    expense_date_str: str = None, notes: str = None):
-    db = SessionLocal()
+    db = get_session()
     try:
         exp = db.query(Expense).filter(Expense.id == expense_id).first()
         if not exp:
@@ -101,7 +107,7 @@ def update_expense(expense_id: int, description: str = None, amount: float = Non
 
 
 def delete_expense(expense_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         exp = db.query(Expense).filter(Expense.id == expense_id).first()
         if not exp:
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, event, inspect, insert, select, update
+from sqlalchemy.orm import Session
+from src.database import Base
+from src.event import Event
+from src.residency_period import ResidencyPeriod
+from src.shift import Shift
+
+# Version counter per calendar feed (src/calendar_feed.py). Every change to an
+# event, shift or residency period bumps the feeds it appears in, so a feed's
+# ETag and Last-Modified come from one primary-key lookup here instead of a
+# scan of the tables behind it. ORM changes are picked up by the flush hook at
+# the bottom of this module; bulk inserts that bypass the ORM call touch().
+
+USER_FEED = "user"
+CHILD_FEED = "child"
+
+class FeedState(Base):
+    __tablename__ = "calendar_feed_state"
+
+    owner_type = Column(String, primary_key=True) # USER_FEED or CHILD_FEED
+    owner_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    modified_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<FeedState({self.owner_type}={self.owner_id}, version={self.version})>"
+
+def get_state(db, owner_type: str, owner_id: int):
+    """(version, modified_at) of a feed; (0, None) if it never changed."""
+    row = db.execute(
+        select(FeedState.version, FeedState.modified_at)
+        .where(FeedState.owner_type == owner_type, FeedState.owner_id == owner_id)
+    ).first()
+    return (row.version, row.modified_at) if row else (0, None)
+
+def touch(connection, feeds, now: datetime = None):
+    """Bump the version of each (owner_type, owner_id) in `feeds` on a Connection or Session."""
+    now = (now or datetime.utcnow()).replace(microsecond=0)
+    for owner_type, owner_id in sorted(set(feeds)):
+        result = connection.execute(
+            update(FeedState)
+            .where(FeedState.owner_type == owner_type, FeedState.owner_id == owner_id)
+            .values(version=FeedState.version + 1, modified_at=now)
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(FeedState).values(owner_type=owner_type, owner_id=owner_id,
+                                                        version=1, modified_at=now))
+
+def _owner_values(obj, attribute: str):
+    """Current and, if it was changed in this flush, previous value of a foreign key."""
+    history = inspect(obj).attrs[attribute].history
+    values = set(history.added) | set(history.unchanged) | set(history.deleted)
+    if not values:
+        values = {getattr(obj, attribute)}
+    return {value for value in values if value is not None}
+
+def _feeds_for(obj):
+    if isinstance(obj, Event):
+        return ([(USER_FEED, user_id) for user_id in _owner_values(obj, 'user_id')] +
+                [(CHILD_FEED, child_id) for child_id in _owner_values(obj, 'child_id')])
+    if isinstance(obj, Shift):
+        return [(USER_FEED, user_id) for user_id in _owner_values(obj, 'user_id')]
+    if isinstance(obj, ResidencyPeriod):
+        return ([(USER_FEED, parent_id) for parent_id in _owner_values(obj, 'parent_id')] +
+                [(CHILD_FEED, child_id) for child_id in _owner_values(obj, 'child_id')])
+    return []
+
+@event.listens_for(Session, "after_flush")
+def _bump_changed_feeds(session, flush_context):
+    # new/dirty/deleted still describe what this flush wrote
+    feeds = []
+    for obj in session.new:
+        feeds.extend(_feeds_for(obj))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            feeds.extend(_feeds_for(obj))
+    for obj in session.deleted:
+        feeds.extend(_feeds_for(obj))
+    if feeds:
+        touch(session.connection(), feeds)
@@ -1,10 +1,11 @@
 from sqlalchemy.exc import SQLAlchemyError
-from src.database import SessionLocal
+from src.database import get_session
+from src.pagination import paginate
 from src.grocery import GroceryItem
 
 
 def add_item(name: str, quantity: str = None, user_id: int = None):
-    db = SessionLocal()
+    db = get_session()
     try:
         item = GroceryItem(name=name, quantity=quantity, user_id=user_id)
         db.add(item)
@@ -19,13 +20,13 @@ def add_item(name: str, quantity: str = None, user_id: int = None):
         db.close()
 
 
-def get_items(user_id: int = None):
-    db = SessionLocal()
+def get_items(user_id: int = None, limit: int = None, cursor: str = None):
+    db = get_session(readonly=True)
     try:
         query = db.query(GroceryItem)
         if user_id is not None:
             query = query.filter(GroceryItem.user_id == user_id)
-        return query.all()
+        return paginate(query, GroceryItem.id, limit=limit, cursor=cursor)
     except SQLAlchemyError as e:
         print(f"Database error retrieving grocery items: {e}")
         return []
@@ -34,7 +35,7 @@ def get_items(user_id: int = None):
 
 
 def update_item(item_id: int, name: str = None, quantity: str = None, is_completed: bool = None):
-    db = SessionLocal()
+    db = get_session()
     try:
         item = db.query(GroceryItem).filter(GroceryItem.id == item_id).first()
         if not item:
@@ -57,7 +58,7 @@ def update_item(item_id: int, name: str = None, quantity: str = None, is_complet
 
 
 def delete_item(item_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         item = db.query(GroceryItem).filter(GroceryItem.id == item_id).first()
         if not item:
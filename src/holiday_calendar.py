@@ -0,0 +1,31 @@
+from sqlalchemy import Column, Integer, String, JSON
+from src.database import Base
+
+class HolidayCalendar(Base):
+    """Holidays of a region or employer that patterns and users can reference (see holiday_calendar_manager)."""
+    __tablename__ = 'holiday_calendars'
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    region = Column(String, nullable=True) # e.g. 'NO', 'US-CA'
+    employer = Column(String, nullable=True)
+    start_year = Column(Integer, nullable=True) # Rules apply from this year (inclusive); open when NULL
+    end_year = Column(Integer, nullable=True)
+    rules = Column(JSON, nullable=False)
+    # Fixed date:  {"name": "Christmas Day", "month": 12, "day": 25}
+    # Nth weekday: {"name": "Thanksgiving", "month": 11, "weekday": "thursday", "nth": 4} (nth -1 is the last)
+    # One-off:     {"name": "Good Friday", "date": "2025-04-18"}
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "region": self.region,
+            "employer": self.employer,
+            "start_year": self.start_year,
+            "end_year": self.end_year,
+            "rules": self.rules
+        }
+
+    def __repr__(self):
+        return f"<HolidayCalendar(id={self.id}, name='{self.name}', region='{self.region}')>"
@@ -0,0 +1,217 @@
+import calendar
+from datetime import date
+from functools import lru_cache
+import json
+
+from sqlalchemy import select, update, or_
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.database import get_session
+from src import feed_state
+from src.holiday_calendar import HolidayCalendar
+from src.pattern_assignment import ShiftPatternAssignment
+from src.shift_pattern import ShiftPattern
+from src.user import User
+
+# A calendar's rules are expanded into a set of dates once per year and cached
+# by the rules themselves, so every generation run, roster and virtual shift
+# read that needs a year shares one frozenset, and an edited calendar simply
+# misses the cache. Shifts are not generated on a holiday of the pattern's
+# calendar or of the user's.
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+def _rule_date(rule: dict, year: int):
+    """The date a rule falls on in `year`, or None when it has none that year."""
+    if 'date' in rule:
+        day = date.fromisoformat(rule['date'])
+        return day if day.year == year else None
+    month = int(rule['month'])
+    days_in_month = calendar.monthrange(year, month)[1]
+    if 'weekday' in rule:
+        weekday = WEEKDAYS.index(rule['weekday'].lower())
+        nth = int(rule.get('nth', 1))
+        if nth > 0:
+            day = 1 + (weekday - date(year, month, 1).weekday()) % 7 + 7 * (nth - 1)
+        else:
+            day = days_in_month - (date(year, month, days_in_month).weekday() - weekday) % 7 + 7 * (nth + 1)
+        return date(year, month, day) if 1 <= day <= days_in_month else None
+    day = int(rule['day'])
+    if day > days_in_month: # 29 February outside leap years
+        return None
+    return date(year, month, day)
+
+def validate_rules(rules):
+    """Raise ValueError unless `rules` is a list of valid holiday rules."""
+    if not isinstance(rules, list):
+        raise ValueError("Holiday calendar rules must be a list.")
+    for rule in rules:
+        try:
+            if not isinstance(rule, dict) or rule.get('nth') == 0:
+                raise ValueError
+            if 'date' not in rule and 'weekday' not in rule:
+                date(2024, int(rule['month']), int(rule['day'])) # A leap year, so 29 February is valid
+            _rule_date(rule, 2024)
+        except (KeyError, TypeError, ValueError, AttributeError):
+            raise ValueError(f"Invalid holiday rule: {rule!r}")
+
+@lru_cache(maxsize=1024)
+def _year_dates(rules_json: str, year: int):
+    dates = (_rule_date(rule, year) for rule in json.loads(rules_json))
+    return frozenset(day for day in dates if day is not None)
+
+def calendar_dates(holiday_calendar: HolidayCalendar, start: date, end: date):
+    """The calendar's holidays in the years [start, end] touches, limited to its own year range."""
+    first = max(start.year, holiday_calendar.start_year or start.year)
+    last = min(end.year, holiday_calendar.end_year or end.year)
+    rules_json = json.dumps(holiday_calendar.rules, sort_keys=True)
+    return frozenset().union(*(_year_dates(rules_json, year) for year in range(first, last + 1)))
+
+def holiday_dates(db_session, calendar_ids, start: date, end: date, extra=None):
+    """Holidays between `start` and `end` from the given calendars (None ids are skipped),
+    plus `extra`, a list of ISO date strings. Raises ValueError for a bad date in `extra`."""
+    dates = frozenset(date.fromisoformat(d) for d in extra) if extra else frozenset()
+    for calendar_id in {calendar_id for calendar_id in calendar_ids if calendar_id is not None}:
+        holiday_calendar = db_session.get(HolidayCalendar, calendar_id)
+        if holiday_calendar:
+            dates |= calendar_dates(holiday_calendar, start, end)
+    return dates
+
+def _touch_affected_feeds(db_session, calendar_id: int):
+    # Virtual shifts of users working a pattern under this calendar change with it
+    user_ids = db_session.scalars(
+        select(ShiftPatternAssignment.user_id)
+        .join(ShiftPattern, ShiftPattern.id == ShiftPatternAssignment.pattern_id)
+        .join(User, User.id == ShiftPatternAssignment.user_id)
+        .where(or_(ShiftPattern.holiday_calendar_id == calendar_id, User.holiday_calendar_id == calendar_id))
+    ).all()
+    feed_state.touch(db_session, [(feed_state.USER_FEED, user_id) for user_id in user_ids])
+
+def create_holiday_calendar(name: str, rules: list, region: str = None, employer: str = None,
+                            start_year: int = None, end_year: int = None):
+    try:
+        validate_rules(rules)
+    except ValueError as ve:
+        print(f"Error: {ve}")
+        return None
+    if start_year and end_year and start_year > end_year:
+        print("Error: Start year cannot be after end year.")
+        return None
+
+    db = get_session()
+    try:
+        new_calendar = HolidayCalendar(name=name, rules=rules, region=region, employer=employer,
+                                       start_year=start_year, end_year=end_year)
+        db.add(new_calendar)
+        db.commit()
+        db.refresh(new_calendar)
+        return new_calendar
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error creating holiday calendar: {e}")
+        return None
+    finally:
+        db.close()
+
+def get_holiday_calendar(calendar_id: int):
+    db = get_session(readonly=True)
+    try:
+        return db.query(HolidayCalendar).filter(HolidayCalendar.id == calendar_id).first()
+    except SQLAlchemyError as e:
+        print(f"Database error getting holiday calendar: {e}")
+        return None
+    finally:
+        db.close()
+
+def get_holiday_calendars(region: str = None, employer: str = None):
+    db = get_session(readonly=True)
+    try:
+        query = db.query(HolidayCalendar)
+        if region is not None:
+            query = query.filter(HolidayCalendar.region == region)
+        if employer is not None:
+            query = query.filter(HolidayCalendar.employer == employer)
+        return query.order_by(HolidayCalendar.name, HolidayCalendar.id).all()
+    except SQLAlchemyError as e:
+        print(f"Database error getting holiday calendars: {e}")
+        return []
+    finally:
+        db.close()
+
+def update_holiday_calendar(calendar_id: int, name: str = None, rules: list = None, region: str = None,
+                            employer: str = None, start_year: int = None, end_year: int = None):
+    if rules is not None:
+        try:
+            validate_rules(rules)
+        except ValueError as ve:
+            print(f"Error: {ve}")
+            return None
+
+    db = get_session()
+    try:
+        holiday_calendar = db.query(HolidayCalendar).filter(HolidayCalendar.id == calendar_id).first()
+        if not holiday_calendar:
+            print("Error: Holiday calendar not found.")
+            return None
+
+        updated = False
+        for field, value in (("name", name), ("rules", rules), ("region", region), ("employer", employer),
+                             ("start_year", start_year), ("end_year", end_year)):
+            if value is not None:
+                setattr(holiday_calendar, field, value)
+                updated = True
+        if updated:
+            _touch_affected_feeds(db, calendar_id)
+            db.commit()
+            db.refresh(holiday_calendar)
+        return holiday_calendar
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error updating holiday calendar: {e}")
+        return None
+    finally:
+        db.close()
+
+def delete_holiday_calendar(calendar_id: int):
+    """Delete a calendar; patterns and users referencing it are left without one."""
+    db = get_session()
+    try:
+        holiday_calendar = db.query(HolidayCalendar).filter(HolidayCalendar.id == calendar_id).first()
+        if not holiday_calendar:
+            print("Error: Holiday calendar not found for deletion.")
+            return False
+
+        _touch_affected_feeds(db, calendar_id)
+        db.execute(update(ShiftPattern).where(ShiftPattern.holiday_calendar_id == calendar_id)
+                   .values(holiday_calendar_id=None))
+        db.execute(update(User).where(User.holiday_calendar_id == calendar_id).values(holiday_calendar_id=None))
+        db.delete(holiday_calendar)
+        db.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error deleting holiday calendar: {e}")
+        return False
+    finally:
+        db.close()
+
+def set_user_holiday_calendar(user_id: int, calendar_id: int = None):
+    """Have a user observe a calendar's holidays (None for none). Returns the user, or None."""
+    db = get_session()
+    try:
+        user = db.query(User).filter(User.id == user_id).first()
+        if not user or (calendar_id is not None and not db.get(HolidayCalendar, calendar_id)):
+            print("Error: User or holiday calendar not found.")
+            return None
+
+        user.holiday_calendar_id = calendar_id
+        feed_state.touch(db, [(feed_state.USER_FEED, user_id)]) # Their virtual shifts may change
+        db.commit()
+        db.refresh(user)
+        return user
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error setting user holiday calendar: {e}")
+        return None
+    finally:
+        db.close()
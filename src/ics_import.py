@@ -0,0 +1,237 @@
+from datetime import datetime, timedelta
+import re
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.database import SessionLocal
+from src.event import Event
+from src.event_manager import _recurrence_fields
+from src import feed_state, span_bounds
+from src.notification import send_notifications
+from src.serializers import zone, UTC
+
+# Import of .ics files (RFC 5545) into a user's events. The file is read line by
+# line and each VEVENT is turned into a row as soon as it is complete, so a
+# school year of events never sits in memory as a whole. Rows are inserted with
+# one executemany per batch and events whose UID the user already has are
+# skipped, so re-importing an updated calendar only adds what is new. One
+# summary notification is sent at the end.
+#
+# The import uses its own session rather than the request's unit of work, so
+# each batch is really committed: the write lock is held while a batch is
+# written, not while the upload is read, and an error keeps earlier batches.
+#
+# Recurring events keep their RRULE when it is in the subset src/recurrence.py
+# supports; otherwise only the first occurrence is imported. Modified single
+# occurrences (RECURRENCE-ID) and cancelled events are skipped.
+
+BATCH_SIZE = 500
+
+_DURATION_RE = re.compile(
+    r'^(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?'
+    r'(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$')
+
+def _unfold(lines):
+    """Logical content lines: continuation lines (leading space or tab) joined to the previous one."""
+    pending = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if line[:1] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+            continue
+        if pending:
+            yield pending
+        pending = line
+    if pending:
+        yield pending
+
+def _parse_content_line(line: str):
+    """(NAME, {PARAM: value}, value) for one content line; quoted parameter values may contain ':' or ';'."""
+    in_quotes, split_at = False, None
+    for i, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif char == ':' and not in_quotes:
+            split_at = i
+            break
+    if split_at is None:
+        return None
+    head, value = line[:split_at], line[split_at + 1:]
+    name, *raw_params = re.split(r';(?=(?:[^"]*"[^"]*")*[^"]*$)', head)
+    params = {}
+    for raw_param in raw_params:
+        key, _, param_value = raw_param.partition('=')
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+def iter_vevents(lines):
+    """Yield each VEVENT as {NAME: [(params, value), ...]}; nested components (VALARM) are ignored."""
+    properties, depth = None, 0
+    for line in _unfold(lines):
+        parsed = _parse_content_line(line)
+        if parsed is None:
+            continue
+        name, params, value = parsed
+        if name == 'BEGIN':
+            if value.upper() == 'VEVENT' and properties is None:
+                properties, depth = {}, 0
+            elif properties is not None:
+                depth += 1
+        elif name == 'END' and properties is not None:
+            if depth:
+                depth -= 1
+            elif value.upper() == 'VEVENT':
+                yield properties
+                properties = None
+        elif properties is not None and not depth:
+            properties.setdefault(name, []).append((params, value))
+
+def _unescape(text: str):
+    return re.sub(r'\\([\\;,nN])', lambda m: '\n' if m.group(1) in 'nN' else m.group(1), text)
+
+def _first(properties, name):
+    values = properties.get(name)
+    return values[0] if values else (None, None)
+
+def _parse_ics_datetime(value: str, params: dict, timezone: str):
+    """(naive UTC datetime, is_date) for a DATE or DATE-TIME value. Raises ValueError."""
+    value = value.strip()
+    if params.get('VALUE', '').upper() == 'DATE' or len(value) == 8:
+        local = datetime.strptime(value, '%Y%m%d')
+        is_date = True
+    elif value.endswith('Z'):
+        return datetime.strptime(value, '%Y%m%dT%H%M%SZ'), False
+    else:
+        local = datetime.strptime(value, '%Y%m%dT%H%M%S')
+        is_date = False
+    tz = zone(_timezone_of(params, timezone))
+    return local.replace(tzinfo=tz).astimezone(UTC).replace(tzinfo=None), is_date
+
+def _timezone_of(params: dict, timezone: str):
+    """The TZID of a value if it is a known zone name, else the import's timezone."""
+    tzid = params.get('TZID')
+    if tzid:
+        try:
+            zone(tzid)
+            return tzid
+        except (KeyError, ValueError):
+            pass # Custom VTIMEZONE ids such as "Eastern Standard Time" are not looked up
+    return timezone
+
+def _parse_duration(value: str):
+    match = _DURATION_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid DURATION: {value}")
+    parts = {key: int(amount or 0) for key, amount in match.groupdict().items() if key != 'sign'}
+    duration = timedelta(**parts)
+    return -duration if match.group('sign') == '-' else duration
+
+def _event_row(properties, user_id: int, timezone: str):
+    """Event column values for a VEVENT, or None if it cannot be imported. Raises ValueError for bad values."""
+    if 'RECURRENCE-ID' in properties:
+        return None # An override of one occurrence; the series itself is imported
+    status = _first(properties, 'STATUS')[1]
+    if status and status.upper() == 'CANCELLED':
+        return None
+    start_params, start_value = _first(properties, 'DTSTART')
+    if start_value is None:
+        return None
+    start_time, is_date = _parse_ics_datetime(start_value, start_params, timezone)
+
+    end_params, end_value = _first(properties, 'DTEND')
+    if end_value is not None:
+        end_time = _parse_ics_datetime(end_value, end_params, timezone)[0]
+    elif 'DURATION' in properties:
+        end_time = start_time + _parse_duration(_first(properties, 'DURATION')[1])
+    else:
+        end_time = start_time + timedelta(days=1) if is_date else start_time
+
+    # A UTC start recurs in UTC; a local or floating one keeps its wall-clock time
+    series_timezone = 'UTC' if start_value.strip().endswith('Z') else _timezone_of(start_params, timezone)
+    rule = _first(properties, 'RRULE')[1]
+    exdates = []
+    for exdate_params, exdate_value in properties.get('EXDATE', []):
+        exdates.extend(_parse_ics_datetime(v, exdate_params, timezone)[0].isoformat()
+                       for v in exdate_value.split(',') if v.strip())
+    try:
+        recurrence_fields = _recurrence_fields(start_time, end_time, rule, exdates, series_timezone)
+    except ValueError:
+        # Outside the supported RRULE subset: keep the first occurrence only
+        recurrence_fields = _recurrence_fields(start_time, end_time, None)
+
+    summary, description = _first(properties, 'SUMMARY')[1], _first(properties, 'DESCRIPTION')[1]
+    uid = _first(properties, 'UID')[1]
+    return {
+        "title": _unescape(summary) if summary else "(untitled)",
+        "description": _unescape(description) if description else None,
+        "start_time": start_time,
+        "end_time": end_time,
+        "user_id": user_id,
+        "child_id": None,
+        "institution_id": None,
+        "ical_uid": uid.strip() if uid else None,
+        **recurrence_fields
+    }
+
+def _insert_batch(db, user_id: int, rows: list, seen_uids: set):
+    """Insert the rows whose UID is new for the user; returns (inserted, duplicates)."""
+    uids = {row["ical_uid"] for row in rows if row["ical_uid"]}
+    if uids:
+        seen_uids.update(db.scalars(
+            select(Event.ical_uid).where(Event.user_id == user_id, Event.ical_uid.in_(uids))
+        ).all())
+    new_rows = []
+    for row in rows:
+        if row["ical_uid"]:
+            if row["ical_uid"] in seen_uids:
+                continue
+            seen_uids.add(row["ical_uid"])
+        new_rows.append(row)
+    if new_rows:
+        db.execute(insert(Event), new_rows)
+        # Core inserts skip the ORM flush hooks that version calendar feeds and widen span bounds
+        feed_state.touch(db, [(feed_state.USER_FEED, user_id)])
+        span_bounds.record(db, span_bounds.EVENTS, new_rows)
+    db.commit() # Also ends the UID lookup's transaction before more of the file is read
+    return len(new_rows), len(rows) - len(new_rows)
+
+def import_ics(user_id: int, lines, timezone: str = 'UTC', batch_size: int = BATCH_SIZE):
+    """Import the VEVENTs of an .ics file (any iterable of text lines) as the user's events.
+
+    Times without a zone are read in `timezone`. Each batch is committed on its
+    own session, even inside a unit of work. Returns a summary
+    {"imported", "duplicates", "skipped"}, or None on a database error (batches
+    committed before the error stay imported).
+    """
+    summary = {"imported": 0, "duplicates": 0, "skipped": 0}
+    seen_uids = set()
+    db = SessionLocal()
+    try:
+        batch = []
+        for properties in iter_vevents(lines):
+            try:
+                row = _event_row(properties, user_id, timezone)
+            except ValueError as e:
+                print(f"Warning: Skipping VEVENT {_first(properties, 'UID')[1]}: {e}")
+                row = None
+            if row is None:
+                summary["skipped"] += 1
+                continue
+            batch.append(row)
+            if len(batch) >= batch_size:
+                inserted, duplicates = _insert_batch(db, user_id, batch, seen_uids)
+                summary["imported"] += inserted
+                summary["duplicates"] += duplicates
+                batch = []
+        inserted, duplicates = _insert_batch(db, user_id, batch, seen_uids)
+        summary["imported"] += inserted
+        summary["duplicates"] += duplicates
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error importing events: {e}")
+        return None
+    finally:
+        db.close()
+    send_notifications([user_id], {"type": "events_imported", **summary})
+    return summary
@@ -0,0 +1,49 @@
+# A static interval index: intervals sorted by start, read as an implicit
+# balanced binary tree (the middle of each range is the node, the halves its
+# subtrees). Each node also stores the largest end in its subtree, so a query
+# skips every subtree that ends before the query starts and stops at the first
+# start past its end. A query costs O(log n) plus O(log n) per match at worst,
+# and close to O(log n + k) for calendar data; the build is O(n log n).
+# Intervals are half-open [start, end), like the time windows elsewhere.
+
+class IntervalIndex:
+    def __init__(self, intervals=()):
+        """`intervals` is an iterable of (start, end, item); any comparable start/end values work."""
+        entries = sorted(intervals, key=lambda entry: (entry[0], entry[1]))
+        self._starts = [entry[0] for entry in entries]
+        self._ends = [entry[1] for entry in entries]
+        self._items = [entry[2] for entry in entries]
+        self._max_end = list(self._ends)
+        self._build(0, len(entries))
+
+    def _build(self, lo, hi):
+        """Fill _max_end for the subtree over [lo, hi); returns its max end (None if empty)."""
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        for child_max in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child_max is not None and child_max > self._max_end[mid]:
+                self._max_end[mid] = child_max
+        return self._max_end[mid]
+
+    def __len__(self):
+        return len(self._items)
+
+    def overlapping(self, start, end):
+        """(start, end, item) for every interval overlapping [start, end), in start order."""
+        found = []
+        self._search(0, len(self._items), start, end, found)
+        return found
+
+    def _search(self, lo, hi, start, end, found):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] <= start:
+            return # Everything in this subtree ends before the query starts
+        self._search(lo, mid, start, end, found)
+        if self._starts[mid] >= end:
+            return # mid and the whole right subtree start after the query ends
+        if self._ends[mid] > start:
+            found.append((self._starts[mid], self._ends[mid], self._items[mid]))
+        self._search(mid + 1, hi, start, end, found)
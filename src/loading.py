@@ -0,0 +1,52 @@
+from sqlalchemy.orm import selectinload
+
+from src.child import Child
+from src.event import Event
+from src.expense import Expense
+from src.residency_period import ResidencyPeriod
+from src.shift import Shift
+from src.shift_pattern import ShiftPattern
+from src.task import Task
+from src.user import User
+
+# Loading plans for the list functions in the managers (their `load=` argument).
+# A plan names the relationships the caller is about to serialize or render;
+# each is then read with one SELECT ... IN for the whole result, so a page of N
+# rows costs a fixed number of queries instead of one lazy load per row, and
+# the objects are complete before the manager closes its session (outside a
+# request, lazy loads on the returned objects would fail as detached).
+# Callers pick the plan matching the to_dict() options or template they use.
+
+def plan(*relationships):
+    """A loading plan eagerly loading the given relationship attributes."""
+    return tuple(selectinload(relationship) for relationship in relationships)
+
+NOTHING = ()
+
+# Event.to_dict() and its include_user=False / include_child=False variants
+EVENT_LINKS = plan(Event.user, Event.child, Event.institution)
+EVENT_LINKS_FOR_USER = plan(Event.child, Event.institution)
+EVENT_LINKS_FOR_CHILD = plan(Event.user, Event.institution)
+# events.html shows the child's name
+EVENT_CHILD = plan(Event.child)
+
+TASK_LINKS = plan(Task.user, Task.event)
+TASK_LINKS_FOR_USER = plan(Task.event)
+TASK_LINKS_FOR_EVENT = plan(Task.user)
+
+CHILD_PARENTS = plan(Child.parents)
+
+EXPENSE_LINKS = plan(Expense.payer, Expense.child)
+# expenses.html shows the child's name
+EXPENSE_CHILD = plan(Expense.child)
+
+RESIDENCY_LINKS = plan(ResidencyPeriod.child, ResidencyPeriod.parent)
+RESIDENCY_PARENT = plan(ResidencyPeriod.parent)
+
+# Shift.to_dict() checks source_pattern whenever a shift came from a pattern
+SHIFT_PATTERN = plan(Shift.source_pattern)
+SHIFT_LINKS = plan(Shift.owner, Shift.source_pattern)
+
+PATTERN_OWNER = plan(ShiftPattern.owner)
+
+USER_CUSTODIAL_PERIODS = plan(User.custodial_periods)
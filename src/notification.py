@@ -1,8 +1,8 @@
 import queue
 from collections import defaultdict
 import json
-from src.database import SessionLocal
-from src.user import User
+from src.database import get_session
+from src import queries
 
 # Queues per user for SSE messages
 _user_queues = defaultdict(queue.Queue)
@@ -11,13 +11,46 @@ def get_user_queue(user_id: int):
     """Return the Queue object for a user."""
     return _user_queues[user_id]
 
+def _enqueue(user_id: int, message: dict):
+    """Put an already-approved message on the user's SSE queue."""
+    _user_queues[user_id].put(json.dumps(message))
+
+def _enqueue_many(user_ids, message: dict):
+    """Put one message on several approved users' queues, serializing it once."""
+    payload = json.dumps(message)
+    for user_id in user_ids:
+        _user_queues[user_id].put(payload)
+
 def send_notification(user_id: int, message: dict):
     """Send a notification to a user if they have SSE enabled."""
-    db = SessionLocal()
+    db = get_session(readonly=True)
     try:
-        user = db.query(User).filter(User.id == user_id).first()
-        if not user or not getattr(user, "prefers_sse", True):
+        if not queries.get_user_prefers_sse(db, user_id):
             return
     finally:
         db.close()
-    _user_queues[user_id].put(json.dumps(message))
+    _enqueue(user_id, message)
+
+# Fan-out: recipients and their preferences come from one query, the message is
+# serialized once, and all queues are filled together. Pass the caller's session
+# as `db` to avoid opening another one.
+
+def send_notifications(user_ids, message: dict, db=None):
+    """Send one notification to each of the given users that has SSE enabled."""
+    session = db or get_session(readonly=True)
+    try:
+        recipients = queries.get_sse_recipients(session, set(user_ids)) if user_ids else []
+    finally:
+        if db is None:
+            session.close()
+    _enqueue_many(recipients, message)
+
+def send_child_notification(child_id: int, message: dict, db=None):
+    """Send a notification to every parent of a child that has SSE enabled."""
+    session = db or get_session(readonly=True)
+    try:
+        recipients = queries.get_child_sse_recipients(session, child_id)
+    finally:
+        if db is None:
+            session.close()
+    _enqueue_many(recipients, message)
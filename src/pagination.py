@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+# Keyset ("seek") pagination for list queries. Instead of OFFSET, each page
+# continues strictly after the (sort value, id) of the last row of the previous
+# page, so every page is an index range scan of at most `limit` rows no matter
+# how much history precedes it. The position travels as an opaque cursor string.
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+class Page(list):
+    """A list of rows plus the cursor for the next page (None on the last page)."""
+
+    def __init__(self, rows=(), next_cursor: str = None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+def clamp_limit(limit: int = None):
+    """The page size to use for a client-supplied limit."""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
+
+def encode_cursor(sort_value, row_id: int):
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str, sort_column=None):
+    """Return (sort value, id) from a cursor. Raises ValueError if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if sort_value is not None and sort_column is not None and sort_column.type.python_type is datetime:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, NotImplementedError):
+        raise ValueError("Invalid pagination cursor.")
+
+def paginate(query, id_column, sort_column=None, limit: int = None, cursor: str = None,
+             descending: bool = False):
+    """Order `query` by (sort_column, id_column) and return one Page of it.
+
+    Without a limit all remaining rows are returned (next_cursor is None). NULL
+    sort values come first in ascending order and last in descending order.
+    """
+    if sort_column is None:
+        order_by = [id_column.desc() if descending else id_column.asc()]
+    elif descending:
+        order_by = [sort_column.desc().nulls_last(), id_column.desc()]
+    else:
+        order_by = [sort_column.asc().nulls_first(), id_column.asc()]
+    query = query.order_by(*order_by)
+
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort_column)
+        after_id = id_column < last_id if descending else id_column > last_id
+        if sort_column is None:
+            query = query.filter(after_id)
+        elif last_value is None:
+            if descending:
+                query = query.filter(sort_column.is_(None), after_id)
+            else:
+                query = query.filter(or_(and_(sort_column.is_(None), after_id), sort_column.isnot(None)))
+        elif descending:
+            query = query.filter(or_(sort_column < last_value,
+                                     and_(sort_column == last_value, after_id),
+                                     sort_column.is_(None)))
+        else:
+            query = query.filter(or_(sort_column > last_value, and_(sort_column == last_value, after_id)))
+
+    if limit is None:
+        return Page(query.all())
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return Page(rows)
+    rows = rows[:limit]
+    last = rows[-1]
+    last_value = getattr(last, sort_column.key) if sort_column is not None else None
+    return Page(rows, encode_cursor(last_value, getattr(last, id_column.key)))
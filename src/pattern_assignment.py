@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, Date, JSON, ForeignKey, Index
+from sqlalchemy.orm import relationship
+from src.database import Base
+
+class ShiftPatternAssignment(Base):
+    """A user working a shift pattern without its shifts being stored (see src/virtual_shifts.py)."""
+    __tablename__ = 'shift_pattern_assignments'
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    pattern_id = Column(Integer, ForeignKey('shift_patterns.id'), nullable=False)
+    offset = Column(Integer, nullable=False, default=0) # The user's cycle starts this many days after the pattern's
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True) # Inclusive; open-ended when NULL
+    timezone = Column(String, nullable=False, default='UTC') # Pattern times are wall-clock times here
+    exceptions = Column(JSON, nullable=True) # {"YYYY-MM-DD": "off" | {"name", "start_time", "end_time"}}
+
+    pattern = relationship("ShiftPattern")
+
+    __table_args__ = (
+        Index('ix_shift_pattern_assignments_user_id', 'user_id'),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "pattern_id": self.pattern_id,
+            "offset": self.offset,
+            "start_date": self.start_date.isoformat(),
+            "end_date": self.end_date.isoformat() if self.end_date else None,
+            "timezone": self.timezone,
+            "exceptions": self.exceptions or {}
+        }
+
+    def __repr__(self):
+        return f"<ShiftPatternAssignment(user_id={self.user_id}, pattern_id={self.pattern_id}, offset={self.offset})>"
@@ -0,0 +1,131 @@
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import json
+
+from src.serializers import zone
+
+# Shift patterns compiled once into a cycle lookup table. A pattern repeats
+# every `cycle_days` days from a reference date: a Rotating pattern's cycle is
+# the sum of its segments' days, a Fixed pattern's is the week (the reference is
+# a Monday). The table holds each day of the cycle's segment with its times
+# already parsed, and only the working days are kept, so generating a range
+# steps through whole cycles and never looks at an off day. Compiled patterns
+# are cached by their definition, so every generation run for a pattern shares one.
+#
+# Times in a definition are local wall-clock times in the timezone a run asks
+# for; the shifts produced are naive UTC, as stored.
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+_FIXED_REFERENCE = date(2024, 1, 1) # A Monday
+
+# start/end are datetime.time, or None when the definition leaves them out
+Segment = namedtuple("Segment", "name start end")
+# One generated shift; `day` is the local date it belongs to
+ShiftOccurrence = namedtuple("ShiftOccurrence", "day name start_time end_time")
+
+@lru_cache(maxsize=None)
+def _parse_time(value: str):
+    return datetime.strptime(value, "%H:%M").time()
+
+def _segment(definition):
+    """The Segment for one day of a definition, or None for an off day."""
+    if not isinstance(definition, dict):
+        return None
+    name = definition.get('name')
+    if name is None:
+        raise ValueError("Every working segment of a shift pattern needs a 'name'.")
+    if name.lower() == 'off':
+        return None
+    start, end = definition.get('start_time'), definition.get('end_time')
+    return Segment(name, _parse_time(start) if start else None, _parse_time(end) if end else None)
+
+class CompiledPattern:
+    """A pattern definition turned into a day-of-cycle -> Segment table."""
+
+    def __init__(self, pattern_type: str, definition: dict):
+        if pattern_type == 'Rotating':
+            if not definition or 'cycle' not in definition or 'cycle_start_reference_date' not in definition:
+                raise ValueError("Invalid Rotating pattern definition. Missing 'cycle' or 'cycle_start_reference_date'.")
+            self.reference = date.fromisoformat(definition['cycle_start_reference_date'])
+            table = []
+            for item in definition['cycle']:
+                table.extend([_segment(item)] * item['days'])
+            if not table:
+                raise ValueError("Rotating pattern cycle has zero total days.")
+        elif pattern_type == 'Fixed':
+            if not definition:
+                raise ValueError("Invalid Fixed pattern definition. It's empty.")
+            self.reference = _FIXED_REFERENCE
+            table = [_segment(definition.get(day)) for day in WEEKDAYS]
+        else:
+            raise ValueError(f"Unsupported pattern type: {pattern_type}")
+        self.pattern_type = pattern_type
+        self.table = tuple(table)
+        self.cycle_days = len(table)
+        # (timedelta from the cycle start, Segment) for the working days only
+        self.working = tuple((timedelta(days=offset), segment)
+                             for offset, segment in enumerate(table) if segment is not None)
+
+    def segment_on(self, day: date, offset: int = 0):
+        """The Segment worked on `day`, or None; `offset` shifts the cycle start by that many days."""
+        return self.table[((day - self.reference).days - offset) % self.cycle_days]
+
+    def iter_working_days(self, start: date, end: date, offset: int = 0):
+        """(date, Segment) for each working day in [start, end] (inclusive), in order."""
+        cycle_start = start - timedelta(days=((start - self.reference).days - offset) % self.cycle_days)
+        cycle = timedelta(days=self.cycle_days)
+        while cycle_start <= end:
+            for delta, segment in self.working:
+                day = cycle_start + delta
+                if day > end:
+                    return
+                if day >= start:
+                    yield day, segment
+            cycle_start += cycle
+
+    def iter_shifts(self, start: date, end: date, timezone: str = 'UTC', holidays=frozenset(),
+                    exceptions=None, offset: int = 0):
+        """ShiftOccurrences for [start, end] with naive UTC times.
+
+        `holidays` is a set of dates with no shifts. `exceptions` maps ISO dates to
+        'off' or to a dict overriding the day's name/start_time/end_time.
+        """
+        utcoffset = zone(timezone).utcoffset
+        for day, segment in self.iter_working_days(start, end, offset):
+            if day in holidays:
+                continue
+            name, start_time, end_time = segment
+            if exceptions:
+                exception = exceptions.get(day.isoformat())
+                if exception == 'off':
+                    continue
+                if isinstance(exception, dict):
+                    name = exception.get('name', name)
+                    if exception.get('start_time'):
+                        start_time = _parse_time(exception['start_time'])
+                    if exception.get('end_time'):
+                        end_time = _parse_time(exception['end_time'])
+            if start_time is None or end_time is None:
+                print(f"Warning: Skipping {self.pattern_type.lower()} shift for {day} due to missing start/end time in segment {name}")
+                continue
+            # local - utcoffset(local) is what astimezone(UTC) computes, without the aware datetimes
+            shift_start = datetime.combine(day, start_time)
+            shift_start -= utcoffset(shift_start)
+            shift_end = datetime.combine(day, end_time)
+            shift_end -= utcoffset(shift_end)
+            if shift_end < shift_start: # Overnight shift
+                shift_end += timedelta(days=1)
+            yield ShiftOccurrence(day, name, shift_start, shift_end)
+
+@lru_cache(maxsize=256)
+def _compile(pattern_type: str, definition_json: str):
+    return CompiledPattern(pattern_type, json.loads(definition_json))
+
+def compile_definition(pattern_type: str, definition: dict):
+    """The CompiledPattern for a pattern type and definition, shared by equal definitions."""
+    return _compile(pattern_type, json.dumps(definition, sort_keys=True))
+
+def compile_pattern(pattern):
+    """The CompiledPattern for a ShiftPattern."""
+    return compile_definition(pattern.pattern_type, pattern.definition)
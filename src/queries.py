@@ -0,0 +1,61 @@
+from sqlalchemy import lambda_stmt, select
+
+from src.event import Event
+from src.institution import Institution
+from src.shift import Shift
+from src.user import User, user_child_association_table
+
+# Cached statements for the small lookups that run on nearly every request.
+# lambda_stmt() builds and compiles each statement once per code location and
+# afterwards only extracts the new bound value (the id), so these skip the
+# Query construction, cache-key generation and compilation that
+# db.query(Model).filter(Model.id == x).first() pays on every call.
+# Each function takes the session to run on; see benchmarks/statement_cache.py.
+
+def get_user(db, user_id: int):
+    stmt = lambda_stmt(lambda: select(User).where(User.id == user_id))
+    return db.execute(stmt).scalars().first()
+
+def get_user_timezone(db, user_id: int, default: str = 'UTC'):
+    """The user's timezone preference, or `default` if unset or no such user."""
+    stmt = lambda_stmt(lambda: select(User.timezone).where(User.id == user_id))
+    return db.execute(stmt).scalar() or default
+
+def get_user_prefers_sse(db, user_id: int):
+    """The user's prefers_sse flag, or None if there is no such user."""
+    stmt = lambda_stmt(lambda: select(User.prefers_sse).where(User.id == user_id))
+    return db.execute(stmt).scalar()
+
+def get_sse_recipients(db, user_ids):
+    """Of the given user ids, those with SSE notifications enabled."""
+    user_ids = list(user_ids)
+    stmt = lambda_stmt(lambda: select(User.id).where(User.id.in_(user_ids), User.prefers_sse.is_(True)))
+    return db.execute(stmt).scalars().all()
+
+def get_child_sse_recipients(db, child_id: int):
+    """Ids of a child's parents who have SSE notifications enabled, without loading the Child."""
+    stmt = lambda_stmt(
+        lambda: select(User.id)
+        .join(user_child_association_table, user_child_association_table.c.user_id == User.id)
+        .where(user_child_association_table.c.child_id == child_id, User.prefers_sse.is_(True))
+    )
+    return db.execute(stmt).scalars().all()
+
+def get_event_owner_timezone(db, event_id: int, default: str = 'UTC'):
+    """Timezone of the user an event is linked to, without loading either object."""
+    stmt = lambda_stmt(
+        lambda: select(User.timezone).join(Event, Event.user_id == User.id).where(Event.id == event_id)
+    )
+    return db.execute(stmt).scalar() or default
+
+def get_institution(db, institution_id: int):
+    stmt = lambda_stmt(lambda: select(Institution).where(Institution.id == institution_id))
+    return db.execute(stmt).scalars().first()
+
+def get_event(db, event_id: int):
+    stmt = lambda_stmt(lambda: select(Event).where(Event.id == event_id))
+    return db.execute(stmt).scalars().first()
+
+def get_shift(db, shift_id: int):
+    stmt = lambda_stmt(lambda: select(Shift).where(Shift.id == shift_id))
+    return db.execute(stmt).scalars().first()
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+import calendar
+
+from src.serializers import local_isoformat, zone
+
+# Recurring events store one row: the first occurrence's start/end plus an
+# RRULE. Occurrences are generated on demand, only for the window being read.
+# Supported RRULE subset: FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL, and COUNT or
+# UNTIL. Steps are taken in the series' local time, so a weekly 17:00 class
+# stays at 17:00 across DST changes. Stored times are naive UTC, as elsewhere.
+
+SUPPORTED_FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY')
+_UTC = ZoneInfo('UTC')
+
+def _to_local(utc_naive: datetime, tz: ZoneInfo):
+    return utc_naive.replace(tzinfo=_UTC).astimezone(tz).replace(tzinfo=None)
+
+def _to_utc(local_naive: datetime, tz: ZoneInfo):
+    return local_naive.replace(tzinfo=tz).astimezone(_UTC).replace(tzinfo=None)
+
+def _parse_until(value: str, tz: ZoneInfo):
+    """UNTIL as naive UTC. A bare date includes that whole (local) day."""
+    try:
+        if len(value) == 8:
+            return _to_utc(datetime.strptime(value, '%Y%m%d') + timedelta(days=1, microseconds=-1), tz)
+        if value.endswith('Z'):
+            return datetime.strptime(value, '%Y%m%dT%H%M%SZ')
+        return _to_utc(datetime.strptime(value, '%Y%m%dT%H%M%S'), tz)
+    except ValueError:
+        raise ValueError(f"Invalid UNTIL value: {value}")
+
+def parse_rule(rule: str, timezone: str = 'UTC'):
+    """Parse an RRULE string into {'freq', 'interval', 'count', 'until'}. Raises ValueError."""
+    if rule.upper().startswith('RRULE:'):
+        rule = rule[len('RRULE:'):]
+    parts = {}
+    for part in rule.split(';'):
+        if not part.strip():
+            continue
+        key, sep, value = part.partition('=')
+        if not sep:
+            raise ValueError(f"Invalid recurrence rule part: {part}")
+        parts[key.strip().upper()] = value.strip()
+
+    unsupported = set(parts) - {'FREQ', 'INTERVAL', 'COUNT', 'UNTIL'}
+    if unsupported:
+        raise ValueError(f"Unsupported recurrence rule parts: {', '.join(sorted(unsupported))}")
+    freq = parts.get('FREQ', '').upper()
+    if freq not in SUPPORTED_FREQUENCIES:
+        raise ValueError(f"Recurrence FREQ must be one of {', '.join(SUPPORTED_FREQUENCIES)}.")
+    try:
+        interval = int(parts.get('INTERVAL', 1))
+        count = int(parts['COUNT']) if 'COUNT' in parts else None
+    except ValueError:
+        raise ValueError("Recurrence INTERVAL and COUNT must be whole numbers.")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("Recurrence INTERVAL and COUNT must be at least 1.")
+    if count is not None and 'UNTIL' in parts:
+        raise ValueError("A recurrence rule cannot have both COUNT and UNTIL.")
+    until = _parse_until(parts['UNTIL'], zone(timezone)) if 'UNTIL' in parts else None
+    return {'freq': freq, 'interval': interval, 'count': count, 'until': until}
+
+def _nth_local_start(local_start: datetime, freq: str, interval: int, n: int):
+    """Local start of the n-th step, or None if that date does not exist (e.g. the 31st in April)."""
+    if freq == 'DAILY':
+        return local_start + timedelta(days=n * interval)
+    if freq == 'WEEKLY':
+        return local_start + timedelta(weeks=n * interval)
+    months = local_start.month - 1 + n * interval
+    year, month = local_start.year + months // 12, months % 12 + 1
+    if local_start.day > calendar.monthrange(year, month)[1]:
+        return None
+    return local_start.replace(year=year, month=month)
+
+def iter_occurrences(start_time: datetime, end_time: datetime, rule: str, exdates=(),
+                     timezone: str = 'UTC', window_start: datetime = None, window_end: datetime = None):
+    """Yield (start, end) in naive UTC for each occurrence overlapping [window_start, window_end).
+
+    Occurrences come in order and are generated lazily. For DAILY and WEEKLY
+    rules the generator jumps straight to the window instead of stepping
+    through the series' history. Without a window_end an open-ended series
+    never stops. `exdates` are occurrence starts (naive UTC datetimes or ISO
+    strings) to leave out; like RFC 5545 EXDATE they still count towards COUNT.
+    """
+    parsed = parse_rule(rule, timezone)
+    freq, interval, count, until = parsed['freq'], parsed['interval'], parsed['count'], parsed['until']
+    tz = zone(timezone)
+    local_start = _to_local(start_time, tz)
+    local_duration = _to_local(end_time, tz) - local_start
+    excluded = {datetime.fromisoformat(d) if isinstance(d, str) else d for d in exdates}
+
+    step_index = 0
+    if window_start is not None and freq != 'MONTHLY':
+        step = timedelta(days=interval * (7 if freq == 'WEEKLY' else 1))
+        # One step of slack absorbs DST offsets between UTC and local stepping
+        step_index = max(0, (window_start - (end_time - start_time) - start_time) // step - 1)
+    occurrence_number = step_index # Every DAILY/WEEKLY step is an occurrence
+
+    while count is None or occurrence_number < count:
+        local_occurrence = _nth_local_start(local_start, freq, interval, step_index)
+        step_index += 1
+        if local_occurrence is None:
+            continue # Skipped month; RFC 5545 does not count it
+        occurrence_start = _to_utc(local_occurrence, tz)
+        if until is not None and occurrence_start > until:
+            return
+        if window_end is not None and occurrence_start >= window_end:
+            return
+        occurrence_number += 1
+        if occurrence_start in excluded:
+            continue
+        occurrence_end = _to_utc(local_occurrence + local_duration, tz)
+        if window_start is not None and occurrence_end <= window_start:
+            continue
+        yield occurrence_start, occurrence_end
+
+def series_end(start_time: datetime, end_time: datetime, rule: str, timezone: str = 'UTC'):
+    """End of the last occurrence (naive UTC), or None for a series without COUNT/UNTIL.
+
+    Validates the rule as a side effect (raises ValueError).
+    """
+    parsed = parse_rule(rule, timezone)
+    if parsed['count'] is None and parsed['until'] is None:
+        return None
+    last_end = end_time
+    for _, occurrence_end in iter_occurrences(start_time, end_time, rule, timezone=timezone):
+        last_end = occurrence_end
+    return last_end
+
+class EventOccurrence:
+    """One occurrence of a recurring Event: its own start/end, everything else from the series."""
+
+    def __init__(self, series, start_time: datetime, end_time: datetime):
+        self.series = series
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def __getattr__(self, name):
+        return getattr(self.series, name)
+
+    def __repr__(self):
+        return f"<EventOccurrence(series_id={self.series.id}, start_time={self.start_time})>"
+
+    def to_dict(self, timezone='UTC', **kwargs):
+        data = self.series.to_dict(timezone=timezone, **kwargs)
+        data['start_time'] = local_isoformat(self.start_time, timezone)
+        data['end_time'] = local_isoformat(self.end_time, timezone)
+        # Identifies this occurrence within the series (cf. RFC 5545 RECURRENCE-ID)
+        data['recurrence_id'] = self.start_time.isoformat()
+        return data
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from src.database import Base
 
@@ -20,6 +20,10 @@ class ResidencyPeriod(Base):
     child = relationship("Child", back_populates="residency_periods")
     parent = relationship("User") # Assuming User model does not need a back_populates like "custodial_periods" for now
 
+    __table_args__ = (
+        Index('ix_residency_periods_child_id_start_end', 'child_id', 'start_datetime', 'end_datetime'),
+    )
+
     def to_dict(self, include_child=False, include_parent=True):
         data = {
             "id": self.id,
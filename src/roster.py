@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+import multiprocessing
+import os
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from src.database import SessionLocal
+from src import feed_state, pattern_engine, holiday_calendar_manager, span_bounds
+from src.shift import Shift
+from src.shift_pattern import ShiftPattern
+from src.user import User
+
+# Team rosters: one shift pattern (usually a global one) applied to many users,
+# each with their own cycle offset so that e.g. a 5-team rotation is covered by
+# offsets 0, 7, 14, ... Each user's shifts are computed independently, so large
+# rosters are spread over a process pool; the parent process writes the results
+# with executemany inserts in batches of users, one transaction per batch, and
+# reports progress after each batch.
+#
+# Like the .ics import, a roster uses its own session rather than the request's
+# unit of work, so each batch is really committed: the write lock is held while
+# a batch is written, not for the whole run, and an error keeps earlier batches.
+
+BATCH_USERS = 50
+# Below this many users the pool's start-up costs more than it saves
+POOL_MIN_USERS = 16
+
+def parse_assignments(items):
+    """(user_id, offset) pairs from {"user_id", "offset"} dicts or "user_id[:offset]" strings. Raises ValueError."""
+    assignments = []
+    for item in items:
+        if isinstance(item, dict):
+            user_id, offset = item.get('user_id'), item.get('offset', 0)
+        else:
+            user_id, _, offset = str(item).strip().partition(':')
+        try:
+            assignments.append((int(user_id), int(offset or 0)))
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid roster assignment: {item!r}")
+    if len({user_id for user_id, _ in assignments}) != len(assignments):
+        raise ValueError("Each user can only appear once in a roster.")
+    return assignments
+
+def _user_rows(job):
+    """Worker: the shift column values for one user, as tuples to keep the pickles small."""
+    pattern_type, definition, user_id, offset, start, end, holidays, timezone = job
+    compiled = pattern_engine.compile_definition(pattern_type, definition) # Once per worker process
+    return user_id, [(occurrence.name, occurrence.start_time, occurrence.end_time, occurrence.day)
+                     for occurrence in compiled.iter_shifts(start, end, timezone, holidays, offset=offset)]
+
+def _compute(jobs, workers: int):
+    """Yield (user_id, rows) per job, in job order; on a process pool when it pays off."""
+    if workers <= 1 or len(jobs) < POOL_MIN_USERS:
+        yield from map(_user_rows, jobs)
+        return
+    # Workers only compute; "spawn" keeps them clear of the parent's threads and connections
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        yield from pool.map(_user_rows, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+def generate_roster(pattern_id: int, assignments, start_date_str: str, end_date_str: str,
+                    holidays=None, timezone: str = 'UTC', regenerate: bool = False,
+                    workers: int = None, progress=None):
+    """Generate a pattern's shifts between two dates (inclusive) for many users.
+
+    `assignments` is a list of (user_id, offset) pairs; a user's cycle starts
+    `offset` days after the pattern's. With `regenerate`, each user's existing
+    shifts from the pattern are brought in line instead of added to (see
+    shift_pattern_manager.regenerate_shifts_from_pattern). `progress(done, total)`
+    is called after each batch of users is committed; batches committed before
+    an error stay written.
+    Returns {"users", "created", "updated", "deleted"}. Raises ValueError for bad input.
+    """
+    from src.shift_pattern_manager import _apply_shift_diff, _record_generation, notify_regenerated
+    try:
+        start_date_obj = date.fromisoformat(start_date_str)
+        end_date_obj = date.fromisoformat(end_date_str)
+    except ValueError:
+        raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
+    if start_date_obj > end_date_obj:
+        raise ValueError("Start date cannot be after end date.")
+
+    db = SessionLocal()
+    try:
+        pattern = db.get(ShiftPattern, pattern_id)
+        if not pattern:
+            raise ValueError(f"ShiftPattern with id {pattern_id} not found.")
+        pattern_engine.compile_pattern(pattern) # Validates the definition before any work is sent out
+        user_ids = [user_id for user_id, _ in assignments]
+        user_calendars = dict(db.execute(select(User.id, User.holiday_calendar_id).where(User.id.in_(user_ids))).all())
+        missing = [user_id for user_id in user_ids if user_id not in user_calendars]
+        if missing:
+            raise ValueError(f"Users not found: {', '.join(map(str, missing))}")
+
+        # One holiday set per distinct user calendar, on top of the pattern's and the given dates
+        holiday_sets = {calendar_id: holiday_calendar_manager.holiday_dates(
+                            db, (pattern.holiday_calendar_id, calendar_id), start_date_obj, end_date_obj, holidays)
+                        for calendar_id in set(user_calendars.values())}
+        jobs = [(pattern.pattern_type, pattern.definition, user_id, offset, start_date_obj, end_date_obj,
+                 holiday_sets[user_calendars[user_id]], timezone) for user_id, offset in assignments]
+        summary = {"users": len(jobs), "created": 0, "updated": 0, "deleted": 0}
+        offsets = dict(assignments)
+        changed, batch_rows, batch_users, done = {}, [], [], 0
+        for user_id, rows in _compute(jobs, workers or os.cpu_count() or 1):
+            _record_generation(db, pattern_id, user_id, start_date_obj, end_date_obj, holidays,
+                               timezone=timezone, offset=offsets[user_id])
+            rows = [{"name": name, "start_time": start, "end_time": end, "user_id": user_id,
+                     "source_pattern_id": pattern_id, "pattern_date": day} for name, start, end, day in rows]
+            if regenerate:
+                user_summary = _apply_shift_diff(db, pattern_id, user_id, start_date_obj, end_date_obj, rows)
+                for key in ("created", "updated", "deleted"):
+                    summary[key] += user_summary[key]
+                changed[user_id] = user_summary
+            else:
+                batch_rows.extend(rows)
+                summary["created"] += len(rows)
+            batch_users.append(user_id)
+            if len(batch_users) >= BATCH_USERS:
+                done += _write_batch(db, batch_rows, batch_users, regenerate)
+                batch_rows, batch_users = [], []
+                if progress:
+                    progress(done, len(jobs))
+        if batch_users:
+            done += _write_batch(db, batch_rows, batch_users, regenerate)
+            if progress:
+                progress(done, len(jobs))
+        for user_id, user_summary in changed.items():
+            notify_regenerated(user_id, pattern_id, user_summary)
+        return summary
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error generating roster: {e}")
+        return None
+    finally:
+        db.close()
+
+def _write_batch(db, rows, user_ids, regenerate: bool):
+    """Insert a batch of users' rows (unless already written as diffs) and commit it."""
+    if rows:
+        db.execute(insert(Shift), rows)
+        span_bounds.record(db, span_bounds.SHIFTS, rows)
+    if not regenerate: # _apply_shift_diff versions the feeds it changes
+        feed_state.touch(db, [(feed_state.USER_FEED, user_id) for user_id in user_ids])
+    db.commit()
+    return len(user_ids)
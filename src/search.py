@@ -0,0 +1,146 @@
+from collections import namedtuple
+import heapq
+import re
+
+from sqlalchemy import DDL, event, or_, select, literal_column
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import table, column
+
+from src.database import get_session
+from src.event import Event
+from src.expense import Expense
+from src.grocery import GroceryItem
+from src.task import Task
+from src.user import user_child_association_table
+
+# Full-text search over events, tasks, grocery items and expenses with SQLite
+# FTS5. Each searchable table has an external-content FTS5 table (the text is
+# not stored twice) that triggers keep in step with every insert, update and
+# delete, whichever code path writes. The FTS tables are created with their
+# base tables (create_all) and by migration 5 for existing databases.
+# Results are ranked with bm25(); on other databases search falls back to LIKE.
+
+SearchSource = namedtuple("SearchSource", "kind model fts_table columns weights")
+
+SOURCES = (
+    SearchSource("event", Event, "events_fts", ("title", "description"), (10.0, 1.0)),
+    SearchSource("task", Task, "tasks_fts", ("description",), (5.0,)),
+    SearchSource("grocery_item", GroceryItem, "grocery_items_fts", ("name",), (5.0,)),
+    SearchSource("expense", Expense, "expenses_fts", ("description", "notes"), (5.0, 1.0)),
+)
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+def fts_statements(source: SearchSource):
+    """DDL for a source's FTS5 table and its sync triggers; every statement is safe to re-run."""
+    base, fts = source.model.__tablename__, source.fts_table
+    columns = ", ".join(source.columns)
+    new_values = ", ".join(f"new.{name}" for name in source.columns)
+    old_values = ", ".join(f"old.{name}" for name in source.columns)
+    delete_old = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{base}', "
+        f"content_rowid='id', tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {base} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {base} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {base} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+def create_search_indexes(conn):
+    """Create the FTS tables and triggers on a SQLite connection and index the existing rows."""
+    if conn.dialect.name != "sqlite":
+        return
+    for source in SOURCES:
+        for statement in fts_statements(source):
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql(f"INSERT INTO {source.fts_table}({source.fts_table}) VALUES ('rebuild')")
+
+for _source in SOURCES:
+    for _statement in fts_statements(_source):
+        event.listen(_source.model.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+    # The triggers go with the base table; the FTS table has to be dropped explicitly
+    event.listen(_source.model.__table__, "before_drop",
+                 DDL(f"DROP TABLE IF EXISTS {_source.fts_table}").execute_if(dialect="sqlite"))
+
+def match_expression(query: str):
+    """An FTS5 query for free text: every word must match, the last one as a prefix."""
+    words = re.findall(r"\w+", query or "")
+    if not words:
+        return None
+    return " ".join([f'"{word}"' for word in words[:-1]] + [f'"{words[-1]}"*'])
+
+def _scope(source: SearchSource, user_id: int):
+    """What the user may see of a source: their own rows, their children's, and unassigned
+    tasks and grocery items (the shared household lists)."""
+    children = select(user_child_association_table.c.child_id).where(
+        user_child_association_table.c.user_id == user_id)
+    model = source.model
+    if model is Event:
+        return or_(Event.user_id == user_id, Event.child_id.in_(children))
+    if model is Expense:
+        return or_(Expense.paid_by_id == user_id, Expense.child_id.in_(children))
+    return or_(model.user_id == user_id, model.user_id.is_(None))
+
+def _fts_results(db, source: SearchSource, user_id: int, match: str, limit: int):
+    fts = table(source.fts_table, column("rowid"))
+    weights = ", ".join(str(weight) for weight in source.weights)
+    rank = literal_column(f"bm25({source.fts_table}, {weights})")
+    snippet = literal_column(f"snippet({source.fts_table}, -1, '[', ']', '…', 12)")
+    stmt = (select(source.model, rank.label("rank"), snippet.label("snippet"))
+            .join(fts, fts.c.rowid == source.model.id)
+            .where(literal_column(source.fts_table).op("MATCH")(match), _scope(source, user_id))
+            .order_by(rank)
+            .limit(limit))
+    return [(row.rank, source.kind, row[0], row.snippet) for row in db.execute(stmt)]
+
+def _like_results(db, source: SearchSource, user_id: int, query: str, limit: int):
+    words = re.findall(r"\w+", query)
+    conditions = [or_(*(getattr(source.model, name).ilike(f"%{word}%") for name in source.columns))
+                  for word in words]
+    rows = db.execute(select(source.model).where(*conditions, _scope(source, user_id))
+                      .order_by(source.model.id.desc()).limit(limit)).scalars()
+    return [(0.0, source.kind, row, None) for row in rows]
+
+# Results carry the bare row; related objects would cost a query per hit
+_ITEM_OPTIONS = {
+    "event": {"include_user": False, "include_child": False, "include_institution": False},
+    "task": {"include_user": False, "include_event": False},
+    "grocery_item": {},
+    "expense": {"include_payer": False, "include_child": False},
+}
+
+def result_dict(kind: str, obj, rank: float, snippet: str, timezone: str = 'UTC'):
+    options = dict(_ITEM_OPTIONS[kind], timezone=timezone) if kind == "event" else _ITEM_OPTIONS[kind]
+    return {"type": kind, "id": obj.id, "rank": rank, "snippet": snippet, "item": obj.to_dict(**options)}
+
+def search(user_id: int, query: str, limit: int = DEFAULT_LIMIT, kinds=None):
+    """Best matches for `query` across the user's events, tasks, grocery items and expenses.
+
+    Returns (kind, obj, rank, snippet) tuples, best first. bm25 ranks are negative;
+    lower is better. `kinds` restricts the search to some of the SOURCES kinds.
+    """
+    limit = max(1, min(limit or DEFAULT_LIMIT, MAX_LIMIT))
+    match = match_expression(query)
+    if match is None:
+        return []
+    db = get_session(readonly=True)
+    try:
+        use_fts = db.get_bind().dialect.name == "sqlite"
+        results = []
+        for source in SOURCES:
+            if kinds and source.kind not in kinds:
+                continue
+            if use_fts:
+                results.extend(_fts_results(db, source, user_id, match, limit))
+            else:
+                results.extend(_like_results(db, source, user_id, query, limit))
+        best = heapq.nsmallest(limit, results, key=lambda result: result[0])
+        return [(kind, obj, rank, snippet) for rank, kind, obj, snippet in best]
+    except SQLAlchemyError as e:
+        print(f"Database error searching: {e}")
+        return []
+    finally:
+        db.close()
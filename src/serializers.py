@@ -0,0 +1,71 @@
+from datetime import datetime
+from functools import lru_cache
+from operator import attrgetter
+from zoneinfo import ZoneInfo
+import json
+
+try:
+    import orjson
+except ImportError: # Optional: responses fall back to the stdlib encoder
+    orjson = None
+
+# Fast paths for turning rows into JSON, shared by the models' to_dict() and the
+# web responses. List endpoints serialize thousands of rows, so the per-row work
+# is kept to reading the columns in one attrgetter call and converting datetimes
+# with a cached tzinfo. Relationships are only read when a caller asks for them.
+
+@lru_cache(maxsize=None)
+def zone(name: str = 'UTC'):
+    """A ZoneInfo for `name`, built once per name."""
+    return ZoneInfo(name)
+
+UTC = zone('UTC')
+
+def local_isoformat(value: datetime, timezone: str = 'UTC'):
+    """ISO string of a naive UTC datetime converted to `timezone`; None stays None."""
+    if value is None:
+        return None
+    return value.replace(tzinfo=UTC).astimezone(zone(timezone)).isoformat()
+
+def compile_serializer(fields, local_times=(), isoformat=()):
+    """A function obj, timezone='UTC' -> dict of the given attributes, in `fields` order.
+
+    Attributes in `local_times` are naive UTC datetimes rendered in the timezone,
+    those in `isoformat` are rendered with isoformat(); the rest are copied.
+    """
+    fields = tuple(fields)
+    getter = attrgetter(*fields)
+    local_positions = [i for i, name in enumerate(fields) if name in local_times]
+    iso_positions = [i for i, name in enumerate(fields) if name in isoformat]
+
+    def serialize(obj, timezone='UTC'):
+        values = list(getter(obj)) if len(fields) > 1 else [getter(obj)]
+        if local_positions:
+            tz = zone(timezone)
+            for i in local_positions:
+                if values[i] is not None:
+                    values[i] = values[i].replace(tzinfo=UTC).astimezone(tz).isoformat()
+        for i in iso_positions:
+            if values[i] is not None:
+                values[i] = values[i].isoformat()
+        return dict(zip(fields, values))
+    return serialize
+
+if orjson is not None:
+    # datetimes are left to `default`, as the stdlib path would, so output does not change with the backend
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+def dumps(obj, default=None, sort_keys: bool = False, indent: int = None, **kwargs):
+    """JSON text for obj, with orjson when it is installed.
+
+    `default` handles types neither backend knows. Other json.dumps keyword
+    arguments (e.g. separators, ensure_ascii) only affect the stdlib fallback.
+    """
+    if orjson is not None:
+        option = _ORJSON_OPTIONS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option).decode()
+    return json.dumps(obj, default=default, sort_keys=sort_keys, indent=indent, **kwargs)
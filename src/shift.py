@@ -1,7 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from src.database import Base
-from zoneinfo import ZoneInfo
+from src.serializers import compile_serializer
 # Removed unused import: import datetime
 
 class Shift(Base):
@@ -18,21 +18,19 @@ class Shift(Base):
     # Link to the ShiftPattern that generated this shift
     source_pattern_id = Column(Integer, ForeignKey('shift_patterns.id'), nullable=True)
     source_pattern = relationship("ShiftPattern") # No back_populates needed if ShiftPattern doesn't list shifts
+    # The pattern day (local date) a generated shift is for; regeneration matches shifts on it
+    pattern_date = Column(Date, nullable=True)
+
+    __table_args__ = (
+        Index('ix_shifts_user_id_start_time', 'user_id', 'start_time'),
+        Index('ix_shifts_source_pattern_id_user_id_pattern_date', 'source_pattern_id', 'user_id', 'pattern_date'),
+    )
 
     def __repr__(self):
         return f"<Shift(id={self.id}, name='{self.name}', user_id={self.user_id}, source_pattern_id={self.source_pattern_id})>"
 
     def to_dict(self, include_owner=True, include_source_pattern_details=False, timezone='UTC'):
-        local_start = self.start_time.replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo(timezone)) if self.start_time else None
-        local_end = self.end_time.replace(tzinfo=ZoneInfo('UTC')).astimezone(ZoneInfo(timezone)) if self.end_time else None
-        data = {
-            "id": self.id,
-            "name": self.name,
-            "start_time": local_start.isoformat() if local_start else None,
-            "end_time": local_end.isoformat() if local_end else None,
-            "user_id": self.user_id,
-            "source_pattern_id": self.source_pattern_id
-        }
+        data = _serialize_columns(self, timezone)
         if include_owner and self.owner:
             data['owner'] = {"id": self.owner.id, "name": self.owner.name}
 
@@ -47,3 +45,7 @@ class Shift(Base):
              # If ID is there but object not loaded, just include ID (already done)
              pass
         return data
+
+_serialize_columns = compile_serializer(
+    ('id', 'name', 'start_time', 'end_time', 'user_id', 'source_pattern_id'),
+    local_times=('start_time', 'end_time'))
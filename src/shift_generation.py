@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, Date, JSON, ForeignKey, Index
+from src.database import Base
+
+class ShiftGeneration(Base):
+    """The inputs of one run that stored a pattern's shifts for a user, so editing the
+    pattern can regenerate them the same way (see shift_pattern_manager._regenerate_upcoming)."""
+    __tablename__ = 'shift_generations'
+
+    id = Column(Integer, primary_key=True, index=True)
+    pattern_id = Column(Integer, ForeignKey('shift_patterns.id'), nullable=False)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False) # Inclusive
+    offset = Column(Integer, nullable=False, default=0) # Roster offset in days
+    timezone = Column(String, nullable=False, default='UTC')
+    holidays = Column(JSON, nullable=True) # ISO dates given for the run, on top of the calendars
+    exceptions = Column(JSON, nullable=True) # {"YYYY-MM-DD": "off" | {"name", "start_time", "end_time"}}
+
+    __table_args__ = (
+        # One run per range; shift_pattern_manager._record_generation() upserts on it
+        Index('ix_shift_generations_pattern_id_user_id_range', 'pattern_id', 'user_id', 'start_date', 'end_date',
+              unique=True),
+    )
+
+    def __repr__(self):
+        return (f"<ShiftGeneration(pattern_id={self.pattern_id}, user_id={self.user_id}, "
+                f"start_date={self.start_date}, end_date={self.end_date})>")
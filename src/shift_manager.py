@@ -2,12 +2,16 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 from zoneinfo import ZoneInfo
-from datetime import datetime # For string to datetime conversion
+from datetime import datetime, timedelta # For string to datetime conversion
 import json
 
 from src.notification import send_notification
 
-from src.database import SessionLocal
+from src.database import get_session
+from src import queries
+from src.pagination import paginate
+from src.time_window import overlapping
+from src import span_bounds
 from src.shift import Shift
 # from src.user import User # Not strictly needed if only user_id is used and no User object operations
 
@@ -26,30 +30,78 @@ def _parse_datetime(datetime_str, timezone_str='UTC'):
         print(f"Warning: Could not parse datetime string: {datetime_str}")
         return None
 
-def add_shift(user_id: int, start_time_str: str, end_time_str: str, name: str, timezone: str = 'UTC'):
-    db = SessionLocal()
-    try:
-        start_time_dt = _parse_datetime(start_time_str, timezone)
-        end_time_dt = _parse_datetime(end_time_str, timezone)
+# The helpers below hold the validation and update logic shared by these sync
+# functions and their async counterparts in src/async_managers.py.
 
-        if not start_time_dt or not end_time_dt:
-            print("Error: Invalid start or end time format.")
-            return None
+def _build_shift(user_id: int, start_time_str: str, end_time_str: str, name: str, timezone: str = 'UTC'):
+    """Return a new, unsaved Shift, or None if the start/end times are invalid."""
+    start_time_dt = _parse_datetime(start_time_str, timezone)
+    end_time_dt = _parse_datetime(end_time_str, timezone)
 
-        # Assuming user_id is the integer PK from the User model
-        new_shift = Shift(
-            user_id=user_id,
-            start_time=start_time_dt,
-            end_time=end_time_dt,
-            name=name
-        )
+    if not start_time_dt or not end_time_dt:
+        print("Error: Invalid start or end time format.")
+        return None
+
+    # Assuming user_id is the integer PK from the User model
+    return Shift(
+        user_id=user_id,
+        start_time=start_time_dt,
+        end_time=end_time_dt,
+        name=name
+    )
+
+def _shift_message(shift: Shift, message_type: str):
+    """Notification payload for a shift; touches no relationships."""
+    return {
+        "type": message_type,
+        "shift": shift.to_dict(include_owner=False)
+    }
+
+def _apply_shift_updates(shift: Shift, new_start_time_str: str = None, new_end_time_str: str = None,
+                         new_name: str = None, timezone: str = 'UTC'):
+    """Apply update_shift() changes to a Shift. Returns True if anything changed."""
+    updated = False
+    if new_start_time_str is not None:
+        new_start_time_dt = _parse_datetime(new_start_time_str, timezone)
+        if new_start_time_dt:
+            shift.start_time = new_start_time_dt
+            updated = True
+        else:
+            print("Warning: Invalid new start time format, not updated.")
+    if new_end_time_str is not None:
+        new_end_time_dt = _parse_datetime(new_end_time_str, timezone)
+        if new_end_time_dt:
+            shift.end_time = new_end_time_dt
+            updated = True
+        else:
+            print("Warning: Invalid new end time format, not updated.")
+    if new_name is not None:
+        shift.name = new_name
+        updated = True
+    return updated
+
+def _report_conflicts(shift: Shift, exclude_id: int = None):
+    """True (after printing an error) if the shift clashes with the owner's other items."""
+    from src import conflicts # Imported here: src.conflicts reads shifts through this module
+    clashes = conflicts.conflicts_with(shift.user_id, 'shift', shift.start_time, shift.end_time, exclude_id)
+    if clashes:
+        print(f"Error: Shift conflicts with {len(clashes)} other item(s), e.g. {clashes[0][3]!r}.")
+        return True
+    return False
+
+def add_shift(user_id: int, start_time_str: str, end_time_str: str, name: str, timezone: str = 'UTC',
+              reject_conflicts: bool = False):
+    db = get_session()
+    try:
+        new_shift = _build_shift(user_id, start_time_str, end_time_str, name, timezone)
+        if not new_shift:
+            return None
+        if reject_conflicts and _report_conflicts(new_shift):
+            return None
         db.add(new_shift)
         db.commit()
         db.refresh(new_shift)
-        send_notification(user_id, {
-            "type": "shift_created",
-            "shift": new_shift.to_dict(include_owner=False)
-        })
+        send_notification(user_id, _shift_message(new_shift, "shift_created"))
         return new_shift
     except SQLAlchemyError as e:
         db.rollback()
@@ -58,52 +110,48 @@ def add_shift(user_id: int, start_time_str: str, end_time_str: str, name: str, t
     finally:
         db.close()
 
-def get_user_shifts(user_id: int):
-    db = SessionLocal()
+def get_user_shifts(user_id: int, start: datetime = None, end: datetime = None,
+                    limit: int = None, cursor: str = None, load=(), include_virtual: bool = True):
+    """A user's shifts in start time order, optionally only those overlapping [start, end) (naive UTC).
+
+    `load` is a loading plan (src/loading.py) for the relationships the caller uses.
+    With an `end` and `include_virtual`, the shifts of the user's pattern assignments
+    are computed and merged in as VirtualShifts (see src/virtual_shifts.py).
+    """
+    db = get_session(readonly=True)
     try:
         # Assuming user_id is the integer PK from the User model
-        shifts = db.query(Shift).filter(Shift.user_id == user_id).all()
-        return shifts
+        query = db.query(Shift).filter(Shift.user_id == user_id).options(*load)
+        lookback = span_bounds.lookback(db, span_bounds.SHIFTS, span_bounds.USER, user_id)
+        query = overlapping(query, Shift.start_time, Shift.end_time, start, end, lookback)
+        page = paginate(query, Shift.id, Shift.start_time, limit, cursor)
+        if include_virtual and end is not None:
+            from src import virtual_shifts
+            page = virtual_shifts.merge_into_page(db, user_id, page, start, end, cursor, limit)
+        return page
     except SQLAlchemyError as e:
         print(f"Database error getting user shifts: {e}")
         return [] # Return empty list on error
     finally:
         db.close()
 
-def update_shift(shift_id: int, new_start_time_str: str = None, new_end_time_str: str = None, new_name: str = None, timezone: str = 'UTC'):
-    db = SessionLocal()
+def update_shift(shift_id: int, new_start_time_str: str = None, new_end_time_str: str = None, new_name: str = None, timezone: str = 'UTC',
+                 reject_conflicts: bool = False):
+    db = get_session()
     try:
-        shift = db.query(Shift).filter(Shift.id == shift_id).first()
+        shift = queries.get_shift(db, shift_id)
         if not shift:
             print("Error: Shift not found.")
             return None
 
-        updated = False
-        if new_start_time_str is not None:
-            new_start_time_dt = _parse_datetime(new_start_time_str, timezone)
-            if new_start_time_dt:
-                shift.start_time = new_start_time_dt
-                updated = True
-            else:
-                print("Warning: Invalid new start time format, not updated.")
-        if new_end_time_str is not None:
-            new_end_time_dt = _parse_datetime(new_end_time_str, timezone)
-            if new_end_time_dt:
-                shift.end_time = new_end_time_dt
-                updated = True
-            else:
-                print("Warning: Invalid new end time format, not updated.")
-        if new_name is not None:
-            shift.name = new_name
-            updated = True
-
+        updated = _apply_shift_updates(shift, new_start_time_str, new_end_time_str, new_name, timezone)
+        if updated and reject_conflicts and _report_conflicts(shift, exclude_id=shift.id):
+            db.rollback()
+            return None
         if updated:
             db.commit()
             db.refresh(shift)
-            send_notification(shift.user_id, {
-                "type": "shift_updated",
-                "shift": shift.to_dict(include_owner=False)
-            })
+            send_notification(shift.user_id, _shift_message(shift, "shift_updated"))
         return shift
     except SQLAlchemyError as e:
         db.rollback()
@@ -113,9 +161,9 @@ def update_shift(shift_id: int, new_start_time_str: str = None, new_end_time_str
         db.close()
 
 def delete_shift(shift_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
-        shift = db.query(Shift).filter(Shift.id == shift_id).first()
+        shift = queries.get_shift(db, shift_id)
         if not shift:
             print("Error: Shift not found for deletion.")
             return False
@@ -13,6 +13,11 @@ class ShiftPattern(Base):
     # Example for Rotating: {"cycle": [{"shift_type_name": "Day", "days": 2}, ...], "start_date_of_cycle": "YYYY-MM-DD"}
     # Example for Fixed: {"monday": "Day Shift", "tuesday": "Day Shift", ...}
 
+    # Bumped whenever pattern_type or definition changes; caches of expanded shifts are keyed on it
+    version = Column(Integer, nullable=False, default=1)
+    # Its holidays are days off whenever shifts are generated from it
+    holiday_calendar_id = Column(Integer, ForeignKey('holiday_calendars.id'), nullable=True)
+
     user_id = Column(Integer, ForeignKey('users.id'), nullable=True)  # Nullable for global patterns
     owner = relationship("User", back_populates="shift_patterns") # Relationship to User
 
@@ -23,7 +28,8 @@ class ShiftPattern(Base):
             "description": self.description,
             "pattern_type": self.pattern_type,
             "definition": self.definition,
-            "user_id": self.user_id
+            "user_id": self.user_id,
+            "holiday_calendar_id": self.holiday_calendar_id
         }
         if self.owner:
             data['owner'] = {"id": self.owner.id, "name": self.owner.name}
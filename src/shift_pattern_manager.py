@@ -1,12 +1,17 @@
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
-from src.database import SessionLocal
+from src.database import get_session
+from src import feed_state, span_bounds
+from src.pagination import paginate
 from src.shift_pattern import ShiftPattern
+from src.pattern_assignment import ShiftPatternAssignment
+from src.shift_generation import ShiftGeneration
 from src.user import User # Import User if needed for validating user_id, though FK constraint handles existence
 
-def create_shift_pattern(name: str, description: str, pattern_type: str, definition: dict, user_id: int = None):
-    db = SessionLocal()
+def create_shift_pattern(name: str, description: str, pattern_type: str, definition: dict, user_id: int = None,
+                         holiday_calendar_id: int = None):
+    db = get_session()
     try:
         # Optional: Validate user_id if provided, though FK constraint will do this.
         # if user_id:
@@ -20,7 +25,8 @@ def create_shift_pattern(name: str, description: str, pattern_type: str, definit
             description=description,
             pattern_type=pattern_type,
             definition=definition,
-            user_id=user_id
+            user_id=user_id,
+            holiday_calendar_id=holiday_calendar_id
         )
         db.add(new_pattern)
         db.commit()
@@ -33,13 +39,64 @@ def create_shift_pattern(name: str, description: str, pattern_type: str, definit
     finally:
         db.close()
 
-from datetime import datetime, date, timedelta
+from datetime import date, datetime, timedelta
 from zoneinfo import ZoneInfo
-
-def generate_shifts_from_pattern(db_session: Session, pattern_id: int, user_id: int, start_date_str: str, end_date_str: str, timezone: str = 'UTC'):
-def generate_shifts_from_pattern(db_session: Session, pattern_id: int, user_id: int,
-                                start_date_str: str, end_date_str: str,
-                                holidays=None, exceptions=None):
+from sqlalchemy import and_, or_, not_, insert, update, delete, select, func
+from src import pattern_engine, holiday_calendar_manager
+from src.notification import send_notification
+
+def _iter_shift_rows(pattern: ShiftPattern, user_id: int, start_date_obj: date, end_date_obj: date,
+                     holidays_set: set, exceptions: dict, timezone: str, offset: int = 0):
+    """Yield one plain dict of Shift column values per working day in the range."""
+    compiled = pattern_engine.compile_pattern(pattern)
+    for occurrence in compiled.iter_shifts(start_date_obj, end_date_obj, timezone, holidays_set, exceptions,
+                                           offset=offset):
+        yield {
+            "name": occurrence.name,
+            "start_time": occurrence.start_time,
+            "end_time": occurrence.end_time,
+            "user_id": user_id,
+            "source_pattern_id": pattern.id,
+            "pattern_date": occurrence.day
+        }
+
+def _bulk_insert_shift_rows(db_session: Session, rows: list, pattern: ShiftPattern, user: User):
+    """Insert shift rows in one executemany batch and return them as Shift.to_dict()-shaped dicts.
+
+    No Shift objects enter the session's identity map; the new ids come back via
+    RETURNING in parameter order.
+    """
+    from src.shift import Shift # Local import to avoid circular dependency issues at module level
+    if not rows:
+        return []
+    new_ids = db_session.scalars(
+        insert(Shift).returning(Shift.id, sort_by_parameter_order=True), rows
+    ).all()
+    # Core inserts skip the ORM flush hooks that version calendar feeds and widen span bounds
+    feed_state.touch(db_session, [(feed_state.USER_FEED, user.id)])
+    span_bounds.record(db_session, span_bounds.SHIFTS, rows)
+
+    owner = {"id": user.id, "name": user.name}
+    pattern_details = {"id": pattern.id, "name": pattern.name, "pattern_type": pattern.pattern_type}
+    utc = ZoneInfo('UTC')
+    return [
+        {
+            "id": shift_id,
+            "name": row["name"],
+            "start_time": row["start_time"].replace(tzinfo=utc).isoformat(),
+            "end_time": row["end_time"].replace(tzinfo=utc).isoformat(),
+            "user_id": row["user_id"],
+            "source_pattern_id": row["source_pattern_id"],
+            "owner": owner,
+            "source_pattern_details": pattern_details
+        }
+        for shift_id, row in zip(new_ids, rows)
+    ]
+
+def _generation_rows(db_session: Session, pattern_id: int, user_id: int, start_date_str: str, end_date_str: str,
+                     holidays=None, exceptions=None, timezone: str = 'UTC'):
+    """Validate a generation request, record its inputs and return (pattern, user, start_date, end_date, rows).
+    Raises ValueError."""
     pattern = db_session.query(ShiftPattern).filter(ShiftPattern.id == pattern_id).first()
     if not pattern:
         raise ValueError(f"ShiftPattern with id {pattern_id} not found.")
@@ -54,152 +111,164 @@ def generate_shifts_from_pattern(db_session: Session, pattern_id: int, user_id:
     except ValueError:
         raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
 
-    holidays_set = set(date.fromisoformat(d) for d in holidays) if holidays else set()
-    exceptions = exceptions or {}
-
     if start_date_obj > end_date_obj:
         raise ValueError("Start date cannot be after end date.")
 
-    created_shifts = []
+    # The pattern's and the user's holiday calendars, plus any dates given for this run
+    holidays_set = holiday_calendar_manager.holiday_dates(
+        db_session, (pattern.holiday_calendar_id, user.holiday_calendar_id), start_date_obj, end_date_obj, holidays)
+    exceptions = exceptions or {}
+
+    rows = list(_iter_shift_rows(pattern, user_id, start_date_obj, end_date_obj, holidays_set, exceptions, timezone))
+    _record_generation(db_session, pattern_id, user_id, start_date_obj, end_date_obj, holidays, exceptions, timezone)
+    return pattern, user, start_date_obj, end_date_obj, rows
+
+def _record_generation(db_session: Session, pattern_id: int, user_id: int, start_date_obj: date, end_date_obj: date,
+                       holidays=None, exceptions=None, timezone: str = 'UTC', offset: int = 0):
+    """Keep the inputs of a generation run for _regenerate_upcoming(), one row per (pattern, user, range).
+
+    Running a range again replaces that row's inputs. The user's other runs of the
+    pattern that the new range covers, or that have ended, are dropped: nothing
+    upcoming is left for them to redo.
+    """
+    user_runs = (ShiftGeneration.pattern_id == pattern_id, ShiftGeneration.user_id == user_id)
+    same_range = and_(ShiftGeneration.start_date == start_date_obj, ShiftGeneration.end_date == end_date_obj)
+    ended = datetime.utcnow().date() - timedelta(days=1) # Today has begun in every timezone by then
+    db_session.execute(delete(ShiftGeneration).where(*user_runs, not_(same_range), or_(
+        and_(ShiftGeneration.start_date >= start_date_obj, ShiftGeneration.end_date <= end_date_obj),
+        ShiftGeneration.end_date < ended)))
+    inputs = {"offset": offset or 0, "timezone": timezone,
+              "holidays": sorted(set(holidays)) if holidays else None, "exceptions": exceptions or None}
+    result = db_session.execute(update(ShiftGeneration).where(*user_runs, same_range).values(**inputs))
+    if result.rowcount == 0:
+        db_session.execute(insert(ShiftGeneration).values(pattern_id=pattern_id, user_id=user_id,
+                                                          start_date=start_date_obj, end_date=end_date_obj,
+                                                          **inputs))
 
-    if pattern.pattern_type == 'Rotating':
-        # Example definition: {"cycle": [{"name": "Day", "days": 2, "start_time": "08:00", "end_time": "16:00"},
-        #                              {"name": "Night", "days": 2, "start_time": "20:00", "end_time": "04:00"}, # Overnight
-        #                              {"name": "Off", "days": 3}],
-        #                   "cycle_start_reference_date": "2024-01-01"}
-        if not pattern.definition or 'cycle' not in pattern.definition or 'cycle_start_reference_date' not in pattern.definition:
-            raise ValueError("Invalid Rotating pattern definition. Missing 'cycle' or 'cycle_start_reference_date'.")
-
-        cycle_def = pattern.definition['cycle']
-        cycle_start_ref_date = date.fromisoformat(pattern.definition['cycle_start_reference_date'])
-
-        total_cycle_days = sum(item['days'] for item in cycle_def)
-        if total_cycle_days == 0:
-            raise ValueError("Rotating pattern cycle has zero total days.")
-
-        current_date = start_date_obj
-        while current_date <= end_date_obj:
-            if current_date in holidays_set:
-                current_date += timedelta(days=1)
-                continue
-
-            exception_def = exceptions.get(current_date.isoformat())
-            if exception_def == 'off':
-                current_date += timedelta(days=1)
-                continue
-
-            days_from_ref = (current_date - cycle_start_ref_date).days
-            current_day_in_cycle = days_from_ref % total_cycle_days
-
-            # Determine current segment in cycle
-            temp_days_count = 0
-            current_segment = None
-            for segment in cycle_def:
-                if current_day_in_cycle < temp_days_count + segment['days']:
-                    current_segment = segment
-                    break
-                temp_days_count += segment['days']
-
-            if current_segment and current_segment.get('name', '').lower() != 'off':
-                shift_name = current_segment['name']
-                start_time_str = current_segment.get('start_time')
-                end_time_str = current_segment.get('end_time')
-
-                if isinstance(exception_def, dict):
-                    shift_name = exception_def.get('name', shift_name)
-                    start_time_str = exception_def.get('start_time', start_time_str)
-                    end_time_str = exception_def.get('end_time', end_time_str)
-
-                if not start_time_str or not end_time_str:
-                    print(f"Warning: Skipping shift for {current_date} due to missing start/end time in segment {shift_name}")
-                    current_date += timedelta(days=1)
-                    continue
-
-                shift_start_datetime = datetime.combine(current_date, datetime.strptime(start_time_str, "%H:%M").time())
-                shift_start_datetime = shift_start_datetime.replace(tzinfo=ZoneInfo(timezone)).astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
-                shift_end_datetime = datetime.combine(current_date, datetime.strptime(end_time_str, "%H:%M").time())
-                shift_end_datetime = shift_end_datetime.replace(tzinfo=ZoneInfo(timezone)).astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
-
-                if shift_end_datetime < shift_start_datetime: # Overnight shift
-                    shift_end_datetime += timedelta(days=1)
-
-                from src.shift import Shift # Local import to avoid circular dependency issues at module level
-                new_shift = Shift(
-                    name=shift_name,
-                    start_time=shift_start_datetime,
-                    end_time=shift_end_datetime,
-                    user_id=user_id,
-                    source_pattern_id=pattern_id
-                )
-                db_session.add(new_shift)
-                created_shifts.append(new_shift)
-
-            current_date += timedelta(days=1)
-
-    elif pattern.pattern_type == 'Fixed':
-        # Example definition: {"monday": {"name": "Mon Work", "start_time": "09:00", "end_time": "17:00"},
-        #                      "tuesday": "Off", ...}
-        if not pattern.definition:
-            raise ValueError("Invalid Fixed pattern definition. It's empty.")
-
-        current_date = start_date_obj
-        while current_date <= end_date_obj:
-            if current_date in holidays_set:
-                current_date += timedelta(days=1)
-                continue
-
-            exception_def = exceptions.get(current_date.isoformat())
-            if exception_def == 'off':
-                current_date += timedelta(days=1)
-                continue
-
-            day_name = current_date.strftime("%A").lower()  # Monday, Tuesday, ...
-            segment_def = pattern.definition.get(day_name)
-
-            if isinstance(segment_def, dict) and segment_def.get('name', '').lower() != 'off':
-                shift_name = segment_def['name']
-                start_time_str = segment_def.get('start_time')
-                end_time_str = segment_def.get('end_time')
-
-                if isinstance(exception_def, dict):
-                    shift_name = exception_def.get('name', shift_name)
-                    start_time_str = exception_def.get('start_time', start_time_str)
-                    end_time_str = exception_def.get('end_time', end_time_str)
-
-                if not start_time_str or not end_time_str:
-                    print(f"Warning: Skipping fixed shift for {current_date} due to missing start/end time in segment {shift_name}")
-                    current_date += timedelta(days=1)
-                    continue
-
-                shift_start_datetime = datetime.combine(current_date, datetime.strptime(start_time_str, "%H:%M").time())
-                shift_start_datetime = shift_start_datetime.replace(tzinfo=ZoneInfo(timezone)).astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
-                shift_end_datetime = datetime.combine(current_date, datetime.strptime(end_time_str, "%H:%M").time())
-                shift_end_datetime = shift_end_datetime.replace(tzinfo=ZoneInfo(timezone)).astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
-
-                if shift_end_datetime < shift_start_datetime: # Overnight
-                    shift_end_datetime += timedelta(days=1)
-
-                from src.shift import Shift # Local import
-                new_shift = Shift(
-                    name=shift_name,
-                    start_time=shift_start_datetime,
-                    end_time=shift_end_datetime,
-                    user_id=user_id,
-                    source_pattern_id=pattern_id
-                )
-                db_session.add(new_shift)
-                created_shifts.append(new_shift)
-
-            current_date += timedelta(days=1)
-    else:
-        raise ValueError(f"Unsupported pattern type: {pattern.pattern_type}")
+def generate_shifts_from_pattern(db_session: Session, pattern_id: int, user_id: int,
+                                start_date_str: str, end_date_str: str,
+                                holidays=None, exceptions=None, timezone: str = 'UTC',
+                                bulk: bool = False):
+    """Create the shifts a pattern defines between two dates (inclusive).
+
+    By default returns the new Shift objects, added to `db_session`. With
+    `bulk=True` the rows are inserted directly in one batch and plain dicts shaped
+    like Shift.to_dict(include_source_pattern_details=True) are returned instead,
+    which is much cheaper for long ranges. Either way the caller commits.
+    """
+    pattern, user, _, _, rows = _generation_rows(db_session, pattern_id, user_id, start_date_str, end_date_str,
+                                                 holidays, exceptions, timezone)
+    if bulk:
+        return _bulk_insert_shift_rows(db_session, rows, pattern, user)
+
+    from src.shift import Shift # Local import to avoid circular dependency issues at module level
+    created_shifts = []
+    for row in rows:
+        new_shift = Shift(**row)
+        db_session.add(new_shift)
+        created_shifts.append(new_shift)
 
     # Commit is done by the caller (API endpoint) to manage session lifecycle
     # db_session.commit()
     return created_shifts
 
+def _apply_shift_diff(db_session: Session, pattern_id: int, user_id: int, start_date_obj: date,
+                      end_date_obj: date, rows: list):
+    """Make the user's shifts from the pattern on [start, end] match `rows`, writing only the differences.
+
+    Shifts are matched to rows on pattern_date. Days the rows no longer have, and
+    any duplicate shifts for a day, are deleted. Returns the change counts.
+    """
+    from src.shift import Shift # Local import to avoid circular dependency issues at module level
+    existing = db_session.execute(
+        select(Shift.id, Shift.pattern_date, Shift.name, Shift.start_time, Shift.end_time)
+        .where(Shift.source_pattern_id == pattern_id, Shift.user_id == user_id,
+               Shift.pattern_date >= start_date_obj, Shift.pattern_date <= end_date_obj)
+        .order_by(Shift.id)
+    ).all()
+    wanted = {row["pattern_date"]: row for row in rows}
+    kept, to_delete = {}, []
+    for shift in existing:
+        if shift.pattern_date in wanted and shift.pattern_date not in kept:
+            kept[shift.pattern_date] = shift
+        else:
+            to_delete.append(shift.id)
+    to_insert, to_update = [], []
+    for day, row in wanted.items():
+        shift = kept.get(day)
+        if shift is None:
+            to_insert.append(row)
+        elif (shift.name, shift.start_time, shift.end_time) != (row["name"], row["start_time"], row["end_time"]):
+            to_update.append({"id": shift.id, "name": row["name"],
+                              "start_time": row["start_time"], "end_time": row["end_time"]})
+
+    if to_insert:
+        db_session.execute(insert(Shift), to_insert)
+    if to_update:
+        db_session.execute(update(Shift), to_update) # Bulk UPDATE by primary key
+    if to_delete:
+        db_session.execute(delete(Shift).where(Shift.id.in_(to_delete)))
+    summary = {"created": len(to_insert), "updated": len(to_update), "deleted": len(to_delete),
+               "unchanged": len(kept) - len(to_update)}
+    if to_insert or to_update or to_delete:
+        # Core statements skip the ORM flush hooks that version calendar feeds and widen span bounds
+        feed_state.touch(db_session, [(feed_state.USER_FEED, user_id)])
+        span_bounds.record(db_session, span_bounds.SHIFTS, to_insert + to_update, user_id=user_id)
+    return summary
+
+def regenerate_shifts_from_pattern(db_session: Session, pattern_id: int, user_id: int,
+                                   start_date_str: str, end_date_str: str,
+                                   holidays=None, exceptions=None, timezone: str = 'UTC'):
+    """Bring the shifts a pattern generated for a user between two dates (inclusive) up to date.
+
+    Unlike generate_shifts_from_pattern this is idempotent: shifts are keyed on
+    (source_pattern_id, user_id, pattern_date), new days are inserted, changed
+    days updated and days the pattern no longer works deleted, so running it
+    twice changes nothing. Returns {"created", "updated", "deleted", "unchanged"}.
+    The caller commits and then calls notify_regenerated().
+    """
+    _, _, start_date_obj, end_date_obj, rows = _generation_rows(
+        db_session, pattern_id, user_id, start_date_str, end_date_str, holidays, exceptions, timezone)
+    return _apply_shift_diff(db_session, pattern_id, user_id, start_date_obj, end_date_obj, rows)
+
+def notify_regenerated(user_id: int, pattern_id: int, summary: dict):
+    """Tell the user their shifts changed; nothing is sent when regeneration changed nothing."""
+    if summary["created"] or summary["updated"] or summary["deleted"]:
+        send_notification(user_id, {"type": "shifts_regenerated", "pattern_id": pattern_id,
+                                    **{key: summary[key] for key in ("created", "updated", "deleted")}})
+
+def _regenerate_upcoming(db_session: Session, pattern: ShiftPattern):
+    """Regenerate the upcoming shifts of each recorded generation run of the pattern.
+
+    Each run is redone from today (in its timezone) to its end date with its own
+    timezone, offset, holidays and exceptions, plus the current holiday calendars.
+    Shifts stored before runs were recorded have unknown inputs and are left alone.
+    Returns {user_id: summary}.
+    """
+    runs = db_session.scalars(
+        select(ShiftGeneration).where(ShiftGeneration.pattern_id == pattern.id).order_by(ShiftGeneration.id)
+    ).all()
+    user_calendars = dict(db_session.execute(
+        select(User.id, User.holiday_calendar_id).where(User.id.in_({run.user_id for run in runs}))
+    ).all())
+    summaries = {}
+    for run in runs:
+        start_date_obj = max(run.start_date, datetime.now(ZoneInfo(run.timezone)).date())
+        if start_date_obj > run.end_date:
+            continue
+        holidays_set = holiday_calendar_manager.holiday_dates(
+            db_session, (pattern.holiday_calendar_id, user_calendars.get(run.user_id)),
+            start_date_obj, run.end_date, run.holidays)
+        rows = list(_iter_shift_rows(pattern, run.user_id, start_date_obj, run.end_date, holidays_set,
+                                     run.exceptions or {}, run.timezone, run.offset))
+        summary = _apply_shift_diff(db_session, pattern.id, run.user_id, start_date_obj, run.end_date, rows)
+        totals = summaries.setdefault(run.user_id, dict.fromkeys(summary, 0))
+        for key, count in summary.items():
+            totals[key] += count
+    return summaries
+
 def get_shift_pattern(pattern_id: int):
-    db = SessionLocal()
+    db = get_session(readonly=True)
     try:
         pattern = db.query(ShiftPattern).filter(ShiftPattern.id == pattern_id).first()
         return pattern
@@ -209,10 +278,10 @@ def get_shift_pattern(pattern_id: int):
     finally:
         db.close()
 
-def get_shift_patterns_for_user(user_id: int):
-    db = SessionLocal()
+def get_shift_patterns_for_user(user_id: int, load=()):
+    db = get_session(readonly=True)
     try:
-        patterns = db.query(ShiftPattern).filter(ShiftPattern.user_id == user_id).all()
+        patterns = db.query(ShiftPattern).filter(ShiftPattern.user_id == user_id).options(*load).all()
         return patterns
     except SQLAlchemyError as e:
         print(f"Database error getting user shift patterns: {e}")
@@ -220,12 +289,12 @@ def get_shift_patterns_for_user(user_id: int):
     finally:
         db.close()
 
-def get_global_shift_patterns():
-    db = SessionLocal()
+def get_global_shift_patterns(limit: int = None, cursor: str = None, load=()):
+    db = get_session(readonly=True)
     try:
         # Global patterns are those where user_id is NULL
-        patterns = db.query(ShiftPattern).filter(ShiftPattern.user_id == None).all()
-        return patterns
+        query = db.query(ShiftPattern).filter(ShiftPattern.user_id == None).options(*load)
+        return paginate(query, ShiftPattern.id, limit=limit, cursor=cursor)
     except SQLAlchemyError as e:
         print(f"Database error getting global shift patterns: {e}")
         return []
@@ -233,8 +302,11 @@ def get_global_shift_patterns():
         db.close()
 
 def update_shift_pattern(pattern_id: int, name: str = None, description: str = None,
-                         pattern_type: str = None, definition: dict = None):
-    db = SessionLocal()
+                         pattern_type: str = None, definition: dict = None,
+                         regenerate: bool = False, holiday_calendar_id: int = None):
+    """Update a pattern. With `regenerate`, a changed type, definition or holiday calendar is
+    also applied to the upcoming shifts generated from it (see _regenerate_upcoming)."""
+    db = get_session()
     try:
         pattern = db.query(ShiftPattern).filter(ShiftPattern.id == pattern_id).first()
         if not pattern:
@@ -254,11 +326,31 @@ def update_shift_pattern(pattern_id: int, name: str = None, description: str = N
         if definition is not None:
             pattern.definition = definition
             updated = True
+        if holiday_calendar_id is not None:
+            pattern.holiday_calendar_id = holiday_calendar_id
+            updated = True
 
+        summaries = {}
+        shifts_changed = pattern_type is not None or definition is not None or holiday_calendar_id is not None
+        if pattern_type is not None or definition is not None:
+            pattern.version = (pattern.version or 1) + 1
+        if shifts_changed:
+            # Virtual shifts of assigned users change with the pattern
+            assigned = db.scalars(select(ShiftPatternAssignment.user_id)
+                                  .where(ShiftPatternAssignment.pattern_id == pattern.id)).all()
+            feed_state.touch(db, [(feed_state.USER_FEED, user_id) for user_id in assigned])
+        if regenerate and shifts_changed:
+            summaries = _regenerate_upcoming(db, pattern)
         if updated:
             db.commit()
             db.refresh(pattern)
+        for user_id, summary in summaries.items():
+            notify_regenerated(user_id, pattern.id, summary)
         return pattern
+    except ValueError as ve: # The new definition cannot generate shifts
+        db.rollback()
+        print(f"Error regenerating shifts for shift pattern: {ve}")
+        return None
     except SQLAlchemyError as e:
         db.rollback()
         print(f"Database error updating shift pattern: {e}")
@@ -267,13 +359,15 @@ def update_shift_pattern(pattern_id: int, name: str = None, description: str = N
         db.close()
 
 def delete_shift_pattern(pattern_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         pattern = db.query(ShiftPattern).filter(ShiftPattern.id == pattern_id).first()
         if not pattern:
             print("Error: Shift pattern not found for deletion.")
             return False
 
+        db.execute(delete(ShiftPatternAssignment).where(ShiftPatternAssignment.pattern_id == pattern_id))
+        db.execute(delete(ShiftGeneration).where(ShiftGeneration.pattern_id == pattern_id))
         db.delete(pattern)
         db.commit()
         return True
@@ -283,3 +377,79 @@ def delete_shift_pattern(pattern_id: int):
         return False
     finally:
         db.close()
+
+def assign_shift_pattern(user_id: int, pattern_id: int, start_date_str: str, end_date_str: str = None,
+                         offset: int = 0, timezone: str = 'UTC', exceptions: dict = None):
+    """Have a user work a pattern from a date (to an inclusive end date, or open-ended)
+    without storing its shifts; they are computed when read (see src/virtual_shifts.py).
+    `exceptions` maps ISO dates to 'off' or to a dict overriding name/start_time/end_time.
+    """
+    try:
+        start_date_obj = date.fromisoformat(start_date_str)
+        end_date_obj = date.fromisoformat(end_date_str) if end_date_str else None
+        ZoneInfo(timezone)
+    except (ValueError, KeyError):
+        print("Error: Invalid date format or timezone for pattern assignment.")
+        return None
+    if end_date_obj and start_date_obj > end_date_obj:
+        print("Error: Start date cannot be after end date.")
+        return None
+
+    db = get_session()
+    try:
+        pattern = db.query(ShiftPattern).filter(ShiftPattern.id == pattern_id).first()
+        user = db.query(User).filter(User.id == user_id).first()
+        if not pattern or not user:
+            print("Error: Shift pattern or user not found.")
+            return None
+        pattern_engine.compile_pattern(pattern) # Fail now rather than on every read
+
+        assignment = ShiftPatternAssignment(user_id=user_id, pattern_id=pattern_id, offset=offset or 0,
+                                            start_date=start_date_obj, end_date=end_date_obj,
+                                            timezone=timezone, exceptions=exceptions or None)
+        db.add(assignment)
+        feed_state.touch(db, [(feed_state.USER_FEED, user_id)])
+        db.commit()
+        db.refresh(assignment)
+        return assignment
+    except ValueError as ve:
+        db.rollback()
+        print(f"Error assigning shift pattern: {ve}")
+        return None
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error assigning shift pattern: {e}")
+        return None
+    finally:
+        db.close()
+
+def get_pattern_assignments_for_user(user_id: int):
+    db = get_session(readonly=True)
+    try:
+        return db.query(ShiftPatternAssignment).filter(ShiftPatternAssignment.user_id == user_id)\
+            .order_by(ShiftPatternAssignment.start_date, ShiftPatternAssignment.id).all()
+    except SQLAlchemyError as e:
+        print(f"Database error getting pattern assignments: {e}")
+        return []
+    finally:
+        db.close()
+
+def delete_pattern_assignment(assignment_id: int):
+    """Stop an assignment; stored overrides of its days are kept as ordinary shifts."""
+    db = get_session()
+    try:
+        assignment = db.query(ShiftPatternAssignment).filter(ShiftPatternAssignment.id == assignment_id).first()
+        if not assignment:
+            print("Error: Pattern assignment not found for deletion.")
+            return False
+
+        feed_state.touch(db, [(feed_state.USER_FEED, assignment.user_id)])
+        db.delete(assignment)
+        db.commit()
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"Database error deleting pattern assignment: {e}")
+        return False
+    finally:
+        db.close()
@@ -1,11 +1,11 @@
 from sqlalchemy.exc import SQLAlchemyError
-from src.database import SessionLocal
+from src.database import get_session
 from src.shift_swap import ShiftSwap
 from src.shift import Shift
 
 
 def propose_swap(from_shift_id: int, to_shift_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         new_request = ShiftSwap(from_shift_id=from_shift_id,
                                 to_shift_id=to_shift_id,
@@ -23,7 +23,7 @@ def propose_swap(from_shift_id: int, to_shift_id: int):
 
 
 def approve_swap(request_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         request = db.query(ShiftSwap).filter(ShiftSwap.id == request_id).first()
         if not request or request.status != 'pending':
@@ -48,7 +48,7 @@ def approve_swap(request_id: int):
 
 
 def reject_swap(request_id: int):
-    db = SessionLocal()
+    db = get_session()
     try:
         request = db.query(ShiftSwap).filter(ShiftSwap.id == request_id).first()
         if not request or request.status != 'pending':
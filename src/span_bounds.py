@@ -0,0 +1,98 @@
+from datetime import timedelta
+
+from sqlalchemy import Column, Integer, String, event, insert, select, update
+from sqlalchemy.orm import Session
+from src.database import Base
+from src.event import Event
+from src.shift import Shift
+
+# Longest duration stored per owner, for window queries (src/time_window.py).
+# The (owner, start_time) indexes can only bound start_time, so an owner's
+# items are looked for from their longest span before the window start. The
+# bound only grows: shortening or deleting a long item leaves it in place,
+# which costs a wider index range but never misses a row. ORM changes are
+# picked up by the flush hook at the bottom of this module; bulk inserts and
+# updates that bypass the ORM call record().
+
+EVENTS = "event"
+SHIFTS = "shift"
+USER = "user"
+CHILD = "child"
+
+# Owner columns per item kind
+_OWNERS = {EVENTS: ((USER, 'user_id'), (CHILD, 'child_id')), SHIFTS: ((USER, 'user_id'),)}
+
+class SpanBound(Base):
+    __tablename__ = "span_bounds"
+
+    kind = Column(String, primary_key=True) # EVENTS or SHIFTS
+    owner_type = Column(String, primary_key=True) # USER or CHILD
+    owner_id = Column(Integer, primary_key=True)
+    max_seconds = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<SpanBound({self.kind} of {self.owner_type}={self.owner_id}, {self.max_seconds}s)>"
+
+def lookback(db, kind: str, owner_type: str, owner_id: int):
+    """The longest span of an owner's stored items of `kind`; zero if they have none."""
+    seconds = db.execute(
+        select(SpanBound.max_seconds)
+        .where(SpanBound.kind == kind, SpanBound.owner_type == owner_type, SpanBound.owner_id == owner_id)
+    ).scalar()
+    return timedelta(seconds=seconds or 0)
+
+def _value(item, name: str):
+    return item.get(name) if isinstance(item, dict) else getattr(item, name, None)
+
+def record(connection, kind: str, items, **owners):
+    """Widen the stored bounds for `items` (row dicts or objects with start_time and end_time).
+
+    Owner ids come from each item's owner columns; keyword arguments (e.g.
+    user_id=3) fill them in for rows that do not carry them, such as bulk updates.
+    """
+    spans = {}
+    for item in items:
+        start, end = _value(item, 'start_time'), _value(item, 'end_time')
+        if start is None or end is None:
+            continue
+        seconds = max(0, -(-(end - start) // timedelta(seconds=1))) # Rounded up
+        for owner_type, column in _OWNERS[kind]:
+            owner_id = _value(item, column)
+            if owner_id is None:
+                owner_id = owners.get(column)
+            if owner_id is not None:
+                key = (owner_type, owner_id)
+                spans[key] = max(spans.get(key, 0), seconds)
+    for (owner_type, owner_id), seconds in sorted(spans.items()):
+        where = (SpanBound.kind == kind, SpanBound.owner_type == owner_type, SpanBound.owner_id == owner_id)
+        stored = connection.execute(select(SpanBound.max_seconds).where(*where)).scalar()
+        if stored is None:
+            connection.execute(insert(SpanBound).values(kind=kind, owner_type=owner_type, owner_id=owner_id,
+                                                        max_seconds=seconds))
+        elif stored < seconds:
+            connection.execute(update(SpanBound).where(*where).values(max_seconds=seconds))
+
+def backfill(conn):
+    """Migration step: bounds for the events and shifts stored before bounds were kept."""
+    if conn.dialect.name == "sqlite":
+        span = "MAX(0, CAST(MAX(julianday(end_time) - julianday(start_time)) * 86400 + 1 AS INTEGER))"
+    else:
+        span = "GREATEST(0, CAST(EXTRACT(EPOCH FROM MAX(end_time - start_time)) + 1 AS INTEGER))"
+    for kind, table in ((EVENTS, "events"), (SHIFTS, "shifts")):
+        for owner_type, column in _OWNERS[kind]:
+            conn.exec_driver_sql(
+                f"INSERT INTO span_bounds (kind, owner_type, owner_id, max_seconds) "
+                f"SELECT '{kind}', '{owner_type}', {column}, {span} FROM {table} "
+                f"WHERE {column} IS NOT NULL AND {column} NOT IN "
+                f"(SELECT owner_id FROM span_bounds WHERE kind = '{kind}' AND owner_type = '{owner_type}') "
+                f"GROUP BY {column}")
+
+@event.listens_for(Session, "after_flush")
+def _widen_changed_bounds(session, flush_context):
+    # Only new and changed rows can be longer than what is stored
+    changed = list(session.new) + [obj for obj in session.dirty
+                                   if session.is_modified(obj, include_collections=False)]
+    for kind, model in ((EVENTS, Event), (SHIFTS, Shift)):
+        items = [obj for obj in changed if isinstance(obj, model)]
+        if items:
+            record(session.connection(), kind, items)
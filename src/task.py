@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from src.database import Base
 
@@ -16,6 +16,10 @@ class Task(Base):
     user = relationship("User")
     event = relationship("Event")
 
+    __table_args__ = (
+        Index('ix_tasks_user_id_completed_due_date', 'user_id', 'completed', 'due_date'),
+    )
+
     def __repr__(self):
         return f"<Task(id={self.id}, description='{self.description}')>"
 
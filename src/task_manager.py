@@ -1,7 +1,8 @@
 from datetime import datetime
 from sqlalchemy.exc import SQLAlchemyError
 
-from src.database import SessionLocal
+from src.database import get_session
+from src.pagination import paginate
 from src.task import Task
 
 
@@ -16,7 +17,7 @@ def _parse_datetime(datetime_str):
 
 
 def create_task(description, due_date_str=None, user_id=None, event_id=None):
-    db = SessionLocal()
+    db = get_session()
     try:
         due_dt = _parse_datetime(due_date_str) if due_date_str else None
         new_task = Task(
@@ -39,7 +40,7 @@ def create_task(description, due_date_str=None, user_id=None, event_id=None):
 
 
 def get_task_details(task_id):
-    db = SessionLocal()
+    db = get_session(readonly=True)
     try:
         return db.query(Task).filter(Task.id == task_id).first()
     except SQLAlchemyError as e:
@@ -49,10 +50,11 @@ def get_task_details(task_id):
         db.close()
 
 
-def get_tasks_for_user(user_id):
-    db = SessionLocal()
+def get_tasks_for_user(user_id, limit=None, cursor=None, load=()):
+    db = get_session(readonly=True)
     try:
-        return db.query(Task).filter(Task.user_id == user_id).all()
+        query = db.query(Task).filter(Task.user_id == user_id).options(*load)
+        return paginate(query, Task.id, limit=limit, cursor=cursor)
     except SQLAlchemyError as e:
         print(f"Database error getting tasks for user: {e}")
         return []
@@ -60,10 +62,10 @@ def get_tasks_for_user(user_id):
         db.close()
 
 
-def get_tasks_for_event(event_id):
-    db = SessionLocal()
+def get_tasks_for_event(event_id, load=()):
+    db = get_session(readonly=True)
     try:
-        return db.query(Task).filter(Task.event_id == event_id).all()
+        return db.query(Task).filter(Task.event_id == event_id).options(*load).all()
     except SQLAlchemyError as e:
         print(f"Database error getting tasks for event: {e}")
         return []
@@ -72,7 +74,7 @@ def get_tasks_for_event(event_id):
 
 
 def update_task(task_id, description=None, due_date_str=None, user_id=None, event_id=None, completed=None, unlink_user=False, unlink_event=False):
-    db = SessionLocal()
+    db = get_session()
     try:
         task = db.query(Task).filter(Task.id == task_id).first()
         if not task:
@@ -116,7 +118,7 @@ def update_task(task_id, description=None, due_date_str=None, user_id=None, even
 
 
 def delete_task(task_id):
-    db = SessionLocal()
+    db = get_session()
     try:
         task = db.query(Task).filter(Task.id == task_id).first()
         if not task:
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import and_
+
+# Time-window filtering for events and shifts. A window [start, end) selects
+# the items that overlap it. The (owner, start_time) composite indexes can only
+# bound start_time, so an item is looked for from `max_span` before the window
+# start: an item that began earlier than that has ended before the window. The
+# managers pass the longest span the owner has stored (src/span_bounds.py);
+# without one, start_time is only bounded above.
+
+# What the web views show when no window is requested
+DEFAULT_VIEW_PAST = timedelta(days=7)
+DEFAULT_VIEW_FUTURE = timedelta(days=60)
+
+def overlap_conditions(start_column, end_column, start: datetime = None, end: datetime = None,
+                       max_span: timedelta = None):
+    """SQL conditions for rows overlapping [start, end). Either bound may be None (open)."""
+    conditions = []
+    if end is not None:
+        conditions.append(start_column < end)
+    if start is not None:
+        if max_span is not None:
+            conditions.append(start_column >= start - max_span)
+        conditions.append(end_column > start)
+    return conditions
+
+def overlapping(query, start_column, end_column, start: datetime = None, end: datetime = None,
+                max_span: timedelta = None):
+    """Filter `query` to rows overlapping [start, end)."""
+    conditions = overlap_conditions(start_column, end_column, start, end, max_span)
+    return query.filter(and_(*conditions)) if conditions else query
+
+def parse_window_bound(value: str, timezone: str = 'UTC'):
+    """Parse an ISO date or datetime query argument into naive UTC.
+
+    Values without an offset are read in `timezone`. Returns None for an empty
+    value and raises ValueError for one that does not parse.
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid date or datetime: {value}. Use ISO format, e.g. 2024-01-31 or 2024-01-31T08:00.")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=ZoneInfo(timezone))
+    return parsed.astimezone(ZoneInfo('UTC')).replace(tzinfo=None)
+
+def default_view_window(now: datetime = None):
+    """(start, end) in naive UTC for views that were not given a window."""
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - DEFAULT_VIEW_PAST, today + DEFAULT_VIEW_FUTURE
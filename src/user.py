@@ -19,6 +19,8 @@ class User(Base):
     prefers_sse = Column(Boolean, default=True)
     prefers_email = Column(Boolean, default=False)
     calendar_token = Column(String, nullable=True)  # OAuth token for Google Calendar
+    # The user's holidays are days off in every pattern they work
+    holiday_calendar_id = Column(Integer, ForeignKey('holiday_calendars.id'), nullable=True)
 
 
     # Relationship to Shifts (One-to-Many: User has many Shifts)
@@ -35,7 +37,7 @@ class User(Base):
     )
 
     # Relationship to ResidencyPeriods where this user is the custodian parent
-    custodial_periods = relationship("ResidencyPeriod", foreign_keys="ResidencyPeriod.parent_id", backref="custodian_parent", lazy="dynamic")
+    custodial_periods = relationship("ResidencyPeriod", foreign_keys="ResidencyPeriod.parent_id", backref="custodian_parent")
 
     def __repr__(self):
         return f"<User(id={self.id}, name='{self.name}', email='{self.email}')>"
@@ -47,7 +49,8 @@ class User(Base):
             "email": self.email,
             "timezone": self.timezone,
             "prefers_sse": self.prefers_sse,
-            "prefers_email": self.prefers_email
+            "prefers_email": self.prefers_email,
+            "holiday_calendar_id": self.holiday_calendar_id
             # Exclude hashed_password for security
         }
         if include_shifts and self.shifts:
@@ -59,6 +62,5 @@ class User(Base):
            data['shift_patterns'] = [pattern.to_dict() for pattern in self.shift_patterns]
 
         if include_custodial_periods and hasattr(self, 'custodial_periods') and self.custodial_periods:
-            periods_to_serialize = self.custodial_periods.all() if hasattr(self.custodial_periods, 'all') else self.custodial_periods
-            data['custodial_periods'] = [period.to_dict(include_parent=False) for period in periods_to_serialize]
+            data['custodial_periods'] = [period.to_dict(include_parent=False) for period in self.custodial_periods]
         return data
@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+import heapq
+from itertools import groupby
+import threading
+
+from sqlalchemy import select, or_
+
+from src import pattern_engine, holiday_calendar_manager
+from src.pagination import Page, decode_cursor, encode_cursor
+from src.pattern_assignment import ShiftPatternAssignment
+from src.shift import Shift, _serialize_columns
+from src.shift_pattern import ShiftPattern
+from src.user import User
+
+# Shifts of a pattern assignment are not stored: they are computed for the window
+# being read and merged with the user's stored shifts. A stored shift from the
+# same pattern on the same pattern day (see Shift.pattern_date) overrides the
+# computed one, so a single changed day is one row and the rest of the rotation
+# stays virtual.
+#
+# Expansions are cached per local calendar month, keyed by (pattern id, pattern
+# version, offset, timezone, month), so overlapping and repeated windows share
+# work and an edited pattern (new version) is never served stale. Holidays are
+# applied after the cache, so editing a holiday calendar needs no invalidation.
+
+WINDOW_CACHE_SIZE = 4096
+_window_cache = OrderedDict()
+_window_cache_lock = threading.Lock()
+
+class VirtualShift:
+    """A shift an assignment puts on a day; read-only and without an id."""
+
+    id = None
+    virtual = True
+
+    def __init__(self, user_id: int, pattern_id: int, occurrence):
+        self.user_id = user_id
+        self.source_pattern_id = pattern_id
+        self.pattern_date = occurrence.day
+        self.name = occurrence.name
+        self.start_time = occurrence.start_time
+        self.end_time = occurrence.end_time
+
+    def __repr__(self):
+        return f"<VirtualShift(user_id={self.user_id}, pattern_date={self.pattern_date}, name='{self.name}')>"
+
+    def to_dict(self, include_owner=True, include_source_pattern_details=False, timezone='UTC'):
+        data = _serialize_columns(self, timezone)
+        data['pattern_date'] = self.pattern_date.isoformat()
+        data['virtual'] = True
+        return data
+
+def _months(first: date, last: date):
+    month = first.replace(day=1)
+    while month <= last:
+        yield month
+        month = (month + timedelta(days=32)).replace(day=1)
+
+def _expand_month(pattern: ShiftPattern, offset: int, timezone: str, month: date):
+    """The pattern's ShiftOccurrences for one local month, from the cache when possible."""
+    key = (pattern.id, pattern.version, offset, timezone, month)
+    with _window_cache_lock:
+        cached = _window_cache.get(key)
+        if cached is not None:
+            _window_cache.move_to_end(key)
+            return cached
+    month_end = (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    occurrences = tuple(pattern_engine.compile_pattern(pattern).iter_shifts(month, month_end, timezone,
+                                                                           offset=offset))
+    with _window_cache_lock:
+        _window_cache[key] = occurrences
+        if len(_window_cache) > WINDOW_CACHE_SIZE:
+            _window_cache.popitem(last=False)
+    return occurrences
+
+def clear_cache():
+    with _window_cache_lock:
+        _window_cache.clear()
+
+def _day_range(start: datetime, end: datetime):
+    """Local days that can hold a shift overlapping [start, end): a day either side
+    covers timezone offsets and overnight shifts. An open start is (date.min)."""
+    first = start.date() - timedelta(days=1) if start is not None else date.min
+    return first, end.date() + timedelta(days=1)
+
+def _assignment_days(assignment: ShiftPatternAssignment, start: datetime, end: datetime):
+    first, last = _day_range(start, end)
+    first = max(first, assignment.start_date)
+    if assignment.end_date:
+        last = min(last, assignment.end_date)
+    return first, last
+
+def _assignment_shifts(assignment: ShiftPatternAssignment, pattern: ShiftPattern, start: datetime, end: datetime,
+                       overridden: set, holidays=frozenset()):
+    first, last = _assignment_days(assignment, start, end)
+    start = start or datetime.min
+    exceptions = assignment.exceptions or {}
+    for month in _months(first, last):
+        for occurrence in _expand_month(pattern, assignment.offset or 0, assignment.timezone or 'UTC', month):
+            if not first <= occurrence.day <= last or occurrence.day in overridden or occurrence.day in holidays:
+                continue
+            if occurrence.start_time >= end or occurrence.end_time <= start:
+                continue
+            exception = exceptions.get(occurrence.day.isoformat())
+            if exception == 'off':
+                continue
+            if isinstance(exception, dict):
+                # Rare enough to compute outside the cache
+                occurrence = next(pattern_engine.compile_pattern(pattern).iter_shifts(
+                    occurrence.day, occurrence.day, assignment.timezone or 'UTC',
+                    exceptions={occurrence.day.isoformat(): exception}, offset=assignment.offset or 0), None)
+                if occurrence is None or occurrence.start_time >= end or occurrence.end_time <= start:
+                    continue
+            yield VirtualShift(assignment.user_id, pattern.id, occurrence)
+
+def virtual_shifts(db, user_id: int, start: datetime, end: datetime):
+    """The user's computed pattern shifts overlapping [start, end) (naive UTC), by start time."""
+    first, last = _day_range(start, end)
+    assignments = db.execute(
+        select(ShiftPatternAssignment, ShiftPattern)
+        .join(ShiftPattern, ShiftPattern.id == ShiftPatternAssignment.pattern_id)
+        .where(ShiftPatternAssignment.user_id == user_id,
+               ShiftPatternAssignment.start_date <= last,
+               or_(ShiftPatternAssignment.end_date.is_(None), ShiftPatternAssignment.end_date >= first))
+        .order_by(ShiftPatternAssignment.id) # Keeps the order of shifts starting together stable
+    ).all()
+    if not assignments:
+        return []
+    # Stored shifts replace the computed ones for their pattern day
+    overrides = db.execute(
+        select(Shift.source_pattern_id, Shift.pattern_date)
+        .where(Shift.user_id == user_id,
+               Shift.source_pattern_id.in_({pattern.id for _, pattern in assignments}),
+               Shift.pattern_date >= first, Shift.pattern_date <= last)
+    ).all()
+    overridden = {}
+    for pattern_id, day in overrides:
+        overridden.setdefault(pattern_id, set()).add(day)
+    user_calendar_id = db.scalar(select(User.holiday_calendar_id).where(User.id == user_id))
+    streams = []
+    for assignment, pattern in assignments:
+        holidays = frozenset()
+        if pattern.holiday_calendar_id or user_calendar_id:
+            holidays = holiday_calendar_manager.holiday_dates(
+                db, (pattern.holiday_calendar_id, user_calendar_id), *_assignment_days(assignment, start, end))
+        streams.append(_assignment_shifts(assignment, pattern, start, end, overridden.get(pattern.id, set()),
+                                          holidays))
+    return list(heapq.merge(*streams, key=lambda shift: shift.start_time))
+
+def _keyed(shifts):
+    """(sort key, shift) pairs in the (start_time, id) order stored shifts are paginated in.
+
+    Virtual shifts have no id; those starting at the same time get -n..-1 in their
+    (stable) order, so they sort before stored shifts starting then and a cursor
+    can point at one.
+    """
+    keyed = []
+    for start_time, group in groupby(shifts, key=lambda shift: shift.start_time):
+        group = list(group)
+        keyed.extend(((start_time, position - len(group)), shift) for position, shift in enumerate(group))
+    return keyed
+
+def merge_into_page(db, user_id: int, page: Page, start: datetime, end: datetime, cursor: str = None,
+                    limit: int = None):
+    """Merge the user's virtual shifts into a page of stored shifts, keeping it to `limit` rows.
+
+    The page continues after `cursor` and, when more stored shifts follow, stops at
+    its last stored shift. If the merged rows are more than `limit`, the page is cut
+    there and the next cursor points at its last row, virtual or stored.
+    """
+    after = decode_cursor(cursor, Shift.start_time) if cursor else None
+    before = (page[-1].start_time, page[-1].id) if page.next_cursor and page else None
+    extra = [(key, shift) for key, shift in _keyed(virtual_shifts(db, user_id, start, end))
+             if (after is None or key > after) and (before is None or key < before)]
+    if not extra:
+        return page
+    merged = list(heapq.merge((((shift.start_time, shift.id), shift) for shift in page), extra,
+                  key=lambda item: item[0]))
+    if limit is None or len(merged) <= limit:
+        return Page((shift for _, shift in merged), page.next_cursor)
+    merged = merged[:limit]
+    return Page((shift for _, shift in merged), encode_cursor(*merged[-1][0]))
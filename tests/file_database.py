@@ -0,0 +1,35 @@
+import os
+import tempfile
+
+from src import database
+
+# The in-memory test database is a single connection per thread that every
+# session shares, so sessions there are never isolated from each other and
+# BEGIN is skipped while that connection is already in a transaction. Tests of
+# transaction behaviour call use_file_database() from setUp() instead: it
+# points the application at a fresh SQLite file with its own engines, where
+# each session gets its own connection as in production, and restores the
+# environment and the in-memory engines when the test ends.
+
+_ENV_VARS = ("TEST_MODE_ENABLED", "DATABASE_URL", "DATABASE_READ_URL")
+
+def use_file_database(test):
+    """Run `test` (a TestCase, from its setUp) against an empty database file with all tables created."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    saved = {name: os.environ.get(name) for name in _ENV_VARS}
+
+    def restore():
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        database.initialize_database_for_application() # Disposes the file's engines
+    test.addCleanup(restore)
+
+    os.environ.pop("TEST_MODE_ENABLED", None)
+    os.environ.pop("DATABASE_READ_URL", None)
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(directory.name, 'family_planner.db')}"
+    database.initialize_database_for_application()
+    database.create_tables()
@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import json
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from sqlalchemy.exc import OperationalError, SQLAlchemyError
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src import agenda, auth, child_manager, event_manager, shift_manager, task_manager
+
+class TestAgenda(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.user = auth.register("Agenda User", "agenda@example.com", "pass")
+        self.child = child_manager.add_child(self.user.id, "Kid", "2018-05-01")
+        uid, cid = self.user.id, self.child.id
+
+        event_manager.create_event("Standup", None, "2024-03-04 09:00", "2024-03-04 09:15",
+                                   linked_user_id=uid, recurrence_rule="FREQ=DAILY;COUNT=3")
+        event_manager.create_event("School play", None, "2024-03-05 18:00", "2024-03-05 19:00", linked_child_id=cid)
+        # Linked to both; must appear once
+        event_manager.create_event("Doctor", None, "2024-03-05 08:00", "2024-03-05 08:30",
+                                   linked_user_id=uid, linked_child_id=cid)
+        event_manager.create_event("Outside window", None, "2024-04-01 09:00", "2024-04-01 10:00", linked_user_id=uid)
+        shift_manager.add_shift(uid, "2024-03-04 22:00", "2024-03-05 06:00", "Night")
+        task_manager.create_task("Pay rent", "2024-03-05 12:00", user_id=uid)
+        done = task_manager.create_task("Buy gift", "2024-03-04 12:00", user_id=uid)
+        task_manager.update_task(done.id, completed=True)
+
+        db = SessionLocal()
+        child_manager.add_residency_period(db, cid, uid, "2024-03-01 17:00", "2024-03-05 17:00")
+        db.commit()
+        db.close()
+
+        self.start, self.end = datetime(2024, 3, 4), datetime(2024, 3, 7)
+
+    def tearDown(self):
+        drop_tables()
+
+    def test_items_are_merged_in_time_order(self):
+        items = [(kind, start, getattr(obj, 'title', None) or getattr(obj, 'name', None)
+                  or getattr(obj, 'description', None) or getattr(obj, 'notes', None))
+                 for kind, start, _, obj in agenda.iter_agenda(self.user.id, self.start, self.end)]
+        self.assertEqual(items, [
+            ('residency', datetime(2024, 3, 1, 17), None),
+            ('event', datetime(2024, 3, 4, 9), "Standup"),
+            ('task', datetime(2024, 3, 4, 12), "Buy gift"),
+            ('shift', datetime(2024, 3, 4, 22), "Night"),
+            ('event', datetime(2024, 3, 5, 8), "Doctor"),
+            ('event', datetime(2024, 3, 5, 9), "Standup"),
+            ('task', datetime(2024, 3, 5, 12), "Pay rent"),
+            ('event', datetime(2024, 3, 5, 18), "School play"),
+            ('event', datetime(2024, 3, 6, 9), "Standup"),
+        ])
+
+    def test_json_stream_is_chunked_by_day(self):
+        chunks = list(agenda.stream_agenda_json(self.user.id, self.start, self.end, 'Europe/Oslo'))
+        self.assertGreater(len(chunks), 3)
+        document = json.loads(''.join(chunks))
+        self.assertEqual(document["from"], "2024-03-04T01:00:00+01:00")
+        self.assertEqual(len(document["items"]), 9)
+        self.assertEqual(document["items"][1]["start"], "2024-03-04T10:00:00+01:00")
+        self.assertIn("recurrence_id", document["items"][1]["item"])
+
+    def test_empty_range(self):
+        document = json.loads(''.join(agenda.stream_agenda_json(self.user.id, datetime(2030, 1, 1),
+                                                                datetime(2030, 1, 2))))
+        self.assertEqual(document["items"], [])
+
+    def test_error_before_the_first_item_is_raised(self):
+        original_sources = agenda._sources
+        def failing_sources(db, user_id, start, end):
+            raise OperationalError("SELECT", {}, Exception("database is locked"))
+        agenda._sources = failing_sources
+        try:
+            with self.assertRaises(SQLAlchemyError):
+                agenda.stream_agenda_json(self.user.id, self.start, self.end)
+        finally:
+            agenda._sources = original_sources
+
+    def test_error_mid_stream_ends_the_document_with_an_error(self):
+        original_item_dict = agenda.item_dict
+        calls = []
+        def failing_item_dict(*args, **kwargs):
+            calls.append(args)
+            if len(calls) > 2:
+                raise OperationalError("SELECT", {}, Exception("disk I/O error"))
+            return original_item_dict(*args, **kwargs)
+        agenda.item_dict = failing_item_dict
+        try:
+            document = json.loads(''.join(agenda.stream_agenda_json(self.user.id, self.start, self.end)))
+        finally:
+            agenda.item_dict = original_item_dict
+        self.assertEqual(len(document["items"]), 2)
+        self.assertIn("error", document)
+
+    def test_validate_range(self):
+        self.assertEqual(agenda.validate_range(now=datetime(2024, 3, 4, 15)),
+                         (datetime(2024, 3, 4), datetime(2024, 3, 11)))
+        with self.assertRaises(ValueError):
+            agenda.validate_range(self.end, self.start)
+        with self.assertRaises(ValueError):
+            agenda.validate_range(datetime(2024, 1, 1), datetime(2026, 1, 1))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -39,8 +39,6 @@ class TestAuthAPI(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         drop_tables()
-        if "TEST_MODE_ENABLED" in os.environ:
-            del os.environ["TEST_MODE_ENABLED"]
         # If path was updated, optionally remove it, though usually not necessary for test runs
         # global sys_path_updated
         # if sys_path_updated and os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) in sys.path:
@@ -35,8 +35,6 @@ class TestAPIChildrenResidency(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         drop_tables()
-        if "TEST_MODE_ENABLED" in os.environ:
-            del os.environ["TEST_MODE_ENABLED"]
 
     def setUp(self):
         self.client = app.test_client()
@@ -0,0 +1,87 @@
+import unittest
+import os
+import sys
+
+if os.path.abspath(os.path.join(os.path.dirname(__file__), '..')) not in sys.path:
+    sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from app import app
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.user import User
+
+EVERY_DAY = {
+    "cycle": [{"name": "Day", "days": 1, "start_time": "09:00", "end_time": "17:00"}],
+    "cycle_start_reference_date": "2024-01-01"
+}
+
+class TestAPIHolidayCalendars(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+        app.config['TESTING'] = True
+
+    def setUp(self):
+        create_tables()
+        self.client = app.test_client()
+        db = SessionLocal()
+        user = User(name="Worker", email="worker@example.com", timezone="UTC")
+        db.add(user)
+        db.commit()
+        self.user_id = user.id
+        db.close()
+
+    def tearDown(self):
+        drop_tables()
+
+    def _create_calendar(self, rules):
+        response = self.client.post('/holiday-calendars', json={"name": "Region", "region": "NO", "rules": rules})
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
+
+    def test_calendar_crud(self):
+        calendar = self._create_calendar([{"month": 5, "day": 17}])
+        self.assertEqual(self.client.post('/holiday-calendars', json={"name": "Bad", "rules": [{"month": 13}]})
+                         .status_code, 400)
+        listed = self.client.get('/holiday-calendars?region=NO').get_json()
+        self.assertEqual([c['id'] for c in listed], [calendar['id']])
+
+        response = self.client.put(f"/holiday-calendars/{calendar['id']}", json={"name": "Norway"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(f"/holiday-calendars/{calendar['id']}").get_json()['name'], "Norway")
+
+        self.assertEqual(self.client.delete(f"/holiday-calendars/{calendar['id']}").status_code, 200)
+        self.assertEqual(self.client.get(f"/holiday-calendars/{calendar['id']}").status_code, 404)
+
+    def test_pattern_calendar_applies_to_generation(self):
+        calendar = self._create_calendar([{"month": 1, "day": 2}])
+        pattern = self.client.post(f'/users/{self.user_id}/shift-patterns', json={
+            "name": "Daily", "pattern_type": "Rotating", "definition": EVERY_DAY,
+            "holiday_calendar_id": calendar['id']}).get_json()
+        self.assertEqual(pattern['holiday_calendar_id'], calendar['id'])
+
+        response = self.client.post(f"/users/{self.user_id}/shift-patterns/{pattern['id']}/generate-shifts",
+                                    json={"start_date": "2024-01-01", "end_date": "2024-01-03"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([s['start_time'][:10] for s in response.get_json()], ["2024-01-01", "2024-01-03"])
+
+    def test_user_calendar_applies_to_virtual_shifts(self):
+        calendar = self._create_calendar([{"month": 1, "day": 2}])
+        pattern = self.client.post('/shift-patterns', json={
+            "name": "Daily", "pattern_type": "Rotating", "definition": EVERY_DAY}).get_json()
+        response = self.client.post(f"/users/{self.user_id}/shift-patterns/{pattern['id']}/assign",
+                                    json={"start_date": "2024-01-01"})
+        self.assertEqual(response.status_code, 201)
+        response = self.client.put(f'/users/{self.user_id}/holiday-calendar',
+                                   json={"holiday_calendar_id": calendar['id']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['holiday_calendar_id'], calendar['id'])
+
+        shifts = self.client.get(f'/users/{self.user_id}/shifts?start=2024-01-01&end=2024-01-04').get_json()
+        self.assertEqual([(s['start_time'][:10], s['virtual']) for s in shifts],
+                         [("2024-01-01", True), ("2024-01-03", True)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -35,8 +35,6 @@ class TestAPIShifts(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         drop_tables()
-        if "TEST_MODE_ENABLED" in os.environ:
-            del os.environ["TEST_MODE_ENABLED"]
 
     def setUp(self):
         self.client = app.test_client()
@@ -108,7 +106,6 @@ class TestAPIShifts(unittest.TestCase):
         self.assertEqual(response.status_code, 404)
 
     def test_get_global_shift_patterns(self):
-        ShiftPattern.user_id = None # For static analysis if it complains
         p1 = ShiftPattern(name="Global 1", pattern_type="Fixed", definition={}, user_id=None)
         p2 = ShiftPattern(name="User 1", pattern_type="Fixed", definition={}, user_id=self.test_user.id)
         self.db.add_all([p1, p2])
@@ -164,7 +161,6 @@ class TestAPIShifts(unittest.TestCase):
         self.assertIsNotNone(shift_in_db)
 
     def test_get_user_shifts_success(self):
-        Shift.user_id = self.test_user.id # For static analysis
         s1 = Shift(name="Shift A", start_time=datetime(2024,1,1,9,0), end_time=datetime(2024,1,1,17,0), user_id=self.test_user.id)
         s2 = Shift(name="Shift B", start_time=datetime(2024,1,2,9,0), end_time=datetime(2024,1,2,17,0), user_id=self.test_user.id)
         self.db.add_all([s1, s2])
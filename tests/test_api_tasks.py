@@ -31,8 +31,6 @@ class TestAPITasks(unittest.TestCase):
     @classmethod
     def tearDownClass(cls):
         drop_tables()
-        if "TEST_MODE_ENABLED" in os.environ:
-            del os.environ["TEST_MODE_ENABLED"]
 
     def setUp(self):
         self.client = app.test_client()
@@ -104,6 +102,20 @@ class TestAPITasks(unittest.TestCase):
         data = response.get_json()
         self.assertEqual(len(data), 2)
 
+    def test_tasks_are_paged_only_on_request(self):
+        for description in ("A", "B", "C"):
+            self._create_task_api(description, user_id=self.user.id)
+        response = self.client.get(f'/users/{self.user.id}/tasks')
+        self.assertEqual(len(response.get_json()), 3)
+        self.assertNotIn('X-Next-Cursor', response.headers)
+
+        first = self.client.get(f'/users/{self.user.id}/tasks?limit=2')
+        self.assertEqual(len(first.get_json()), 2)
+        cursor = first.headers['X-Next-Cursor']
+        rest = self.client.get(f'/users/{self.user.id}/tasks?cursor={cursor}')
+        self.assertEqual(len(rest.get_json()), 1)
+        self.assertNotIn('X-Next-Cursor', rest.headers)
+
     def test_update_task_completion(self):
         res = self._create_task_api("Finish project", user_id=self.user.id)
         task_id = res.get_json()['id']
@@ -0,0 +1,81 @@
+import unittest
+import asyncio
+import sys
+import os
+import json
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src import async_managers, notification
+from src.async_database import (initialize_async_database, create_tables_async,
+                                drop_tables_async, dispose_async_database, AsyncSessionLocal)
+from src.user import User
+
+class TestAsyncManagers(unittest.TestCase):
+
+    def setUp(self):
+        initialize_async_database()
+        asyncio.run(self._set_up())
+
+    async def _set_up(self):
+        await create_tables_async()
+        async with AsyncSessionLocal() as db:
+            user = User(name="Async User", email="async@example.com", prefers_sse=True)
+            db.add(user)
+            await db.commit()
+            self.user_id = user.id
+
+    def tearDown(self):
+        async def _tear_down():
+            await drop_tables_async()
+            await dispose_async_database()
+        asyncio.run(_tear_down())
+        notification._user_queues.pop(self.user_id, None)
+
+    def test_event_lifecycle(self):
+        async def scenario():
+            event = await async_managers.create_event(
+                "Dentist", "Checkup", "2024-03-01 10:00", "2024-03-01 11:00", linked_user_id=self.user_id)
+            self.assertIsNotNone(event)
+            updated = await async_managers.update_event(event.id, title="Dentist (moved)")
+            self.assertEqual(updated.title, "Dentist (moved)")
+            events = await async_managers.get_events_for_user(self.user_id)
+            self.assertEqual([e.id for e in events], [event.id])
+            self.assertTrue(await async_managers.delete_event(event.id))
+            self.assertIsNone(await async_managers.get_event_details(event.id))
+
+        asyncio.run(scenario())
+        queued = notification.get_user_queue(self.user_id)
+        self.assertEqual(json.loads(queued.get_nowait())["type"], "event_created")
+        self.assertEqual(json.loads(queued.get_nowait())["type"], "event_updated")
+
+    def test_invalid_shift_time_returns_none(self):
+        shift = asyncio.run(async_managers.add_shift(self.user_id, "not a time", "2024-03-01 17:00", "Day"))
+        self.assertIsNone(shift)
+
+    def test_shared_session_commits_once(self):
+        async def scenario():
+            async with AsyncSessionLocal() as db:
+                await async_managers.add_shift(self.user_id, "2024-03-01 09:00", "2024-03-01 17:00", "Day", db=db)
+                child = await async_managers.add_child(self.user_id, "Sam", "2018-05-04", db=db)
+                self.assertIsNotNone(child)
+                await db.rollback()
+            self.assertEqual(await async_managers.get_user_shifts(self.user_id), [])
+            self.assertEqual(await async_managers.get_user_children(self.user_id), [])
+
+        asyncio.run(scenario())
+
+    def test_child_details_load_parents(self):
+        async def scenario():
+            child = await async_managers.add_child(self.user_id, "Sam", "2018-05-04")
+            return await async_managers.get_child_details(child.id)
+
+        child = asyncio.run(scenario())
+        self.assertEqual([parent.id for parent in child.parents], [self.user_id])
+
+if __name__ == '__main__':
+    unittest.main()
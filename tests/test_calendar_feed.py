@@ -0,0 +1,118 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.event import Event
+from src import (auth, calendar_feed, child_manager, event_manager, feed_state, ics_import, shift_manager,
+                 shift_pattern_manager)
+
+NOW = datetime(2024, 3, 1, 12)
+
+class TestCalendarFeed(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.user = auth.register("Feed User", "feed@example.com", "pass")
+        self.other = auth.register("Other User", "feed-other@example.com", "pass")
+        self.child = child_manager.add_child(self.user.id, "Kid", "2018-05-01")
+
+    def tearDown(self):
+        drop_tables()
+
+    def _state(self, owner_type, owner_id):
+        db = SessionLocal()
+        try:
+            return feed_state.get_state(db, owner_type, owner_id)[0]
+        finally:
+            db.close()
+
+    def _etag(self, owner_type, owner_id):
+        db = SessionLocal()
+        try:
+            return calendar_feed.validators(db, owner_type, owner_id, now=NOW)[0]
+        finally:
+            db.close()
+
+    def test_changes_bump_the_affected_feeds_only(self):
+        user_etag = self._etag(feed_state.USER_FEED, self.user.id)
+        event = event_manager.create_event("Parents' evening", None, "2024-03-05 18:00", "2024-03-05 19:00",
+                                           linked_user_id=self.user.id, linked_child_id=self.child.id)
+        self.assertEqual(self._state(feed_state.USER_FEED, self.user.id), 1)
+        self.assertEqual(self._state(feed_state.CHILD_FEED, self.child.id), 1)
+        self.assertNotEqual(self._etag(feed_state.USER_FEED, self.user.id), user_etag)
+
+        other_etag = self._etag(feed_state.USER_FEED, self.other.id)
+        shift_manager.add_shift(self.user.id, "2024-03-06 08:00", "2024-03-06 16:00", "Day")
+        self.assertEqual(self._etag(feed_state.USER_FEED, self.other.id), other_etag)
+
+        # Moving the event to another user changes both users' feeds
+        event_manager.update_event(event.id, linked_user_id=self.other.id)
+        self.assertEqual(self._state(feed_state.USER_FEED, self.user.id), 3)
+        self.assertEqual(self._state(feed_state.USER_FEED, self.other.id), 1)
+
+        event_manager.delete_event(event.id)
+        self.assertEqual(self._state(feed_state.CHILD_FEED, self.child.id), 3)
+
+    def test_feed_content_round_trips_through_import(self):
+        event_manager.create_event("Swimming, deep end", "Bring; towel", "2024-03-04 16:00", "2024-03-04 17:00",
+                                   linked_user_id=self.user.id, timezone='Europe/Oslo',
+                                   recurrence_rule="FREQ=WEEKLY;COUNT=8", recurrence_exdates=["2024-03-11 16:00"])
+        event_manager.create_event("Very long title " * 8, None, "2024-03-05 09:00", "2024-03-05 10:00",
+                                   linked_user_id=self.user.id)
+        event_manager.create_event("Old", None, "2023-01-05 09:00", "2023-01-05 10:00", linked_user_id=self.user.id)
+        shift_manager.add_shift(self.user.id, "2024-03-06 08:00", "2024-03-06 16:00", "Day")
+        db = SessionLocal()
+        child_manager.add_residency_period(db, self.child.id, self.user.id, "2024-03-01 17:00", "2024-03-08 17:00")
+        db.commit()
+        db.close()
+
+        text = ''.join(calendar_feed.stream_user_feed(self.user.id, NOW, now=NOW))
+        self.assertTrue(text.startswith("BEGIN:VCALENDAR\r\n") and text.endswith("END:VCALENDAR\r\n"))
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in text.split('\r\n')))
+        self.assertIn("DTSTART;TZID=Europe/Oslo:20240304T160000", text)
+        self.assertIn("EXDATE;TZID=Europe/Oslo:20240311T160000", text)
+        self.assertIn("SUMMARY:Kid (residency)", text)
+        self.assertNotIn("SUMMARY:Old", text) # Before the feed window
+        self.assertEqual(text.count("BEGIN:VEVENT"), 4)
+
+        summary = ics_import.import_ics(self.other.id, text.splitlines(keepends=True))
+        self.assertEqual(summary["imported"], 4)
+        db = SessionLocal()
+        swim = db.query(Event).filter(Event.user_id == self.other.id, Event.recurrence_rule.isnot(None)).one()
+        self.assertEqual((swim.title, swim.description), ("Swimming, deep end", "Bring; towel"))
+        self.assertEqual((swim.recurrence_timezone, swim.recurrence_exdates),
+                         ('Europe/Oslo', ["2024-03-11T15:00:00"]))
+        db.close()
+        # The import went through core inserts and still versioned the feed
+        self.assertEqual(self._state(feed_state.USER_FEED, self.other.id), 1)
+
+    def test_pattern_shifts_are_in_the_feed(self):
+        pattern = shift_pattern_manager.create_shift_pattern("Days", None, "Rotating", {
+            "cycle": [{"name": "Day", "days": 1, "start_time": "08:00", "end_time": "16:00"}],
+            "cycle_start_reference_date": "2024-03-01"})
+        etag = self._etag(feed_state.USER_FEED, self.user.id)
+        shift_pattern_manager.assign_shift_pattern(self.user.id, pattern.id, "2024-03-04", "2024-03-05")
+        self.assertNotEqual(self._etag(feed_state.USER_FEED, self.user.id), etag)
+
+        text = ''.join(calendar_feed.stream_user_feed(self.user.id, NOW, now=NOW))
+        self.assertEqual(text.count("BEGIN:VEVENT"), 2)
+        self.assertIn(f"UID:pattern-{pattern.id}-{self.user.id}-20240304@family-planner", text)
+        self.assertIn("DTSTART:20240305T080000Z", text)
+
+    def test_unknown_owner_renders_nothing(self):
+        self.assertEqual(list(calendar_feed.stream_child_feed(999, NOW, now=NOW)), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+import sys
+import os
+import random
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.interval_index import IntervalIndex
+from src import auth, child_manager, conflicts, event_manager, shift_manager, shift_pattern_manager
+
+class TestIntervalIndex(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(7)
+        intervals = []
+        for i in range(300):
+            start = rng.randrange(0, 1000)
+            intervals.append((start, start + rng.randrange(1, 80), i))
+        index = IntervalIndex(intervals)
+        self.assertEqual(len(index), 300)
+        for _ in range(200):
+            start = rng.randrange(-50, 1050)
+            end = start + rng.randrange(1, 100)
+            expected = sorted(i for s, e, i in intervals if s < end and e > start)
+            self.assertEqual(sorted(item for _, _, item in index.overlapping(start, end)), expected)
+
+    def test_half_open_and_empty(self):
+        index = IntervalIndex([(1, 3, 'a'), (3, 5, 'b')])
+        self.assertEqual([item for _, _, item in index.overlapping(3, 4)], ['b'])
+        self.assertEqual(IntervalIndex().overlapping(0, 10), [])
+
+class TestConflicts(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.user = auth.register("Conflict User", "conflict@example.com", "pass")
+        self.other = auth.register("Other Parent", "other@example.com", "pass")
+        self.child = child_manager.add_child(self.user.id, "Kid", "2018-05-01")
+        self.night = shift_manager.add_shift(self.user.id, "2024-03-04 22:00", "2024-03-05 06:00", "Night")
+
+    def tearDown(self):
+        drop_tables()
+
+    def _add_period(self, parent_id, start, end):
+        db = SessionLocal()
+        child_manager.add_residency_period(db, self.child.id, parent_id, start, end)
+        db.commit()
+        db.close()
+
+    def test_find_conflicts(self):
+        event_manager.create_event("School concert", None, "2024-03-04 21:00", "2024-03-04 23:00",
+                                   linked_child_id=self.child.id)
+        event_manager.create_event("Breakfast", None, "2024-03-05 06:00", "2024-03-05 07:00",
+                                   linked_user_id=self.user.id) # Touches the shift end only
+        self._add_period(self.user.id, "2024-03-01 17:00", "2024-03-08 17:00")
+        self._add_period(self.other.id, "2024-03-08 17:00", "2024-03-15 17:00")
+        shift_manager.add_shift(self.user.id, "2024-03-09 08:00", "2024-03-09 16:00", "Day")
+
+        pairs = conflicts.find_conflicts(self.user.id, datetime(2024, 3, 1), datetime(2024, 3, 16))
+        described = [(first[0], second[0], getattr(second[3], 'title', getattr(second[3], 'name', None)))
+                     for first, second in pairs]
+        # The concert is during the user's residency period, which is not a conflict in itself
+        self.assertEqual(sorted(described), sorted([
+            ('residency', 'shift', 'Night'),
+            ('event', 'shift', 'Night'),
+        ]))
+
+    def test_reject_conflicts_on_save(self):
+        self.assertIsNone(shift_manager.add_shift(self.user.id, "2024-03-05 05:00", "2024-03-05 09:00", "Early",
+                                                  reject_conflicts=True))
+        self.assertIsNone(event_manager.create_event("Call", None, "2024-03-05 01:00", "2024-03-05 02:00",
+                                                     linked_user_id=self.user.id, reject_conflicts=True))
+        # Moving a shift within its own time is not a conflict with itself
+        moved = shift_manager.update_shift(self.night.id, new_end_time_str="2024-03-05 05:00", reject_conflicts=True)
+        self.assertIsNotNone(moved)
+
+        day = shift_manager.add_shift(self.user.id, "2024-03-06 08:00", "2024-03-06 16:00", "Day",
+                                      reject_conflicts=True)
+        self.assertIsNotNone(day)
+        self.assertIsNone(shift_manager.update_shift(day.id, new_start_time_str="2024-03-05 04:00",
+                                                     reject_conflicts=True))
+        unchanged = [s for s in shift_manager.get_user_shifts(self.user.id) if s.id == day.id][0]
+        self.assertEqual(unchanged.start_time, datetime(2024, 3, 6, 8))
+
+    def test_pattern_shifts_conflict(self):
+        pattern = shift_pattern_manager.create_shift_pattern("Days", None, "Rotating", {
+            "cycle": [{"name": "Day", "days": 1, "start_time": "08:00", "end_time": "16:00"}],
+            "cycle_start_reference_date": "2024-03-01"})
+        shift_pattern_manager.assign_shift_pattern(self.user.id, pattern.id, "2024-03-10", "2024-03-12")
+        event_manager.create_event("Dentist", None, "2024-03-11 10:00", "2024-03-11 11:00",
+                                   linked_user_id=self.user.id)
+        pairs = conflicts.find_conflicts(self.user.id, datetime(2024, 3, 10), datetime(2024, 3, 13))
+        self.assertEqual([(first[0], second[0], first[3].virtual) for first, second in pairs],
+                         [('shift', 'event', True)])
+        self.assertIsNone(event_manager.create_event("Call", None, "2024-03-12 15:00", "2024-03-12 17:00",
+                                                     linked_user_id=self.user.id, reject_conflicts=True))
+
+if __name__ == '__main__':
+    unittest.main()
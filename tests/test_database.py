@@ -0,0 +1,128 @@
+import unittest
+import sys
+import os
+from datetime import timedelta
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from sqlalchemy import inspect
+from src import database, span_bounds, task_manager
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.task import Task
+from tests.file_database import use_file_database
+
+class TestDatabaseMigrations(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+
+    def tearDown(self):
+        drop_tables()
+
+    def test_run_migrations_applies_pending_versions_once(self):
+        applied = database.run_migrations()
+        self.assertEqual(applied, [version for version, _, _ in database.MIGRATIONS])
+        self.assertEqual(database.get_schema_version(), database.LATEST_SCHEMA_VERSION)
+
+        # A second run finds nothing left to do
+        self.assertEqual(database.run_migrations(), [])
+
+    def test_composite_indexes_exist(self):
+        database.run_migrations()
+        inspector = inspect(database.engine)
+        event_indexes = {ix['name']: ix['column_names'] for ix in inspector.get_indexes('events')}
+        self.assertEqual(event_indexes['ix_events_user_id_start_time'], ['user_id', 'start_time'])
+        residency_indexes = {ix['name']: ix['column_names'] for ix in inspector.get_indexes('residency_periods')}
+        self.assertEqual(residency_indexes['ix_residency_periods_child_id_start_end'],
+                         ['child_id', 'start_datetime', 'end_datetime'])
+
+    def test_span_bounds_are_backfilled_for_existing_rows(self):
+        with database.engine.begin() as conn:
+            # Written without the ORM, as before span bounds were kept
+            conn.exec_driver_sql("INSERT INTO users (id, name, email) VALUES (1, 'Old', 'old@example.com')")
+            conn.exec_driver_sql("INSERT INTO shifts (user_id, name, start_time, end_time) VALUES "
+                                 "(1, 'Day', '2020-01-01 08:00:00', '2020-01-01 16:00:00'), "
+                                 "(1, 'On call', '2020-01-02 08:00:00', '2020-01-04 08:00:00')")
+        database.run_migrations()
+        db = SessionLocal()
+        try:
+            lookback = span_bounds.lookback(db, span_bounds.SHIFTS, span_bounds.USER, 1)
+            self.assertGreaterEqual(lookback, timedelta(days=2))
+            self.assertLess(lookback, timedelta(days=2, minutes=1))
+            self.assertEqual(span_bounds.lookback(db, span_bounds.EVENTS, span_bounds.USER, 1), timedelta(0))
+        finally:
+            db.close()
+
+    def test_repeated_generation_runs_are_collapsed(self):
+        with database.engine.begin() as conn:
+            # Runs recorded before there was one per range
+            conn.exec_driver_sql("DROP INDEX ix_shift_generations_pattern_id_user_id_range")
+            conn.exec_driver_sql('INSERT INTO shift_generations (pattern_id, user_id, start_date, end_date, '
+                                 '"offset", timezone) VALUES (1, 1, \'2024-01-01\', \'2024-01-14\', 0, \'UTC\'), '
+                                 '(1, 1, \'2024-01-01\', \'2024-01-14\', 7, \'UTC\')')
+        database.run_migrations()
+        with database.engine.connect() as conn:
+            offsets = conn.exec_driver_sql('SELECT "offset" FROM shift_generations').scalars().all()
+        self.assertEqual(offsets, [7])
+        indexes = {ix['name']: ix for ix in inspect(database.engine).get_indexes('shift_generations')}
+        self.assertTrue(indexes['ix_shift_generations_pattern_id_user_id_range']['unique'])
+
+    def test_migrate_database_records_schema_stamp(self):
+        self.assertFalse(database.is_schema_current())
+        database.migrate_database()
+        self.assertEqual(database.read_schema_stamp(), database.get_expected_schema_stamp())
+        self.assertTrue(database.is_schema_current())
+
+    def test_stale_stamp_is_detected(self):
+        database.migrate_database()
+        with database.engine.begin() as conn:
+            conn.execute(database.schema_stamp_table.update().values(stamp="0:outdated"))
+        self.assertFalse(database.is_schema_current())
+
+class TestUnitOfWork(unittest.TestCase):
+
+    def setUp(self):
+        use_file_database(self)
+
+    def _descriptions(self):
+        db = SessionLocal()
+        try:
+            return sorted(description for description, in db.query(Task.description))
+        finally:
+            db.close()
+
+    def test_failed_write_rolls_back_only_its_own_changes(self):
+        with database.unit_of_work():
+            self.assertIsNotNone(task_manager.create_task("Pack bag"))
+            self.assertIsNone(task_manager.create_task(None)) # NOT NULL: the manager rolls back
+            self.assertIsNotNone(task_manager.create_task("Buy milk"))
+        self.assertEqual(self._descriptions(), ["Buy milk", "Pack bag"])
+
+    def test_error_in_unit_of_work_rolls_back_everything(self):
+        with self.assertRaises(RuntimeError):
+            with database.unit_of_work():
+                task_manager.create_task("Pack bag")
+                raise RuntimeError("request failed")
+        self.assertEqual(self._descriptions(), [])
+
+class TestReadEngineRouting(unittest.TestCase):
+
+    def test_read_url_for_sqlite_file_is_read_only_uri(self):
+        self.assertEqual(database.get_read_database_url("sqlite:///./family_planner.db"),
+                         "sqlite:///file:./family_planner.db?mode=ro&uri=true")
+
+    def test_in_memory_database_reads_from_primary(self):
+        initialize_database_for_application()
+        self.assertIsNone(database.get_read_database_url(database.TEST_DATABASE_URL))
+        self.assertIs(database.read_engine, database.engine)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,6 +45,25 @@ class TestEventManager(unittest.TestCase):
         self.db.close()
         drop_tables()
 
+    def test_get_events_for_user_in_window(self):
+        event_manager.create_event("Old", None, "2023-06-01 10:00", "2023-06-01 11:00", linked_user_id=self.test_user_id)
+        event_manager.create_event("Trip", None, "2024-02-25 08:00", "2024-03-05 20:00", linked_user_id=self.test_user_id)
+        event_manager.create_event("March", None, "2024-03-10 10:00", "2024-03-10 11:00", linked_user_id=self.test_user_id)
+        event_manager.create_event("April", None, "2024-04-01 10:00", "2024-04-01 11:00", linked_user_id=self.test_user_id)
+
+        window_events = event_manager.get_events_for_user(
+            self.test_user_id, start=datetime(2024, 3, 1), end=datetime(2024, 4, 1))
+        self.assertEqual([e.title for e in window_events], ["Trip", "March"])
+
+    def test_long_events_are_found_by_later_windows(self):
+        event_manager.create_event("Autumn term", None, "2024-08-19 08:00", "2024-12-20 15:00",
+                                   linked_child_id=self.test_child_id)
+        event_manager.create_event("Trip", None, "2024-09-02 08:00", "2024-09-06 15:00",
+                                   linked_child_id=self.test_child_id)
+        window_events = event_manager.get_events_for_child(
+            self.test_child_id, start=datetime(2024, 12, 1), end=datetime(2024, 12, 8))
+        self.assertEqual([e.title for e in window_events], ["Autumn term"])
+
     def test_create_event_linked_to_child(self):
         start_str = "2024-12-25 14:00"
         end_str = "2024-12-25 17:00"
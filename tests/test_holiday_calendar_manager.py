@@ -0,0 +1,129 @@
+import unittest
+import sys
+import os
+from datetime import date, datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.holiday_calendar import HolidayCalendar
+from src.shift import Shift
+from src.user import User
+from src import holiday_calendar_manager, roster, shift_manager, shift_pattern_manager
+
+RULES = [
+    {"name": "New Year's Day", "month": 1, "day": 1},
+    {"name": "Leap Day", "month": 2, "day": 29},
+    {"name": "Thanksgiving", "month": 11, "weekday": "thursday", "nth": 4},
+    {"name": "Memorial Day", "month": 5, "weekday": "monday", "nth": -1},
+    {"name": "Good Friday", "date": "2024-03-29"},
+]
+
+EVERY_DAY = {
+    "cycle": [{"name": "Day", "days": 1, "start_time": "09:00", "end_time": "17:00"}],
+    "cycle_start_reference_date": "2024-01-01"
+}
+
+class TestHolidayCalendarManager(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        db = SessionLocal()
+        users = [User(name=f"Worker {i}", email=f"worker{i}@example.com") for i in range(2)]
+        db.add_all(users)
+        db.commit()
+        self.user_ids = [u.id for u in users]
+        db.close()
+
+    def tearDown(self):
+        drop_tables()
+
+    def _dates(self, holiday_calendar, year):
+        return sorted(holiday_calendar_manager.calendar_dates(holiday_calendar, date(year, 1, 1), date(year, 12, 31)))
+
+    def test_rules_expand_per_year(self):
+        holiday_calendar = HolidayCalendar(name="Test", rules=RULES)
+        self.assertEqual(self._dates(holiday_calendar, 2024),
+                         [date(2024, 1, 1), date(2024, 2, 29), date(2024, 3, 29), date(2024, 5, 27), date(2024, 11, 28)])
+        self.assertEqual(self._dates(holiday_calendar, 2025),
+                         [date(2025, 1, 1), date(2025, 5, 26), date(2025, 11, 27)])
+        # Limited to the calendar's own years
+        holiday_calendar.start_year = 2025
+        self.assertEqual(self._dates(holiday_calendar, 2024), [])
+
+    def test_year_sets_are_shared(self):
+        first = HolidayCalendar(name="A", rules=RULES)
+        second = HolidayCalendar(name="B", rules=list(RULES))
+        holiday_calendar_manager._year_dates.cache_clear()
+        self.assertEqual(self._dates(first, 2030), self._dates(second, 2030))
+        info = holiday_calendar_manager._year_dates.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 1))
+
+    def test_invalid_rules_are_rejected(self):
+        for rules in ({"month": 1}, [{"month": 13, "day": 1}], [{"month": 2, "day": 30}],
+                      [{"month": 1, "weekday": "funday"}], [{"month": 1, "weekday": "monday", "nth": 0}],
+                      [{"date": "2024-02-30"}], ["New Year"]):
+            self.assertIsNone(holiday_calendar_manager.create_holiday_calendar("Bad", rules))
+        self.assertIsNotNone(holiday_calendar_manager.create_holiday_calendar("Good", RULES, region="US"))
+        self.assertEqual([c.name for c in holiday_calendar_manager.get_holiday_calendars(region="US")], ["Good"])
+
+    def test_pattern_and_user_calendars_apply_to_generation(self):
+        employer = holiday_calendar_manager.create_holiday_calendar("Employer", [{"month": 1, "day": 2}])
+        region = holiday_calendar_manager.create_holiday_calendar("Region", [{"month": 1, "day": 4}])
+        pattern = shift_pattern_manager.create_shift_pattern("Daily", None, "Rotating", EVERY_DAY,
+                                                             holiday_calendar_id=employer.id)
+        holiday_calendar_manager.set_user_holiday_calendar(self.user_ids[0], region.id)
+
+        db = SessionLocal()
+        shifts = shift_pattern_manager.generate_shifts_from_pattern(db, pattern.id, self.user_ids[0], "2024-01-01",
+                                                                    "2024-01-05", holidays=["2024-01-05"])
+        self.assertEqual([s.pattern_date.day for s in shifts], [1, 3])
+        db.rollback()
+        db.close()
+
+        summary = roster.generate_roster(pattern.id, [(uid, 0) for uid in self.user_ids], "2024-01-01", "2024-01-05")
+        self.assertEqual(summary["created"], 3 + 4)
+        db = SessionLocal()
+        days = {uid: sorted(d.day for d, in db.query(Shift.pattern_date).filter(Shift.user_id == uid))
+                for uid in self.user_ids}
+        db.close()
+        self.assertEqual(days, {self.user_ids[0]: [1, 3, 5], self.user_ids[1]: [1, 3, 4, 5]})
+
+    def test_calendars_apply_to_virtual_shifts(self):
+        region = holiday_calendar_manager.create_holiday_calendar("Region", [{"month": 1, "day": 2}])
+        pattern = shift_pattern_manager.create_shift_pattern("Daily", None, "Rotating", EVERY_DAY)
+        shift_pattern_manager.assign_shift_pattern(self.user_ids[0], pattern.id, "2024-01-01")
+        window = (datetime(2024, 1, 1), datetime(2024, 1, 4))
+        self.assertEqual(len(shift_manager.get_user_shifts(self.user_ids[0], *window)), 3)
+
+        holiday_calendar_manager.set_user_holiday_calendar(self.user_ids[0], region.id)
+        shifts = shift_manager.get_user_shifts(self.user_ids[0], *window)
+        self.assertEqual([s.pattern_date.day for s in shifts], [1, 3])
+
+        holiday_calendar_manager.update_holiday_calendar(region.id, rules=[{"month": 1, "day": 3}])
+        shifts = shift_manager.get_user_shifts(self.user_ids[0], *window)
+        self.assertEqual([s.pattern_date.day for s in shifts], [1, 2])
+
+    def test_deleting_a_calendar_clears_references(self):
+        region = holiday_calendar_manager.create_holiday_calendar("Region", RULES)
+        pattern = shift_pattern_manager.create_shift_pattern("Daily", None, "Rotating", EVERY_DAY,
+                                                             holiday_calendar_id=region.id)
+        holiday_calendar_manager.set_user_holiday_calendar(self.user_ids[0], region.id)
+        self.assertTrue(holiday_calendar_manager.delete_holiday_calendar(region.id))
+        self.assertIsNone(holiday_calendar_manager.get_holiday_calendar(region.id))
+        self.assertIsNone(shift_pattern_manager.get_shift_pattern(pattern.id).holiday_calendar_id)
+        db = SessionLocal()
+        self.assertIsNone(db.get(User, self.user_ids[0]).holiday_calendar_id)
+        db.close()
+        self.assertIsNone(holiday_calendar_manager.set_user_holiday_calendar(self.user_ids[0], region.id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import unittest
+import sys
+import os
+import io
+import json
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.event import Event
+from src.user import User
+from src import database, event_manager, ics_import, notification
+from tests.file_database import use_file_database
+
+CALENDAR = """BEGIN:VCALENDAR\r
+VERSION:2.0\r
+BEGIN:VEVENT\r
+UID:first-day@school.example\r
+DTSTART;TZID=Europe/Oslo:20240902T081500\r
+DTEND;TZID=Europe/Oslo:20240902T090000\r
+SUMMARY:First day\\, bring\r
+  a pencil case\r
+DESCRIPTION:Line one\\nLine two\r
+BEGIN:VALARM\r
+TRIGGER:-PT15M\r
+DESCRIPTION:Reminder\r
+END:VALARM\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:swim@club.example\r
+DTSTART:20240904T150000Z\r
+DURATION:PT1H30M\r
+RRULE:FREQ=WEEKLY;COUNT=10\r
+EXDATE:20240911T150000Z\r
+SUMMARY:Swimming\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:holiday@school.example\r
+DTSTART;VALUE=DATE:20241014\r
+SUMMARY:Autumn break\r
+RRULE:FREQ=WEEKLY;BYDAY=MO,TU\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:swim@club.example\r
+RECURRENCE-ID:20240918T150000Z\r
+DTSTART:20240918T160000Z\r
+SUMMARY:Swimming (moved)\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:broken@school.example\r
+DTSTART:not-a-date\r
+SUMMARY:Broken\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+class TestIcsImport(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.db = SessionLocal()
+        user = User(name="Importer", email="importer@example.com", prefers_sse=True)
+        self.db.add(user)
+        self.db.commit()
+        self.user_id = user.id
+        notification._user_queues.pop(self.user_id, None)
+
+    def tearDown(self):
+        self.db.close()
+        drop_tables()
+        notification._user_queues.pop(self.user_id, None)
+
+    def _events(self):
+        return {e.ical_uid: e for e in self.db.query(Event).filter(Event.user_id == self.user_id)}
+
+    def test_import_parses_and_batches(self):
+        summary = ics_import.import_ics(self.user_id, io.StringIO(CALENDAR), 'Europe/Oslo', batch_size=2)
+        self.assertEqual(summary, {"imported": 3, "duplicates": 0, "skipped": 2})
+
+        events = self._events()
+        first_day = events["first-day@school.example"]
+        self.assertEqual(first_day.title, "First day, bring a pencil case")
+        self.assertEqual(first_day.description, "Line one\nLine two")
+        self.assertEqual((first_day.start_time, first_day.end_time),
+                         (datetime(2024, 9, 2, 6, 15), datetime(2024, 9, 2, 7, 0)))
+
+        swim = events["swim@club.example"]
+        self.assertEqual(swim.end_time, datetime(2024, 9, 4, 16, 30))
+        self.assertEqual(swim.recurrence_rule, "FREQ=WEEKLY;COUNT=10")
+        self.assertEqual(swim.recurrence_exdates, ["2024-09-11T15:00:00"])
+        self.assertEqual(swim.series_end, datetime(2024, 11, 6, 16, 30))
+
+        # BYDAY is outside the supported subset: only the first (all-day) occurrence is kept
+        holiday = events["holiday@school.example"]
+        self.assertIsNone(holiday.recurrence_rule)
+        self.assertEqual(holiday.end_time - holiday.start_time, datetime(2024, 1, 2) - datetime(2024, 1, 1))
+
+        # One summary notification for the whole import
+        queue = notification.get_user_queue(self.user_id)
+        self.assertEqual(json.loads(queue.get_nowait())["type"], "events_imported")
+        self.assertTrue(queue.empty())
+
+    def test_reimport_skips_known_uids(self):
+        ics_import.import_ics(self.user_id, io.StringIO(CALENDAR))
+        summary = ics_import.import_ics(self.user_id, io.StringIO(CALENDAR))
+        self.assertEqual(summary, {"imported": 0, "duplicates": 3, "skipped": 2})
+        self.assertEqual(len(self._events()), 3)
+
+    def test_long_events_are_imported_and_found_in_windows(self):
+        calendar = CALENDAR.replace("END:VCALENDAR", """BEGIN:VEVENT\r
+UID:term@school.example\r
+DTSTART;VALUE=DATE:20240819\r
+DTEND;VALUE=DATE:20241220\r
+SUMMARY:Autumn term\r
+END:VEVENT\r
+END:VCALENDAR""")
+        summary = ics_import.import_ics(self.user_id, io.StringIO(calendar))
+        self.assertEqual(summary, {"imported": 4, "duplicates": 0, "skipped": 2})
+        # The term began months before the window; the stored span bound still reaches it
+        events = event_manager.get_events_for_user(self.user_id, start=datetime(2024, 12, 1), end=datetime(2024, 12, 2))
+        self.assertEqual([e.ical_uid for e in events], ["term@school.example"])
+
+class TestIcsImportTransactions(unittest.TestCase):
+
+    def setUp(self):
+        use_file_database(self)
+        db = SessionLocal()
+        user = User(name="Importer", email="importer@example.com")
+        db.add(user)
+        db.commit()
+        self.user_id = user.id
+        db.close()
+        self.addCleanup(notification._user_queues.pop, self.user_id, None)
+
+    def test_batches_are_committed_outside_the_unit_of_work(self):
+        with self.assertRaises(RuntimeError):
+            with database.unit_of_work():
+                summary = ics_import.import_ics(self.user_id, io.StringIO(CALENDAR), batch_size=2)
+                self.assertEqual(summary["imported"], 3)
+                raise RuntimeError("request failed after the import")
+        # The request's rollback does not undo the committed batches
+        db = SessionLocal()
+        try:
+            self.assertEqual(db.query(Event).filter(Event.user_id == self.user_id).count(), 3)
+        finally:
+            db.close()
+
+if __name__ == '__main__':
+    unittest.main()
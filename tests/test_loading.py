@@ -0,0 +1,99 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from sqlalchemy import event as sa_event
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.user import User
+from src import (database, auth, child_manager, event_manager, expense_manager, loading, shift_manager,
+                 task_manager)
+
+class TestLoadingPlans(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.user = auth.register("Loading User", "loading@example.com", "pass")
+
+    def tearDown(self):
+        drop_tables()
+
+    def _add_rows(self, count):
+        """`count` events, tasks and expenses, each linked to its own child."""
+        for i in range(count):
+            child = child_manager.add_child(self.user.id, f"Kid {i}", "2018-05-01")
+            event = event_manager.create_event(f"Event {i}", None, f"2024-03-{i + 1:02d} 09:00",
+                                               f"2024-03-{i + 1:02d} 10:00", linked_user_id=self.user.id,
+                                               linked_child_id=child.id)
+            task_manager.create_task(f"Task {i}", user_id=self.user.id, event_id=event.id)
+            expense_manager.add_expense(f"Expense {i}", 10.0, self.user.id, child_id=child.id)
+
+    def _count_queries(self, fn):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        sa_event.listen(database.engine, "before_cursor_execute", listener)
+        try:
+            fn()
+        finally:
+            sa_event.remove(database.engine, "before_cursor_execute", listener)
+        return len(statements)
+
+    def _list_and_serialize(self):
+        events = event_manager.get_events_for_user(self.user.id, load=loading.EVENT_LINKS_FOR_USER)
+        [e.to_dict(include_user=False) for e in events]
+        tasks = task_manager.get_tasks_for_user(self.user.id, load=loading.TASK_LINKS)
+        [t.to_dict() for t in tasks]
+        expenses = expense_manager.get_all_expenses(load=loading.EXPENSE_LINKS)
+        [e.to_dict() for e in expenses]
+        children = child_manager.get_user_children(self.user.id, load=loading.CHILD_PARENTS)
+        [c.to_dict(include_parents=True) for c in children]
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._add_rows(2)
+        few = self._count_queries(self._list_and_serialize)
+        self._add_rows(6)
+        self.assertEqual(self._count_queries(self._list_and_serialize), few)
+
+    def test_planned_relationships_survive_the_session(self):
+        self._add_rows(1)
+        # Outside a request each manager closes its own session before returning
+        unplanned = event_manager.get_events_for_user(self.user.id)[0]
+        with self.assertRaises(DetachedInstanceError):
+            unplanned.child
+        planned = event_manager.get_events_for_user(self.user.id, load=loading.EVENT_CHILD)[0]
+        self.assertEqual(planned.child.name, "Kid 0")
+
+    def test_plans_apply_to_windowed_and_paged_queries(self):
+        self._add_rows(3)
+        page = event_manager.get_events_for_user(self.user.id, limit=2, start=datetime(2024, 3, 1),
+                                                 end=datetime(2024, 4, 1), load=loading.EVENT_LINKS)
+        self.assertEqual([e.child.name for e in page], ["Kid 0", "Kid 1"])
+        self.assertIsNotNone(page.next_cursor)
+        shift = shift_manager.add_shift(self.user.id, "2024-03-06 08:00", "2024-03-06 16:00", "Day")
+        shifts = shift_manager.get_user_shifts(self.user.id, load=loading.SHIFT_LINKS)
+        self.assertEqual(shifts[0].to_dict()["owner"]["id"], self.user.id)
+        self.assertEqual(shifts[0].id, shift.id)
+
+    def test_custodial_periods_can_be_eager_loaded(self):
+        child = child_manager.add_child(self.user.id, "Kid", "2018-05-01")
+        db = SessionLocal()
+        child_manager.add_residency_period(db, child.id, self.user.id, "2024-03-01 17:00", "2024-03-08 17:00")
+        db.commit()
+        user = db.query(User).options(*loading.USER_CUSTODIAL_PERIODS).filter(User.id == self.user.id).one()
+        db.close()
+        self.assertEqual(len(user.to_dict(include_custodial_periods=True)["custodial_periods"]), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import sys
+import os
+import json
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from sqlalchemy import event as sa_event
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.user import User
+from src import database, child_manager, event_manager, notification
+
+class TestNotificationFanOut(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        db = SessionLocal()
+        users = [User(name="Parent A", email="a@example.com", prefers_sse=True),
+                 User(name="Parent B", email="b@example.com", prefers_sse=True),
+                 User(name="Parent C", email="c@example.com", prefers_sse=False)]
+        db.add_all(users)
+        db.commit()
+        self.user_ids = [u.id for u in users]
+        db.close()
+        child = child_manager.add_child(self.user_ids[0], "Kid", "2018-05-01")
+        child_manager.add_parent_to_child(child.id, self.user_ids[1])
+        child_manager.add_parent_to_child(child.id, self.user_ids[2])
+        self.child_id = child.id
+        self._clear_queues()
+
+    def tearDown(self):
+        self._clear_queues()
+        drop_tables()
+
+    def _clear_queues(self):
+        for user_id in getattr(self, 'user_ids', []):
+            notification._user_queues.pop(user_id, None)
+
+    def test_child_event_reaches_parents_with_sse(self):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        sa_event.listen(database.engine, "before_cursor_execute", listener)
+        try:
+            event_manager.create_event("School trip", None, "2024-05-01 08:00", "2024-05-01 16:00",
+                                       linked_child_id=self.child_id)
+        finally:
+            sa_event.remove(database.engine, "before_cursor_execute", listener)
+
+        payload_a = notification.get_user_queue(self.user_ids[0]).get_nowait()
+        payload_b = notification.get_user_queue(self.user_ids[1]).get_nowait()
+        self.assertIs(payload_a, payload_b) # Serialized once
+        self.assertEqual(json.loads(payload_a)["type"], "event_created")
+        self.assertTrue(notification.get_user_queue(self.user_ids[2]).empty())
+        # One query resolves the recipients; neither the Child nor each User is loaded
+        self.assertEqual(sum("prefers_sse" in s for s in statements), 1)
+        self.assertFalse(any("FROM children" in s for s in statements))
+
+    def test_send_notifications_skips_unknown_and_disabled_users(self):
+        notification.send_notifications([self.user_ids[1], self.user_ids[2], 999], {"type": "ping"})
+        self.assertEqual(json.loads(notification.get_user_queue(self.user_ids[1]).get_nowait()), {"type": "ping"})
+        self.assertTrue(notification.get_user_queue(self.user_ids[2]).empty())
+        notification._user_queues.pop(999, None)
+
+if __name__ == '__main__':
+    unittest.main()
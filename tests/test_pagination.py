@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.event import Event
+from src.expense import Expense
+from src.user import User
+from src import event_manager, expense_manager, pagination
+
+class TestKeysetPagination(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.db = SessionLocal()
+        self.db.add(User(name="Pager", email="pager@example.com"))
+        self.db.flush()
+        # Two events share a start time so the id tie-breaker matters
+        starts = [datetime(2024, 1, day, 9) for day in (5, 1, 3, 3, 2)]
+        self.db.add_all([Event(title=f"E{i}", start_time=s, end_time=s, user_id=1) for i, s in enumerate(starts)])
+        self.db.add(Event(title="Unscheduled", start_time=None, end_time=None, user_id=1))
+        self.db.add_all([Expense(description=f"X{i}", amount=1.0, paid_by_id=1,
+                                 expense_date=datetime(2024, 2, i + 1)) for i in range(5)])
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        drop_tables()
+
+    def _all_pages(self, fetch, limit):
+        seen, cursor, pages = [], None, 0
+        while True:
+            page = fetch(limit, cursor)
+            pages += 1
+            seen.extend(page)
+            if not page.next_cursor:
+                return seen, pages
+            cursor = page.next_cursor
+
+    def test_pages_cover_every_event_once_in_order(self):
+        unpaged = event_manager.get_events_for_user(1)
+        paged, pages = self._all_pages(lambda limit, cursor: event_manager.get_events_for_user(1, limit, cursor), 2)
+        self.assertEqual([e.id for e in paged], [e.id for e in unpaged])
+        self.assertEqual(pages, 3)
+        self.assertIsNone(unpaged[0].start_time) # NULL start times sort first
+        starts = [e.start_time for e in paged[1:]]
+        self.assertEqual(starts, sorted(starts))
+
+    def test_expenses_page_newest_first(self):
+        paged, _ = self._all_pages(expense_manager.get_all_expenses, 2)
+        self.assertEqual([e.description for e in paged], ["X4", "X3", "X2", "X1", "X0"])
+
+    def test_exact_final_page_has_no_cursor(self):
+        page = expense_manager.get_all_expenses(limit=5)
+        self.assertEqual(len(page), 5)
+        self.assertIsNone(page.next_cursor)
+
+    def test_invalid_cursor_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            event_manager.get_events_for_user(1, limit=2, cursor="not-a-cursor")
+
+    def test_clamp_limit(self):
+        self.assertEqual(pagination.clamp_limit(None), pagination.DEFAULT_PAGE_SIZE)
+        self.assertEqual(pagination.clamp_limit(10 ** 6), pagination.MAX_PAGE_SIZE)
+
+if __name__ == '__main__':
+    unittest.main()
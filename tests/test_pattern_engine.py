@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+from datetime import date, datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.shift_pattern import ShiftPattern
+from src import pattern_engine
+
+ROTATING = ShiftPattern(pattern_type='Rotating', definition={
+    "cycle": [
+        {"name": "Day", "days": 2, "start_time": "08:00", "end_time": "16:00"},
+        {"name": "Night", "days": 2, "start_time": "20:00", "end_time": "04:00"},
+        {"name": "Off", "days": 3}
+    ],
+    "cycle_start_reference_date": "2024-01-01"
+})
+
+FIXED = ShiftPattern(pattern_type='Fixed', definition={
+    "monday": {"name": "Office", "start_time": "09:00", "end_time": "17:00"},
+    "tuesday": "Off",
+    "friday": {"name": "Late", "start_time": "22:00", "end_time": "06:00"},
+})
+
+class TestPatternEngine(unittest.TestCase):
+
+    def test_rotating_lookup_table(self):
+        compiled = pattern_engine.compile_pattern(ROTATING)
+        self.assertEqual(compiled.cycle_days, 7)
+        self.assertEqual([s.name if s else None for s in compiled.table],
+                         ["Day", "Day", "Night", "Night", None, None, None])
+        # Days before the reference date continue the cycle backwards
+        self.assertEqual(compiled.segment_on(date(2023, 12, 31)), None)
+        self.assertEqual(compiled.segment_on(date(2023, 12, 28)).name, "Night")
+        # An offset starts the cycle that many days later
+        self.assertEqual(compiled.segment_on(date(2024, 1, 3), offset=2).name, "Day")
+
+    def test_working_days_match_a_day_by_day_walk(self):
+        compiled = pattern_engine.compile_pattern(ROTATING)
+        for start, end, offset in ((date(2023, 12, 30), date(2024, 2, 2), 0),
+                                   (date(2024, 1, 5), date(2024, 1, 5), 0),
+                                   (date(2024, 1, 1), date(2024, 3, 1), 3)):
+            expected = [(start.fromordinal(n), compiled.segment_on(start.fromordinal(n), offset))
+                        for n in range(start.toordinal(), end.toordinal() + 1)]
+            expected = [(day, segment) for day, segment in expected if segment is not None]
+            self.assertEqual(list(compiled.iter_working_days(start, end, offset)), expected)
+
+    def test_shift_times_are_utc_and_follow_dst(self):
+        compiled = pattern_engine.compile_pattern(FIXED)
+        shifts = list(compiled.iter_shifts(date(2024, 3, 25), date(2024, 4, 5), 'Europe/Oslo'))
+        self.assertEqual([(s.day, s.name) for s in shifts],
+                         [(date(2024, 3, 25), "Office"), (date(2024, 3, 29), "Late"),
+                          (date(2024, 4, 1), "Office"), (date(2024, 4, 5), "Late")])
+        self.assertEqual((shifts[0].start_time, shifts[0].end_time),
+                         (datetime(2024, 3, 25, 8), datetime(2024, 3, 25, 16)))
+        # After the switch to summer time (31 March) Oslo is UTC+2
+        self.assertEqual((shifts[2].start_time, shifts[2].end_time),
+                         (datetime(2024, 4, 1, 7), datetime(2024, 4, 1, 15)))
+        # Overnight shifts end the next day
+        self.assertEqual(shifts[1].end_time, datetime(2024, 3, 30, 5))
+
+    def test_holidays_and_exceptions(self):
+        compiled = pattern_engine.compile_pattern(ROTATING)
+        shifts = list(compiled.iter_shifts(date(2024, 1, 1), date(2024, 1, 7), holidays={date(2024, 1, 1)},
+                                           exceptions={"2024-01-03": "off",
+                                                       "2024-01-04": {"name": "Short", "end_time": "23:00"}}))
+        self.assertEqual([(s.day.day, s.name) for s in shifts], [(2, "Day"), (4, "Short")])
+        self.assertEqual(shifts[1].end_time, datetime(2024, 1, 4, 23))
+
+    def test_compiled_patterns_are_shared_and_validated(self):
+        same = ShiftPattern(pattern_type='Rotating', definition=dict(reversed(list(ROTATING.definition.items()))))
+        self.assertIs(pattern_engine.compile_pattern(same), pattern_engine.compile_pattern(ROTATING))
+        for pattern_type, definition in (('Rotating', {"cycle": []}),
+                                         ('Rotating', {"cycle": [], "cycle_start_reference_date": "2024-01-01"}),
+                                         ('Fixed', {}),
+                                         ('OnDemand', {"monday": "Off"})):
+            with self.assertRaises(ValueError):
+                pattern_engine.compile_pattern(ShiftPattern(pattern_type=pattern_type, definition=definition))
+
+if __name__ == '__main__':
+    unittest.main()
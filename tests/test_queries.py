@@ -0,0 +1,55 @@
+import unittest
+import sys
+import os
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src import queries
+from src.event import Event
+from src.user import User
+
+class TestCachedQueries(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.db = SessionLocal()
+        self.db.add_all([
+            User(name="Oslo", email="oslo@example.com", timezone="Europe/Oslo"),
+            User(name="No TZ", email="notz@example.com", timezone=None, prefers_sse=False),
+        ])
+        self.db.flush()
+        self.db.add(Event(title="Linked", user_id=1))
+        self.db.commit()
+
+    def tearDown(self):
+        self.db.close()
+        drop_tables()
+
+    def test_cached_statement_binds_new_ids(self):
+        # The same cached statement must pick up each call's id
+        self.assertEqual(queries.get_user(self.db, 1).name, "Oslo")
+        self.assertEqual(queries.get_user(self.db, 2).name, "No TZ")
+        self.assertIsNone(queries.get_user(self.db, 99))
+
+    def test_timezone_lookups_fall_back_to_default(self):
+        self.assertEqual(queries.get_user_timezone(self.db, 1), "Europe/Oslo")
+        self.assertEqual(queries.get_user_timezone(self.db, 2), "UTC")
+        self.assertEqual(queries.get_user_timezone(self.db, 99, default="Europe/Paris"), "Europe/Paris")
+        self.assertEqual(queries.get_event_owner_timezone(self.db, 1), "Europe/Oslo")
+
+    def test_prefers_sse(self):
+        self.assertTrue(queries.get_user_prefers_sse(self.db, 1))
+        self.assertFalse(queries.get_user_prefers_sse(self.db, 2))
+        self.assertIsNone(queries.get_user_prefers_sse(self.db, 99))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables
+from src import recurrence, event_manager, auth
+
+class TestRecurrenceRules(unittest.TestCase):
+
+    def test_invalid_rules_raise_value_error(self):
+        for rule in ("FREQ=YEARLY", "FREQ=DAILY;INTERVAL=0", "FREQ=DAILY;COUNT=2;UNTIL=20240101",
+                     "FREQ=WEEKLY;BYDAY=MO", "FREQ=DAILY;UNTIL=tomorrow"):
+            with self.assertRaises(ValueError, msg=rule):
+                recurrence.parse_rule(rule)
+
+    def test_weekly_count_with_exdate(self):
+        occurrences = list(recurrence.iter_occurrences(
+            datetime(2024, 1, 1, 17), datetime(2024, 1, 1, 18), "FREQ=WEEKLY;COUNT=4",
+            exdates=["2024-01-15T17:00:00"]))
+        # The excluded occurrence still counts towards COUNT
+        self.assertEqual([start.day for start, _ in occurrences], [1, 8, 22])
+
+    def test_monthly_skips_missing_days(self):
+        starts = [start for start, _ in recurrence.iter_occurrences(
+            datetime(2024, 1, 31, 9), datetime(2024, 1, 31, 10), "FREQ=MONTHLY;COUNT=3")]
+        self.assertEqual([(s.month, s.day) for s in starts], [(1, 31), (3, 31), (5, 31)])
+
+    def test_local_time_is_kept_across_dst(self):
+        # 17:00 in Amsterdam is 16:00 UTC in winter and 15:00 UTC in summer
+        starts = [start for start, _ in recurrence.iter_occurrences(
+            datetime(2024, 3, 25, 16), datetime(2024, 3, 25, 17), "FREQ=WEEKLY;COUNT=2",
+            timezone="Europe/Amsterdam")]
+        self.assertEqual(starts, [datetime(2024, 3, 25, 16), datetime(2024, 4, 1, 15)])
+
+    def test_window_matches_full_expansion(self):
+        args = (datetime(2020, 1, 1, 8), datetime(2020, 1, 1, 9), "FREQ=DAILY;INTERVAL=3")
+        window_start, window_end = datetime(2024, 6, 1), datetime(2024, 7, 1)
+        windowed = list(recurrence.iter_occurrences(*args, window_start=window_start, window_end=window_end))
+        full = [o for o in recurrence.iter_occurrences(*args, window_end=window_end) if o[1] > window_start]
+        self.assertEqual(windowed, full)
+        self.assertEqual(len(windowed), 10)
+
+    def test_series_end(self):
+        self.assertEqual(recurrence.series_end(datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 10),
+                                               "FREQ=DAILY;COUNT=3"), datetime(2024, 1, 3, 10))
+        self.assertEqual(recurrence.series_end(datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 10),
+                                               "FREQ=WEEKLY;UNTIL=20240115"), datetime(2024, 1, 15, 10))
+        self.assertIsNone(recurrence.series_end(datetime(2024, 1, 1, 9), datetime(2024, 1, 1, 10), "FREQ=DAILY"))
+
+class TestRecurringEvents(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.test_user = auth.register("Recurring User", "recurring@example.com", "pass")
+
+    def tearDown(self):
+        drop_tables()
+
+    def test_window_query_expands_series(self):
+        series = event_manager.create_event("Swim class", None, "2024-01-03 16:00", "2024-01-03 17:00",
+                                            linked_user_id=self.test_user.id, recurrence_rule="FREQ=WEEKLY",
+                                            recurrence_exdates=["2024-02-14 16:00"])
+        event_manager.create_event("Dentist", None, "2024-02-08 10:00", "2024-02-08 11:00",
+                                   linked_user_id=self.test_user.id)
+        self.assertIsNone(series.series_end) # Open-ended
+
+        window = event_manager.get_events_for_user(self.test_user.id, start=datetime(2024, 2, 1),
+                                                   end=datetime(2024, 3, 1))
+        self.assertEqual([(e.title, e.start_time.day) for e in window],
+                         [("Swim class", 7), ("Dentist", 8), ("Swim class", 21), ("Swim class", 28)])
+        self.assertEqual(window[0].to_dict(include_user=False, include_child=False,
+                                                   include_institution=False)["recurrence_id"], "2024-02-07T16:00:00")
+
+        # Without a window the series is one row
+        self.assertEqual(len(event_manager.get_events_for_user(self.test_user.id)), 2)
+
+    def test_window_pages_follow_occurrence_time_order(self):
+        event_manager.create_event("Walk", None, "2024-01-01 07:00", "2024-01-01 07:30",
+                                   linked_user_id=self.test_user.id, recurrence_rule="FREQ=DAILY")
+        event_manager.create_event("Dentist", None, "2024-02-02 10:00", "2024-02-02 11:00",
+                                   linked_user_id=self.test_user.id)
+        event_manager.create_event("Swim", None, "2024-02-03 07:00", "2024-02-03 08:00",
+                                   linked_user_id=self.test_user.id)
+        window = dict(start=datetime(2024, 2, 1), end=datetime(2024, 2, 6))
+        unpaged = event_manager.get_events_for_user(self.test_user.id, **window)
+        pages, cursor = [], None
+        while True:
+            page = event_manager.get_events_for_user(self.test_user.id, limit=2, cursor=cursor, **window)
+            pages.append([(e.title, e.start_time) for e in page])
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        # A daily series does not blow up a page, and pages continue in time order
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        paged = [item for page in pages for item in page]
+        self.assertEqual(paged, [(e.title, e.start_time) for e in unpaged])
+        self.assertEqual(paged, sorted(paged, key=lambda item: item[1]))
+        self.assertEqual([title for title, _ in paged],
+                         ["Walk", "Walk", "Dentist", "Walk", "Swim", "Walk", "Walk"])
+
+    def test_ended_series_is_not_returned(self):
+        event_manager.create_event("Course", None, "2024-01-01 09:00", "2024-01-01 10:00",
+                                   linked_user_id=self.test_user.id, recurrence_rule="FREQ=DAILY;COUNT=5")
+        window = event_manager.get_events_for_user(self.test_user.id, start=datetime(2024, 2, 1),
+                                                   end=datetime(2024, 3, 1))
+        self.assertEqual(len(window), 0)
+
+    def test_invalid_rule_is_rejected(self):
+        self.assertIsNone(event_manager.create_event("Bad", None, "2024-01-01 09:00", "2024-01-01 10:00",
+                                                     linked_user_id=self.test_user.id,
+                                                     recurrence_rule="FREQ=HOURLY"))
+
+    def test_update_stops_recurrence(self):
+        series = event_manager.create_event("Practice", None, "2024-01-01 18:00", "2024-01-01 19:00",
+                                            linked_user_id=self.test_user.id, recurrence_rule="FREQ=DAILY;COUNT=10")
+        updated = event_manager.update_event(series.id, recurrence_rule='')
+        self.assertIsNone(updated.recurrence_rule)
+        self.assertIsNone(updated.series_end)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest
+import sys
+import os
+from datetime import date, datetime, timedelta
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.shift import Shift
+from src.user import User
+from tests.file_database import use_file_database
+from src import database, feed_state, pattern_engine, roster, shift_pattern_manager
+
+TEAM_ROTATION = {
+    "cycle": [
+        {"name": "Day", "days": 2, "start_time": "07:00", "end_time": "19:00"},
+        {"name": "Night", "days": 2, "start_time": "19:00", "end_time": "07:00"},
+        {"name": "Off", "days": 4}
+    ],
+    "cycle_start_reference_date": "2024-01-01"
+}
+
+class TestRoster(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        db = SessionLocal()
+        users = [User(name=f"Staff {i}", email=f"staff{i}@example.com") for i in range(20)]
+        db.add_all(users)
+        db.commit()
+        self.user_ids = [u.id for u in users]
+        db.close()
+        # A global pattern, as an employer would publish it
+        self.pattern = shift_pattern_manager.create_shift_pattern(
+            "Team rotation", "2 days, 2 nights, 4 off", "Rotating", TEAM_ROTATION)
+
+    def tearDown(self):
+        drop_tables()
+
+    def _shifts(self, user_id):
+        db = SessionLocal()
+        try:
+            return db.query(Shift).filter(Shift.user_id == user_id).order_by(Shift.start_time).all()
+        finally:
+            db.close()
+
+    def test_parse_assignments(self):
+        self.assertEqual(roster.parse_assignments(["1:2", "3", {"user_id": 4, "offset": 6}]),
+                         [(1, 2), (3, 0), (4, 6)])
+        with self.assertRaises(ValueError):
+            roster.parse_assignments(["1:x"])
+        with self.assertRaises(ValueError):
+            roster.parse_assignments(["1:0", "1:2"])
+
+    def test_staggered_roster_on_a_process_pool(self):
+        assignments = [(user_id, 2 * (i % 4)) for i, user_id in enumerate(self.user_ids)]
+        progress = []
+        summary = roster.generate_roster(self.pattern.id, assignments, "2024-01-01", "2024-01-31",
+                                         workers=2, progress=lambda done, total: progress.append((done, total)))
+        compiled = pattern_engine.compile_pattern(self.pattern)
+        expected = {user_id: list(compiled.iter_shifts(date(2024, 1, 1), date(2024, 1, 31), offset=offset))
+                    for user_id, offset in assignments}
+        self.assertEqual(summary, {"users": 20, "created": sum(map(len, expected.values())),
+                                   "updated": 0, "deleted": 0})
+        self.assertEqual(progress, [(20, 20)])
+
+        for user_id in self.user_ids[:4]:
+            self.assertEqual([(s.pattern_date, s.name, s.start_time, s.end_time) for s in self._shifts(user_id)],
+                             [(o.day, o.name, o.start_time, o.end_time) for o in expected[user_id]])
+        # Offset 2: the second user's cycle starts on 3 January
+        second = self._shifts(self.user_ids[1])
+        self.assertEqual((second[0].pattern_date, second[0].name), (date(2024, 1, 3), "Day"))
+        db = SessionLocal()
+        self.assertEqual(feed_state.get_state(db, feed_state.USER_FEED, self.user_ids[5])[0], 1)
+        db.close()
+
+    def test_regenerate_roster_is_idempotent_and_batched(self):
+        assignments = [(user_id, 0) for user_id in self.user_ids[:3]]
+        original_batch = roster.BATCH_USERS
+        roster.BATCH_USERS = 2
+        try:
+            progress = []
+            first = roster.generate_roster(self.pattern.id, assignments, "2024-01-01", "2024-01-16",
+                                           regenerate=True, progress=lambda done, total: progress.append(done))
+            again = roster.generate_roster(self.pattern.id, assignments, "2024-01-01", "2024-01-16",
+                                           regenerate=True)
+        finally:
+            roster.BATCH_USERS = original_batch
+        self.assertEqual(progress, [2, 3])
+        self.assertEqual(first["created"], 3 * 8)
+        self.assertEqual((again["created"], again["updated"], again["deleted"]), (0, 0, 0))
+
+    def test_editing_the_pattern_keeps_each_users_offset(self):
+        today = datetime.utcnow().date()
+        end = today + timedelta(days=15)
+        roster.generate_roster(self.pattern.id, [(self.user_ids[0], 0), (self.user_ids[1], 4)],
+                               today.isoformat(), end.isoformat())
+        renamed = dict(TEAM_ROTATION, cycle=[dict(TEAM_ROTATION["cycle"][0], name="Early")] + TEAM_ROTATION["cycle"][1:])
+        shift_pattern_manager.update_shift_pattern(self.pattern.id, definition=renamed, regenerate=True)
+
+        compiled = pattern_engine.compile_definition("Rotating", renamed)
+        for user_id, offset in ((self.user_ids[0], 0), (self.user_ids[1], 4)):
+            self.assertEqual([(s.pattern_date, s.name) for s in self._shifts(user_id)],
+                             [(o.day, o.name) for o in compiled.iter_shifts(today, end, offset=offset)])
+
+    def test_unknown_users_are_rejected_before_writing(self):
+        with self.assertRaises(ValueError):
+            roster.generate_roster(self.pattern.id, [(self.user_ids[0], 0), (9999, 0)], "2024-01-01", "2024-01-31")
+        self.assertEqual(self._shifts(self.user_ids[0]), [])
+
+class TestRosterTransactions(unittest.TestCase):
+
+    def setUp(self):
+        # On a database file the roster's session really is separate from the request's
+        use_file_database(self)
+        db = SessionLocal()
+        users = [User(name=f"Staff {i}", email=f"staff{i}@example.com") for i in range(3)]
+        db.add_all(users)
+        db.commit()
+        self.user_ids = [u.id for u in users]
+        db.close()
+        self.pattern = shift_pattern_manager.create_shift_pattern(
+            "Team rotation", "2 days, 2 nights, 4 off", "Rotating", TEAM_ROTATION)
+
+    def test_batches_are_committed_outside_the_unit_of_work(self):
+        original_batch = roster.BATCH_USERS
+        roster.BATCH_USERS = 2
+        try:
+            with self.assertRaises(RuntimeError):
+                with database.unit_of_work():
+                    roster.generate_roster(self.pattern.id, [(user_id, 0) for user_id in self.user_ids],
+                                           "2024-01-01", "2024-01-08")
+                    raise RuntimeError("request failed after the roster")
+        finally:
+            roster.BATCH_USERS = original_batch
+        # The request's rollback does not undo the committed batches
+        db = SessionLocal()
+        try:
+            for user_id in self.user_ids:
+                self.assertEqual(db.query(Shift).filter(Shift.user_id == user_id).count(), 4)
+        finally:
+            db.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src import database
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.task import Task
+from src import auth, child_manager, event_manager, expense_manager, grocery_manager, search, task_manager
+
+class TestSearch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.user = auth.register("Search User", "search@example.com", "pass")
+        self.other = auth.register("Other User", "search-other@example.com", "pass")
+        self.child = child_manager.add_child(self.user.id, "Kid", "2018-05-01")
+
+    def tearDown(self):
+        drop_tables()
+
+    def _hits(self, query, user_id=None, **kwargs):
+        return [(kind, obj.id) for kind, obj, _rank, _snippet
+                in search.search(user_id or self.user.id, query, **kwargs)]
+
+    def test_match_expression(self):
+        self.assertEqual(search.match_expression("dentist"), '"dentist"*')
+        self.assertEqual(search.match_expression('swim "lessons" OR'), '"swim" "lessons" "OR"*')
+        self.assertIsNone(search.match_expression(" -*() "))
+
+    def test_searches_all_sources_with_prefixes_and_diacritics(self):
+        event = event_manager.create_event("Dentist", "Dr. Müller, bring the card", "2024-03-05 09:00",
+                                           "2024-03-05 10:00", linked_user_id=self.user.id)
+        task = task_manager.create_task("Book dentist for Kid", user_id=self.user.id)
+        item = grocery_manager.add_item("Dental floss")
+        expense = expense_manager.add_expense("Dentist bill", 450.0, self.user.id, child_id=self.child.id)
+
+        self.assertEqual(sorted(self._hits("dent")), sorted([("event", event.id), ("task", task.id),
+                                                            ("grocery_item", item.id), ("expense", expense.id)]))
+        self.assertEqual(self._hits("muller"), [("event", event.id)])
+        self.assertEqual(self._hits("dent", kinds=["task"]), [("task", task.id)])
+        # All words must match
+        self.assertEqual(self._hits("dentist bill"), [("expense", expense.id)])
+
+        kind, obj, rank, snippet = search.search(self.user.id, "muller")[0]
+        self.assertLess(rank, 0)
+        self.assertIn("[Müller]", snippet)
+        self.assertEqual(search.result_dict(kind, obj, rank, snippet)["item"]["title"], "Dentist")
+
+    def test_title_ranks_above_description(self):
+        in_description = event_manager.create_event("Checkup", "at the swimming hall", "2024-03-05 09:00",
+                                                    "2024-03-05 10:00", linked_user_id=self.user.id)
+        in_title = event_manager.create_event("Swimming", None, "2024-03-06 09:00", "2024-03-06 10:00",
+                                              linked_user_id=self.user.id)
+        self.assertEqual(self._hits("swim"), [("event", in_title.id), ("event", in_description.id)])
+        self.assertEqual(self._hits("swim", limit=1), [("event", in_title.id)])
+
+    def test_index_follows_updates_and_deletes(self):
+        task = task_manager.create_task("Renew passport", user_id=self.user.id)
+        task_manager.update_task(task.id, description="Renew library card")
+        self.assertEqual(self._hits("passport"), [])
+        self.assertEqual(self._hits("library"), [("task", task.id)])
+
+        # Writes that bypass the managers are indexed too
+        db = SessionLocal()
+        db.query(Task).filter(Task.id == task.id).update({Task.description: "Return library books"})
+        db.commit()
+        db.close()
+        self.assertEqual(self._hits("books"), [("task", task.id)])
+
+        task_manager.delete_task(task.id)
+        self.assertEqual(self._hits("library"), [])
+
+    def test_results_are_scoped_to_the_user_and_their_children(self):
+        own = event_manager.create_event("Football", None, "2024-03-05 09:00", "2024-03-05 10:00",
+                                         linked_user_id=self.user.id)
+        childs = event_manager.create_event("Football match", None, "2024-03-06 09:00", "2024-03-06 10:00",
+                                            linked_child_id=self.child.id)
+        event_manager.create_event("Football tickets", None, "2024-03-07 09:00", "2024-03-07 10:00",
+                                   linked_user_id=self.other.id)
+        self.assertEqual(sorted(self._hits("football")), sorted([("event", own.id), ("event", childs.id)]))
+        self.assertEqual(len(self._hits("football", user_id=self.other.id)), 1)
+
+    def test_migration_indexes_existing_rows(self):
+        task = task_manager.create_task("Paint the fence", user_id=self.user.id)
+        db = SessionLocal()
+        db.connection().exec_driver_sql("DROP TABLE tasks_fts")
+        db.commit()
+        db.close()
+        with database.engine.begin() as conn:
+            search.create_search_indexes(conn)
+        self.assertEqual(self._hits("fence"), [("task", task.id)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+import os
+import json
+from datetime import datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src import serializers
+from src.event import Event
+from src.shift import Shift
+
+class TestSerializers(unittest.TestCase):
+
+    def test_zone_is_cached(self):
+        self.assertIs(serializers.zone('Europe/Oslo'), serializers.zone('Europe/Oslo'))
+        self.assertIsNone(serializers.local_isoformat(None))
+        self.assertEqual(serializers.local_isoformat(datetime(2024, 7, 1, 12), 'Europe/Oslo'),
+                         "2024-07-01T14:00:00+02:00")
+
+    def test_compiled_serializer(self):
+        serialize = serializers.compile_serializer(('id', 'start_time', 'created'),
+                                                   local_times=('start_time',), isoformat=('created',))
+        row = Shift(id=1, start_time=datetime(2024, 1, 1, 8))
+        row.created = datetime(2024, 1, 1)
+        self.assertEqual(serialize(row, 'America/New_York'),
+                         {"id": 1, "start_time": "2024-01-01T03:00:00-05:00", "created": "2024-01-01T00:00:00"})
+        self.assertEqual(serializers.compile_serializer(('id',))(row), {"id": 1})
+
+    def test_model_to_dict_keeps_shape(self):
+        event = Event(id=3, title="Swim", description=None, start_time=datetime(2024, 1, 1, 8),
+                      end_time=None, user_id=1, child_id=None, institution_id=None)
+        self.assertEqual(event.to_dict(include_user=False, include_child=False, include_institution=False,
+                                       timezone='Europe/Oslo'),
+                         {"id": 3, "title": "Swim", "description": None, "start_time": "2024-01-01T09:00:00+01:00",
+                          "end_time": None, "user_id": 1, "child_id": None, "institution_id": None})
+        self.assertEqual(list(Shift(id=1, name="Day").to_dict(include_owner=False)),
+                         ["id", "name", "start_time", "end_time", "user_id", "source_pattern_id"])
+
+    def test_dumps_matches_stdlib(self):
+        data = {"b": [1, 2.5, None, True], "a": {"z": "x", "y": 1}, "c": "text"}
+        self.assertEqual(json.loads(serializers.dumps(data)), data)
+        self.assertEqual(serializers.dumps(data, sort_keys=True),
+                         json.dumps(data, sort_keys=True, separators=(",", ":")))
+        # Types neither backend knows go through `default`
+        self.assertEqual(json.loads(serializers.dumps({"when": datetime(2024, 1, 1)}, default=str)),
+                         {"when": "2024-01-01 00:00:00"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -123,5 +123,25 @@ class TestShiftManager(unittest.TestCase):
         count_after_failed_delete = self.db.query(Shift).count()
         self.assertEqual(count_after_failed_delete, 1)
 
+    def test_get_user_shifts_in_window(self):
+        shift_manager.add_shift(self.test_user_id, "2024-01-01 09:00", "2024-01-01 17:00", "Before")
+        shift_manager.add_shift(self.test_user_id, "2024-01-01 22:00", "2024-01-02 06:00", "Overnight")
+        shift_manager.add_shift(self.test_user_id, "2024-01-02 09:00", "2024-01-02 17:00", "Inside")
+        shift_manager.add_shift(self.test_user_id, "2024-01-03 09:00", "2024-01-03 17:00", "After")
+
+        window_shifts = shift_manager.get_user_shifts(
+            self.test_user_id, start=datetime(2024, 1, 2), end=datetime(2024, 1, 3))
+        # The overnight shift started before the window but overlaps it
+        self.assertEqual([s.name for s in window_shifts], ["Overnight", "Inside"])
+
+    def test_long_shifts_are_found_by_later_windows(self):
+        shift_manager.add_shift(self.test_user_id, "2024-01-01 08:00", "2024-01-01 16:00", "Day")
+        on_call = shift_manager.add_shift(self.test_user_id, "2024-01-02 08:00", "2024-01-02 16:00", "On call")
+        # Stretched to three days after it was stored; the window starts two days into it
+        shift_manager.update_shift(on_call.id, new_end_time_str="2024-01-05 08:00")
+        window_shifts = shift_manager.get_user_shifts(
+            self.test_user_id, start=datetime(2024, 1, 4), end=datetime(2024, 1, 5))
+        self.assertEqual([s.name for s in window_shifts], ["On call"])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,182 @@
+import unittest
+import sys
+import os
+import json
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.shift import Shift
+from src.shift_generation import ShiftGeneration
+from src import shift_pattern_manager, auth, notification
+
+ROTATING_DEFINITION = {
+    "cycle": [
+        {"name": "Day", "days": 2, "start_time": "08:00", "end_time": "16:00"},
+        {"name": "Night", "days": 2, "start_time": "20:00", "end_time": "04:00"},
+        {"name": "Off", "days": 3}
+    ],
+    "cycle_start_reference_date": "2024-01-01"
+}
+
+class TestShiftPatternGeneration(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        self.db = SessionLocal()
+        self.test_user = auth.register("Pattern User", "pattern@example.com", "password")
+        self.pattern = shift_pattern_manager.create_shift_pattern(
+            "Rotation", "Two days, two nights, three off", "Rotating", ROTATING_DEFINITION, self.test_user.id)
+
+    def tearDown(self):
+        self.db.close()
+        drop_tables()
+
+    def _generate(self, bulk, **kwargs):
+        return shift_pattern_manager.generate_shifts_from_pattern(
+            self.db, self.pattern.id, self.test_user.id, "2024-01-01", "2024-01-14", bulk=bulk, **kwargs)
+
+    def test_bulk_matches_orm_generation(self):
+        generated = self._generate(bulk=False)
+        self.db.flush()
+        orm_shifts = [s.to_dict(include_source_pattern_details=True) for s in generated]
+        self.db.rollback()
+
+        bulk_shifts = self._generate(bulk=True)
+        self.db.commit()
+
+        strip_ids = lambda shifts: [{k: v for k, v in s.items() if k != "id"} for s in shifts]
+        self.assertEqual(strip_ids(bulk_shifts), strip_ids(orm_shifts))
+        self.assertEqual(len(bulk_shifts), 8) # Two full 7-day cycles with 4 working days each
+
+        stored = self.db.query(Shift).filter_by(user_id=self.test_user.id).order_by(Shift.start_time).all()
+        self.assertEqual([s.id for s in stored], [s["id"] for s in bulk_shifts])
+
+    def test_bulk_respects_holidays_and_exceptions(self):
+        shifts = self._generate(bulk=True, holidays=["2024-01-01"],
+                                exceptions={"2024-01-02": {"name": "Short", "end_time": "12:00"}})
+        self.assertEqual(shifts[0]["name"], "Short")
+        self.assertEqual(shifts[0]["end_time"], "2024-01-02T12:00:00+00:00")
+        self.assertEqual(len(shifts), 7)
+
+    def test_bulk_with_no_working_days_inserts_nothing(self):
+        shifts = shift_pattern_manager.generate_shifts_from_pattern(
+            self.db, self.pattern.id, self.test_user.id, "2024-01-05", "2024-01-07", bulk=True)
+        self.assertEqual(shifts, [])
+
+    def _stored(self):
+        return self.db.query(Shift).filter_by(user_id=self.test_user.id).order_by(Shift.start_time).all()
+
+    def _regenerate(self, start="2024-01-01", end="2024-01-14", **kwargs):
+        summary = shift_pattern_manager.regenerate_shifts_from_pattern(
+            self.db, self.pattern.id, self.test_user.id, start, end, **kwargs)
+        self.db.commit()
+        return summary
+
+    def test_regenerate_is_idempotent(self):
+        self.assertEqual(self._regenerate(), {"created": 8, "updated": 0, "deleted": 0, "unchanged": 0})
+        ids = [s.id for s in self._stored()]
+        self.assertEqual(self._regenerate(), {"created": 0, "updated": 0, "deleted": 0, "unchanged": 8})
+        self.assertEqual([s.id for s in self._stored()], ids)
+        # An overlapping range only adds the new days
+        self.assertEqual(self._regenerate("2024-01-08", "2024-01-21"),
+                         {"created": 4, "updated": 0, "deleted": 0, "unchanged": 4})
+
+    def test_regenerate_writes_only_the_differences(self):
+        self._generate(bulk=True, holidays=["2024-01-01"]) # Plain generation records the pattern day too
+        self._generate(bulk=True) # ... and duplicates on a second run
+        self.db.commit()
+        self.assertEqual(len(self._stored()), 15)
+
+        summary = self._regenerate(exceptions={"2024-01-02": {"name": "Short", "end_time": "12:00"},
+                                               "2024-01-08": "off"})
+        self.assertEqual(summary, {"created": 0, "updated": 1, "deleted": 8, "unchanged": 6})
+        stored = self._stored()
+        self.assertEqual(len(stored), 7)
+        self.assertEqual((stored[1].name, stored[1].end_time), ("Short", datetime(2024, 1, 2, 12)))
+
+    def test_regenerate_notifies_only_on_changes(self):
+        notification._user_queues.pop(self.test_user.id, None)
+        summary = self._regenerate()
+        shift_pattern_manager.notify_regenerated(self.test_user.id, self.pattern.id, summary)
+        summary = self._regenerate()
+        shift_pattern_manager.notify_regenerated(self.test_user.id, self.pattern.id, summary)
+        queue = notification.get_user_queue(self.test_user.id)
+        message = json.loads(queue.get_nowait())
+        self.assertEqual((message["type"], message["created"]), ("shifts_regenerated", 8))
+        self.assertTrue(queue.empty())
+        notification._user_queues.pop(self.test_user.id, None)
+
+    def test_editing_a_pattern_regenerates_upcoming_shifts(self):
+        today = datetime.utcnow().date()
+        past = (today - timedelta(days=14)).isoformat()
+        future = (today + timedelta(days=13)).isoformat()
+        self._regenerate(past, future)
+        before_today = [s for s in self._stored() if s.pattern_date < today]
+
+        definition = dict(ROTATING_DEFINITION, cycle=[
+            {"name": "Early", "days": 4, "start_time": "06:00", "end_time": "14:00"},
+            {"name": "Off", "days": 3}])
+        shift_pattern_manager.update_shift_pattern(self.pattern.id, definition=definition, regenerate=True)
+
+        self.db.expire_all()
+        stored = self._stored()
+        self.assertEqual([s.id for s in stored if s.pattern_date < today], [s.id for s in before_today])
+        upcoming = [s for s in stored if s.pattern_date >= today]
+        self.assertTrue(upcoming and all(s.name == "Early" for s in upcoming))
+        self.assertLessEqual(upcoming[-1].pattern_date, date.fromisoformat(future))
+
+    def test_regeneration_reuses_the_generation_inputs(self):
+        oslo = ZoneInfo('Europe/Oslo')
+        today = datetime.now(oslo).date()
+        holiday, day_off = today + timedelta(days=3), today + timedelta(days=5)
+        self._regenerate(today.isoformat(), (today + timedelta(days=13)).isoformat(), timezone='Europe/Oslo',
+                         holidays=[holiday.isoformat()], exceptions={day_off.isoformat(): "off"})
+
+        every_day = {"cycle": [{"name": "Early", "days": 1, "start_time": "06:00", "end_time": "14:00"}],
+                     "cycle_start_reference_date": "2024-01-01"}
+        shift_pattern_manager.update_shift_pattern(self.pattern.id, definition=every_day, regenerate=True)
+
+        self.db.expire_all()
+        stored = self._stored()
+        self.assertEqual([s.pattern_date for s in stored],
+                         [today + timedelta(days=i) for i in range(14) if i not in (3, 5)])
+        local_starts = {s.start_time.replace(tzinfo=ZoneInfo('UTC')).astimezone(oslo).hour for s in stored}
+        self.assertEqual(local_starts, {6})
+
+    def test_regeneration_skips_shifts_without_recorded_inputs(self):
+        tomorrow = datetime.utcnow().date() + timedelta(days=1)
+        self.db.add(Shift(name="Day", start_time=datetime.combine(tomorrow, datetime.min.time()).replace(hour=8),
+                          end_time=datetime.combine(tomorrow, datetime.min.time()).replace(hour=16),
+                          user_id=self.test_user.id, source_pattern_id=self.pattern.id, pattern_date=tomorrow))
+        self.db.commit()
+        definition = dict(ROTATING_DEFINITION, cycle=[{"name": "Early", "days": 1, "start_time": "06:00",
+                                                        "end_time": "14:00"}])
+        shift_pattern_manager.update_shift_pattern(self.pattern.id, definition=definition, regenerate=True)
+        self.db.expire_all()
+        self.assertEqual([(s.pattern_date, s.name) for s in self._stored()], [(tomorrow, "Day")])
+
+    def test_regeneration_keeps_one_run_per_range(self):
+        self._regenerate("2024-01-01", "2024-01-14") # Ended: dropped by the next run
+        today = datetime.utcnow().date()
+        start, end = today.isoformat(), (today + timedelta(days=13)).isoformat()
+        self._regenerate(start, end, holidays=[start])
+        self._regenerate(start, end, exceptions={end: "off"})
+
+        runs = self.db.query(ShiftGeneration).all()
+        self.assertEqual([(r.start_date, r.end_date) for r in runs], [(today, today + timedelta(days=13))])
+        self.assertIsNone(runs[0].holidays)
+        self.assertEqual(runs[0].exceptions, {end: "off"})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import sys
+import os
+from datetime import date, datetime
+
+# Adjust the path to include the root directory of the project
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Set environment variable for test database
+os.environ["TEST_MODE_ENABLED"] = "1"
+
+from src.database import initialize_database_for_application, create_tables, drop_tables, SessionLocal
+from src.shift import Shift
+from src.user import User
+from src import pattern_engine, shift_manager, shift_pattern_manager, virtual_shifts
+
+ROTATION = {
+    "cycle": [
+        {"name": "Day", "days": 2, "start_time": "08:00", "end_time": "16:00"},
+        {"name": "Night", "days": 2, "start_time": "20:00", "end_time": "04:00"},
+        {"name": "Off", "days": 3}
+    ],
+    "cycle_start_reference_date": "2024-01-01"
+}
+
+class TestVirtualShifts(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        initialize_database_for_application()
+
+    def setUp(self):
+        create_tables()
+        virtual_shifts.clear_cache()
+        db = SessionLocal()
+        user = User(name="Shift Worker", email="worker@example.com")
+        db.add(user)
+        db.commit()
+        self.user_id = user.id
+        db.close()
+        self.pattern = shift_pattern_manager.create_shift_pattern("Rotation", None, "Rotating", ROTATION,
+                                                                  self.user_id)
+        self.assignment = shift_pattern_manager.assign_shift_pattern(self.user_id, self.pattern.id, "2024-01-01")
+
+    def tearDown(self):
+        drop_tables()
+
+    def _shifts(self, start, end, **kwargs):
+        return shift_manager.get_user_shifts(self.user_id, start, end, **kwargs)
+
+    def test_computed_shifts_match_the_pattern(self):
+        shifts = self._shifts(datetime(2024, 1, 1), datetime(2024, 3, 1))
+        expected = list(pattern_engine.compile_pattern(self.pattern).iter_shifts(date(2024, 1, 1), date(2024, 2, 29)))
+        self.assertEqual([(s.name, s.start_time, s.end_time) for s in shifts],
+                         [(o.name, o.start_time, o.end_time) for o in expected])
+        self.assertTrue(all(s.virtual and s.id is None for s in shifts))
+        self.assertEqual(shifts[0].to_dict()["pattern_date"], "2024-01-01")
+        db = SessionLocal()
+        self.assertEqual(db.query(Shift).count(), 0)
+        db.close()
+        self.assertEqual(self._shifts(datetime(2024, 1, 1), datetime(2024, 3, 1), include_virtual=False), [])
+
+    def test_assignment_bounds_and_exceptions(self):
+        self.assertTrue(shift_pattern_manager.delete_pattern_assignment(self.assignment.id))
+        shift_pattern_manager.assign_shift_pattern(
+            self.user_id, self.pattern.id, "2024-01-02", "2024-01-08", offset=0,
+            exceptions={"2024-01-03": "off", "2024-01-04": {"name": "Short", "end_time": "23:00"}})
+        shifts = self._shifts(datetime(2023, 12, 1), datetime(2024, 2, 1))
+        self.assertEqual([(s.pattern_date.day, s.name) for s in shifts], [(2, "Day"), (4, "Short"), (8, "Day")])
+        self.assertEqual(shifts[1].end_time, datetime(2024, 1, 4, 23))
+        self.assertIsNone(shift_pattern_manager.assign_shift_pattern(self.user_id, self.pattern.id,
+                                                                     "2024-02-01", "2024-01-01"))
+
+    def test_stored_shift_overrides_its_pattern_day(self):
+        db = SessionLocal()
+        db.add(Shift(name="Swapped", start_time=datetime(2024, 1, 2, 10), end_time=datetime(2024, 1, 2, 18),
+                     user_id=self.user_id, source_pattern_id=self.pattern.id, pattern_date=date(2024, 1, 2)))
+        db.commit()
+        db.close()
+        shifts = self._shifts(datetime(2024, 1, 1), datetime(2024, 1, 5))
+        self.assertEqual([(s.name, isinstance(s, virtual_shifts.VirtualShift)) for s in shifts],
+                         [("Day", True), ("Swapped", False), ("Night", True), ("Night", True)])
+
+    def test_month_expansions_are_cached_per_pattern_version(self):
+        self._shifts(datetime(2024, 1, 10), datetime(2024, 2, 10))
+        cached = dict(virtual_shifts._window_cache)
+        self.assertEqual({key[-1] for key in cached}, {date(2024, 1, 1), date(2024, 2, 1)})
+        self._shifts(datetime(2024, 1, 15), datetime(2024, 1, 20))
+        self.assertEqual(dict(virtual_shifts._window_cache), cached) # Served from the cache
+
+        definition = dict(ROTATION, cycle=[dict(ROTATION["cycle"][0], name="Early")] + ROTATION["cycle"][1:])
+        self.assertEqual(shift_pattern_manager.update_shift_pattern(self.pattern.id, definition=definition).version, 2)
+        shifts = self._shifts(datetime(2024, 1, 1), datetime(2024, 1, 2))
+        self.assertEqual([s.name for s in shifts], ["Early"])
+
+    def test_pages_merge_stored_and_virtual_shifts(self):
+        db = SessionLocal()
+        for day in (3, 10, 17):
+            db.add(Shift(name="Extra", start_time=datetime(2024, 1, day, 17), end_time=datetime(2024, 1, day, 19),
+                         user_id=self.user_id))
+        db.commit()
+        db.close()
+        start, end = datetime(2024, 1, 1), datetime(2024, 1, 22)
+        everything = self._shifts(start, end)
+        pages, cursor = [], None
+        while True:
+            page = self._shifts(start, end, limit=2, cursor=cursor)
+            self.assertLessEqual(len(page), 2)
+            pages.extend(page)
+            cursor = page.next_cursor
+            if not cursor:
+                break
+        self.assertEqual([(s.name, s.start_time) for s in pages], [(s.name, s.start_time) for s in everything])
+        self.assertEqual(len(everything), 3 + 12)
+
+    def test_virtual_only_pages_keep_to_the_limit(self):
+        start, end = datetime(2024, 1, 1), datetime(2024, 2, 1)
+        everything = [s.start_time for s in self._shifts(start, end)]
+        page = self._shifts(start, end, limit=3)
+        self.assertEqual([s.start_time for s in page], everything[:3])
+        self.assertIsNotNone(page.next_cursor)
+        page = self._shifts(start, end, limit=3, cursor=page.next_cursor)
+        self.assertEqual([s.start_time for s in page], everything[3:6])
+
+if __name__ == '__main__':
+    unittest.main()